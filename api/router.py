@@ -0,0 +1,192 @@
+import hashlib
+import hmac
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from model import follower_model, journal_model
+from utils.config_manager import get_settings
+
+router = APIRouter(prefix="/api")
+
+
+def _dumps(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, default=str, separators=(",", ":")).encode("utf-8")
+
+
+def _cached_json(request: Request, payload: Any) -> Response:
+    """返回带 ETag 的 JSON 响应，If-None-Match 命中时返回 304"""
+    body = _dumps(payload)
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def verify_token(authorization: Optional[str] = Header(default=None),
+                       x_api_token: Optional[str] = Header(default=None)):
+    """
+    要求 Authorization: Bearer <token> 或 X-API-Token 头。
+    与 Bot 命令的 admin_chat_id 一致，未配置 [api] token 时拒绝所有请求。
+    """
+    token = get_settings().api_token
+    if not token:
+        raise HTTPException(status_code=403, detail="api disabled: [api] token is not configured")
+    provided = x_api_token or (authorization[7:] if authorization and authorization.startswith("Bearer ") else None)
+    if provided is None or not hmac.compare_digest(provided.encode("utf-8"), token.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="invalid api token")
+
+
+async def verify_metrics_access(authorization: Optional[str] = Header(default=None),
+                                x_api_token: Optional[str] = Header(default=None)):
+    """/metrics 默认与 API 使用同一令牌，[api] public_metrics = true 时无需认证"""
+    if get_settings().public_metrics:
+        return
+    await verify_token(authorization, x_api_token)
+
+
+@router.get("/followers", dependencies=[Depends(verify_token)])
+async def list_followers(
+        request: Request,
+        category: Optional[str] = None,
+        cursor: Optional[str] = Query(default=None, description="上一页返回的 next_cursor"),
+        limit: int = Query(default=100, ge=1, le=1000),
+):
+    """关注用户列表，按 user_id 键集分页"""
+    rows = await follower_model.list_followers(cursor, limit, category)
+    return _cached_json(request, {
+        "items": [row.model_dump() for row in rows],
+        "next_cursor": rows[-1].user_id if len(rows) == limit else None,
+    })
+
+
+@router.get("/categories", dependencies=[Depends(verify_token)])
+async def list_categories(request: Request):
+    """分类列表及各分类用户数"""
+    return _cached_json(request, await follower_model.get_category_counts())
+
+
+@router.get("/history", dependencies=[Depends(verify_token)])
+async def list_history(
+        request: Request,
+        author: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[int] = Query(default=None, description="上一页返回的 next_cursor"),
+        limit: int = Query(default=100, ge=1, le=1000),
+):
+    """推送历史，按 id 倒序键集分页，可按作者和发送时间范围过滤"""
+    rows = await follower_model.list_send_history(cursor, limit, author, since, until)
+    return _cached_json(request, {
+        "items": [row.model_dump() for row in rows],
+        "next_cursor": rows[-1].id if len(rows) == limit else None,
+    })
+
+
+@router.get("/history/export", dependencies=[Depends(verify_token)])
+async def export_history(author: Optional[str] = None, since: Optional[datetime] = None,
+                         until: Optional[datetime] = None):
+    """以 NDJSON 流式导出推送历史，逐批查询，内存占用不随数据量增长"""
+
+    async def generate():
+        async for row in follower_model.iter_send_history(author, since, until):
+            yield _dumps(row.model_dump()) + b"\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.get("/feeds/{user_id}", dependencies=[Depends(verify_token)])
+async def feed_status(request: Request, user_id: str):
+    """单个订阅的状态：关注信息 + 最近一次抓取结果"""
+    follower = await follower_model.get_follower_snapshot(user_id)
+    if follower is None:
+        raise HTTPException(status_code=404, detail="follower not found")
+    state = (await journal_model.get_fetch_states([user_id])).get(user_id)
+    return _cached_json(request, {
+        "follower": follower.model_dump(),
+        "fetch_state": state.model_dump() if state else None,
+    })
+
+
+@router.get("/stats/feeds", dependencies=[Depends(verify_token)])
+async def feed_stats_report(top_n: Optional[int] = Query(default=None, ge=1, le=100)):
+    """最慢、最大、最活跃和持续失败的订阅"""
+    from scheduler.feed_stats import build_feed_report
+
+    return await build_feed_report(top_n or get_settings().stats_top_n)
+
+
+@router.get("/stats/authors", dependencies=[Depends(verify_token)])
+async def author_stats_report(request: Request, limit: int = Query(default=20, ge=1, le=1000)):
+    """按推送数量倒序的作者统计（SendHistory 归档后依然保留）"""
+    rows = await follower_model.get_author_stats(limit)
+    return _cached_json(request, [row.model_dump() for row in rows])
+
+
+@router.get("/upstreams", dependencies=[Depends(verify_token)])
+async def upstream_status():
+    """RSSHub 镜像健康状况与当前并发上限"""
+    from strategy.strategy_factory import get_strategy
+
+    return get_strategy().pool.stats()
+
+
+class MemoryProfileRequest(BaseModel):
+    enabled: bool
+    # 每个分配记录的调用栈深度
+    frames: Optional[int] = None
+
+
+@router.get("/debug/memory", dependencies=[Depends(verify_token)])
+async def memory_report(top: int = Query(default=10, ge=1, le=100)):
+    """tracemalloc 内存报告：当前/峰值占用、各阶段峰值和主要分配位置"""
+    from utils.mem_profile import mem_profiler
+
+    return mem_profiler.report(top)
+
+
+@router.post("/debug/memory", dependencies=[Depends(verify_token)])
+async def toggle_memory_profile(body: MemoryProfileRequest):
+    """运行时开启或关闭内存分析"""
+    from utils.mem_profile import mem_profiler
+
+    if body.enabled:
+        mem_profiler.start(body.frames or get_settings().memory_profile_frames)
+    else:
+        mem_profiler.stop()
+    return {"enabled": mem_profiler.enabled}
+
+
+class BackfillRequest(BaseModel):
+    # 用户 ID 或分类名
+    target: str
+    # 相对时间（6h / 2d）或 ISO 时间
+    since: str
+
+
+@router.post("/backfill", status_code=202, dependencies=[Depends(verify_token)])
+async def create_backfill(body: BackfillRequest):
+    """创建补推任务，后台运行，返回任务进度"""
+    from scheduler import backfill
+
+    try:
+        job = await backfill.start_backfill(body.target, backfill.parse_since(body.since))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return backfill.describe(job)
+
+
+@router.get("/backfill/{job_id}", dependencies=[Depends(verify_token)])
+async def backfill_status(job_id: int):
+    """补推任务进度"""
+    from scheduler import backfill
+
+    status = await backfill.get_job_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="backfill job not found")
+    return status
@@ -0,0 +1,40 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request
+
+from utils.config_manager import get_settings
+from utils.logger import get_logger
+from utils.telegram_client import get_telegram_application
+
+logger = get_logger(__name__)
+
+WEBHOOK_PATH = "/telegram/webhook"
+
+router = APIRouter()
+
+
+@router.post(WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(
+        request: Request,
+        x_telegram_bot_api_secret_token: Optional[str] = Header(default=None),
+):
+    """
+    接收 Telegram 推送的 Update，校验 secret_token 后放入 PTB Application 的更新队列。
+    仅在 update_mode = webhook 时可用。
+    """
+    settings = get_settings()
+    if settings.telegram_update_mode != "webhook":
+        raise HTTPException(status_code=404)
+    # 按字节比较：compare_digest 遇到非 ASCII 的 str 会抛出 TypeError
+    if not x_telegram_bot_api_secret_token or not hmac.compare_digest(
+            x_telegram_bot_api_secret_token.encode(), (settings.webhook_secret or "").encode()):
+        logger.warning("Rejected webhook call with invalid secret token from %s", request.client)
+        raise HTTPException(status_code=403)
+
+    from telegram import Update
+
+    application = get_telegram_application()
+    update = Update.de_json(await request.json(), application.bot)
+    await application.update_queue.put(update)
+    return {"ok": True}
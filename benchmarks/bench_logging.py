@@ -0,0 +1,58 @@
+"""
+日志开销基准：对比同步 StreamHandler 与 utils.logger 队列方案在调用线程上的耗时，
+并输出队列方案的日志量统计。
+
+用法：python -m benchmarks.bench_logging [--n 20000] [--format text|json]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import logger as log_module  # noqa: E402
+
+
+def _bench(logger: logging.Logger, n: int) -> float:
+    started = time.perf_counter()
+    for i in range(n):
+        logger.info("Group %s - Processing %d/%d: %s", 1, i, n, "user")
+        logger.debug("Fetched %d items for %s", 20, "user")
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--format", default="text", choices=["text", "json"])
+    args = parser.parse_args()
+
+    # 同步方案：与原先 get_logger 相同的 StreamHandler，输出到 /dev/null
+    devnull = open(os.devnull, "w")
+    sync_logger = logging.getLogger("bench.sync")
+    handler = logging.StreamHandler(devnull)
+    handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s"))
+    sync_logger.addHandler(handler)
+    sync_logger.setLevel(logging.INFO)
+    sync_logger.propagate = False
+    sync_elapsed = _bench(sync_logger, args.n)
+
+    # 队列方案：调用线程只入队，格式化和 I/O 在监听线程
+    log_module._output_handler.setStream(devnull)
+    log_module.configure_logging("INFO", args.format)
+    queue_logger = log_module.get_logger("bench.queue")
+    with log_module.log_context(group=1, stage="bench"):
+        queue_elapsed = _bench(queue_logger, args.n)
+    log_module.stop_logging()
+
+    calls = args.n * 2
+    print(f"calls:            {calls}")
+    print(f"sync handler:     {sync_elapsed * 1e6 / calls:.2f} us/call (caller thread)")
+    print(f"queue handler:    {queue_elapsed * 1e6 / calls:.2f} us/call (caller thread)")
+    print(f"queue output:     {log_module.log_stats.as_dict()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+解析卸载基准：并发解析多个 RSS 响应时，对比 inline / thread / process 三种执行方式下的事件循环延迟。
+延迟通过一个每 5ms 唤醒一次的采样协程测量（实际唤醒时间 - 预期唤醒时间）。
+
+用法：python -m benchmarks.bench_parse_lag [--items 200] [--feeds 40] [--concurrency 8] [--workers 2]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from strategy.feed_parser import parse_twitter_feed  # noqa: E402
+from utils import cpu_pool  # noqa: E402
+
+_INTERVAL = 0.005
+
+
+def _make_feed(items: int) -> str:
+    entries = []
+    for i in range(items):
+        description = (
+            f"正文内容 {i} " * 20
+            + f'<img src="https://pbs.twimg.com/media/Img{i}a.jpg?format=jpg&amp;name=orig">'
+            + f'<img src="https://pbs.twimg.com/media/Img{i}b.jpg?format=jpg&amp;name=orig">'
+            + f'<video src="https://video.twimg.com/ext_tw_video/{i}/pu/vid/720x1280/v.mp4?tag=12&amp;x=1"></video>'
+        )
+        entries.append(
+            "<item>"
+            f"<title>Post {i}</title>"
+            f"<description><![CDATA[{description}]]></description>"
+            f"<link>https://x.com/user/status/{i}</link>"
+            "<pubDate>Mon, 01 Jan 2024 00:00:00 GMT</pubDate>"
+            "<author>user</author>"
+            "</item>"
+        )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>user</title>{"".join(entries)}</channel></rss>'
+
+
+async def _sample_lag(samples: list, stop: asyncio.Event):
+    while not stop.is_set():
+        expected = time.perf_counter() + _INTERVAL
+        await asyncio.sleep(_INTERVAL)
+        samples.append(max(0.0, time.perf_counter() - expected))
+
+
+async def _run(body: str, feeds: int, concurrency: int):
+    samples: list = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(_sample_lag(samples, stop))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def parse_one():
+        async with semaphore:
+            await cpu_pool.run_cpu(parse_twitter_feed, body, False)
+            # 模拟请求之间的网络等待
+            await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(parse_one() for _ in range(feeds)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+    return elapsed, samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200, help="每个响应的条目数")
+    parser.add_argument("--feeds", type=int, default=40, help="解析的响应总数")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    body = _make_feed(args.items)
+    print(f"feed size: {len(body) / 1024:.0f} KiB, {args.items} items, {args.feeds} feeds, concurrency {args.concurrency}")
+    print(f"{'mode':<8} {'wall':>9} {'lag p50':>9} {'lag p95':>9} {'lag max':>9}")
+    for mode in ("inline", "thread", "process"):
+        cpu_pool.configure_cpu_pool(mode, args.workers)
+        # 预热进程池，避免把进程启动时间计入
+        asyncio.run(_run(body, args.workers, args.workers))
+        elapsed, samples = asyncio.run(_run(body, args.feeds, args.concurrency))
+        cpu_pool.shutdown_cpu_pool()
+        samples = sorted(samples) or [0.0]
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        print(f"{mode:<8} {elapsed * 1000:>7.0f}ms {statistics.median(samples) * 1000:>7.1f}ms "
+              f"{p95 * 1000:>7.1f}ms {samples[-1] * 1000:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
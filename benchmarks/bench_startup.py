@@ -0,0 +1,66 @@
+"""
+启动耗时基准：使用 `python -X importtime` 统计导入各入口模块的耗时，并列出最重的依赖。
+
+用法：python -m benchmarks.bench_startup [--modules main scheduler.scheduler model.follower_model] [--top 15] [--repeat 3]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _importtime(module: str):
+    """返回 (墙钟耗时秒, [(cumulative_us, self_us, name), ...])"""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|", 2))
+        rows.append((int(cumulative_us), int(self_us), name))
+    return elapsed, rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", nargs="+", default=["main", "scheduler.scheduler", "model.follower_model"])
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            runs = [_importtime(module) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"== {module}: {e}\n")
+            continue
+
+        walls = [wall for wall, _ in runs]
+        _, rows = runs[-1]
+        target = next((row for row in rows if row[2].strip() == module), None)
+        print(f"== {module}")
+        print(f"process wall time: median {statistics.median(walls) * 1000:.1f} ms over {args.repeat} runs")
+        if target:
+            print(f"import cumulative: {target[0] / 1000:.1f} ms")
+        # 只列出顶层包，避免子模块重复计数
+        top_level = [row for row in rows if "." not in row[2].strip()]
+        print(f"top {args.top} top-level imports by cumulative time:")
+        for cumulative_us, _, name in sorted(top_level, reverse=True)[: args.top]:
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name.strip()}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+"""
+调度模拟：用虚拟时钟（utils.clock.VirtualClock）在几秒内跑完若干天的分组轮询，评估分组数、请求间隔等调度参数。
+
+模拟直接驱动 scheduler.scheduler 中的真实调度函数：启动时调用 refresh_daily_scheduler 建立分组任务并检测补跑，
+分组任务（run_group_job）每天按 cron 整点触发，VIP 通道（run_vip_lane）每 vip_interval_minutes 分钟触发一次，
+组内轮询、跳过判断、断点续跑、上游不可用时的暂停以及发送全部走 process_group_users / process_follower。
+只有外部依赖被替换为内存中的替身：
+- 订阅源：按泊松过程发帖的假数据，每次只返回最新 --feed-window 条，两次抓取之间发帖过多时更早的帖子记为漏推；
+  --outage 指定的时间段内所有上游不可用（抓取失败，wait_upstream 最多等待 [rss] pause_max_seconds）；
+- 数据库：follower_model / journal_model 的内存替身；
+- Telegram：每条推送耗时 --send-seconds 秒；
+- APScheduler：cron 任务由模拟按整点触发，date 任务（补跑）立即启动。
+--restart-at 模拟一次服务重启：正在运行的分组被中断，停机 --downtime 分钟期间的触发丢失，
+恢复后重新调用 refresh_daily_scheduler，由分组进度日志补跑错过或中断的分组。
+
+输出：抓取次数与每小时峰值、并发峰值、发布 -> 送达延迟分布（按通道 / 按订阅）、漏推与未送达数量、暂停与补跑情况。
+
+用法：python -m benchmarks.sim_scheduler [--followers 10000] [--days 1] [--groups 6] [--interval 60]
+        [--skip-recent 3600] [--posts-per-day 3] [--feed-window 20] [--vip-share 0.01]
+        [--outage 10:30] [--restart-at 14.5 --downtime 20] [--seed 1]
+未指定的调度参数取自当前配置（config.ini / 环境变量）。
+"""
+import argparse
+import asyncio
+import dataclasses
+import os
+import statistics
+import sys
+import time
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from random import Random
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scheduler.scheduler as sched  # noqa: E402
+from model.follower_cache import FollowerState  # noqa: E402
+from model.model import FollowerFetchState, GroupRunState  # noqa: E402
+from scheduler.planning import NORMAL, VIP  # noqa: E402
+from strategy.context import TwitterContent  # noqa: E402
+from utils.clock import VirtualClock, get_clock, set_clock  # noqa: E402
+from utils.config_manager import get_settings  # noqa: E402
+from utils.metrics import metrics  # noqa: E402
+
+_DAY = 86400.0
+_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _at(seconds: float) -> datetime:
+    return _START + timedelta(seconds=seconds)
+
+
+class FakeFeed:
+    """按泊松过程发帖的订阅源，发帖频率在订阅之间呈长尾分布"""
+
+    def __init__(self, user_id: str, posts_per_day: float, horizon: float, rng: Random, vip: bool = False):
+        self.user_id = user_id
+        self.posts_per_day = posts_per_day
+        self.vip = vip
+        self.times: List[float] = []
+        # 从前一天开始生成，模拟启动时已处于稳态；pubDate 只精确到秒
+        t = -_DAY
+        while True:
+            t += rng.expovariate(posts_per_day / _DAY)
+            if t > horizon:
+                break
+            if not self.times or round(t) > self.times[-1]:
+                self.times.append(float(round(t)))
+        self.latencies: List[float] = []
+
+    def initial_watermark(self) -> float:
+        """模拟开始前的帖子视为已推送"""
+        before = bisect_right(self.times, 0.0)
+        return self.times[before - 1] if before else -_DAY
+
+    def fetch(self, now: float, window: int) -> Tuple[int, int]:
+        """返回订阅源当前可见条目的下标范围 [start, end)"""
+        end = bisect_right(self.times, now)
+        return max(0, end - window), end
+
+    def content(self, index: int) -> TwitterContent:
+        return TwitterContent(
+            author=self.user_id,
+            content="",
+            link=f"https://x.com/{self.user_id}/status/{index}",
+            publish_date=format_datetime(_at(self.times[index]), usegmt=True),
+            title=f"post {index}",
+            media_list=[],
+        )
+
+
+class SimStats:
+    def __init__(self):
+        self.fetches = 0
+        self.fetches_per_hour: Counter = Counter()
+        self.fetch_errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.peak_groups = 0
+        self.skipped_triggers = 0
+        self.lost_triggers = 0
+        self.pauses = 0
+        self.pause_seconds = 0.0
+        self.catch_up_groups = 0
+        self.resumed_users = 0
+        self.interrupted_groups = 0
+        self.delivered = 0
+        self.missed = 0
+        self.error_notifications = 0
+
+
+class SimFollowerModel:
+    """model.follower_model 的内存替身，只实现调度路径用到的函数，水位线语义与数据库实现一致"""
+
+    def __init__(self, states: Dict[str, FollowerState]):
+        self.states = states
+
+    async def load_follower_cache(self):
+        pass
+
+    async def get_active_followers(self) -> List[FollowerState]:
+        return [state for state in self.states.values() if state.category != "disable"]
+
+    async def get_follower_state(self, user_id: str) -> Optional[FollowerState]:
+        return self.states.get(user_id)
+
+    async def advance_watermark(self, user_id: str, dt: datetime, link: str):
+        state = self.states.get(user_id)
+        if state and (state.latest_post_datetime is None or dt >= state.latest_post_datetime):
+            self.states[user_id] = dataclasses.replace(state, latest_post_datetime=dt, latest_post_link=link)
+
+    async def save_post_result(self, user_id: str, content: TwitterContent, dt: datetime, target_chat_id: str):
+        state = self.states.get(user_id)
+        if state and (state.latest_post_datetime is None or dt >= state.latest_post_datetime):
+            self.states[user_id] = dataclasses.replace(state, latest_post_datetime=dt, latest_post_link=content.link,
+                                                       latest_send_datetime=get_clock().now())
+
+
+class SimJournalModel:
+    """model.journal_model 的内存替身，断点续跑语义与数据库实现一致"""
+
+    def __init__(self, stats: SimStats):
+        self.stats = stats
+        self.fetch_states: Dict[str, FollowerFetchState] = {}
+        self.runs: Dict[int, GroupRunState] = {}
+
+    def _state(self, user_id: str) -> FollowerFetchState:
+        state = self.fetch_states.get(user_id)
+        if state is None:
+            state = self.fetch_states[user_id] = FollowerFetchState(user_id=user_id)
+        return state
+
+    async def mark_attempt(self, user_id: str, when: Optional[datetime] = None):
+        self._state(user_id).last_attempt_time = when or get_clock().now()
+
+    async def mark_result(self, user_id: str, success: bool, error: Optional[str] = None):
+        state = self._state(user_id)
+        if success:
+            state.last_success_time = get_clock().now()
+            state.last_error = None
+        else:
+            state.last_error = (error or "")[:500]
+
+    async def get_fetch_states(self, user_ids: List[str]) -> Dict[str, FollowerFetchState]:
+        return {user_id: self.fetch_states[user_id] for user_id in user_ids if user_id in self.fetch_states}
+
+    async def get_group_runs(self) -> Dict[int, GroupRunState]:
+        return dict(self.runs)
+
+    async def start_group_run(self, group_index: int, scheduled_time: datetime, total: int) -> GroupRunState:
+        self.stats.peak_groups = max(self.stats.peak_groups, len(sched._running_groups))
+        run = self.runs.get(group_index)
+        if run is None or run.scheduled_time != scheduled_time:
+            run = run or GroupRunState(group_index=group_index, scheduled_time=scheduled_time)
+            run.scheduled_time = scheduled_time
+            run.cursor = 0
+            run.finished_time = None
+        elif run.finished_time is None and run.cursor:
+            self.stats.resumed_users += run.cursor
+        run.total = total
+        self.runs[group_index] = run
+        return run
+
+    async def advance_group_cursor(self, group_index: int, cursor: int):
+        run = self.runs.get(group_index)
+        if run:
+            run.cursor = cursor
+
+    async def finish_group_run(self, group_index: int):
+        run = self.runs.get(group_index)
+        if run:
+            run.cursor = run.total
+            run.finished_time = get_clock().now()
+
+
+class FakeStrategy:
+    """RssStrategy 的替身：抓取耗时服从对数正态分布，--outage 时间段内所有上游不可用"""
+
+    def __init__(self, clock: VirtualClock, feeds: Dict[str, FakeFeed], followers: SimFollowerModel,
+                 stats: SimStats, args):
+        self.clock = clock
+        self.feeds = feeds
+        self.followers = followers
+        self.stats = stats
+        self.args = args
+        self.rng = Random(f"{args.seed}-fetch")
+
+    def _outage_end(self) -> Optional[float]:
+        """处于上游不可用时段时返回恢复时间"""
+        if self.args.outage is None:
+            return None
+        start, minutes = self.args.outage
+        for day in range(self.args.days):
+            begin = day * _DAY + start * 3600
+            if begin <= self.clock.elapsed < begin + minutes * 60:
+                return begin + minutes * 60
+        return None
+
+    async def wait_upstream(self, timeout: float) -> bool:
+        end = self._outage_end()
+        if end is None:
+            return True
+        wait = min(timeout, end - self.clock.elapsed)
+        self.stats.pauses += 1
+        self.stats.pause_seconds += wait
+        await self.clock.sleep(wait)
+        return self._outage_end() is None
+
+    async def get_new_media(self, user_id: str, retry_count: int = 3, retry_interval: float = 5,
+                            vip: bool = False) -> List[TwitterContent]:
+        self.stats.in_flight += 1
+        self.stats.peak_in_flight = max(self.stats.peak_in_flight, self.stats.in_flight)
+        try:
+            await self.clock.sleep(self.rng.lognormvariate(self.args.fetch_mu, 0.5))
+        finally:
+            self.stats.in_flight -= 1
+        if self._outage_end() is not None:
+            self.stats.fetch_errors += 1
+            raise RuntimeError("所有 RSSHub 镜像均不可用")
+        self.stats.fetches += 1
+        self.stats.fetches_per_hour[int(self.clock.elapsed // 3600)] += 1
+
+        feed = self.feeds[user_id]
+        start, end = feed.fetch(self.clock.elapsed, self.args.feed_window)
+        state = self.followers.states[user_id]
+        watermark = (state.latest_post_datetime - _START).total_seconds()
+        # 上次水位线之后、本次返回窗口之前的帖子已被挤出订阅源
+        if start < end and feed.times[start] > watermark:
+            self.stats.missed += start - bisect_right(feed.times, watermark)
+        return [feed.content(i) for i in range(start, end)]
+
+
+class FakeJobScheduler:
+    """AsyncIOScheduler 的替身：cron 任务登记后由 _run_cron 按整点触发，date 任务立即在虚拟时钟上启动"""
+
+    def __init__(self, clock: VirtualClock):
+        self.clock = clock
+        self.jobs: Dict[str, SimpleNamespace] = {}
+        self.date_jobs: List[SimpleNamespace] = []
+        self.running: Set[asyncio.Task] = set()
+
+    def get_jobs(self) -> List[SimpleNamespace]:
+        return list(self.jobs.values())
+
+    def add_job(self, func, trigger, args=(), kwargs=None, id=None, hour=None, misfire_grace_time=None, **_):
+        job = SimpleNamespace(id=id, func=func, trigger=trigger, args=tuple(args or ()), kwargs=kwargs or {},
+                              hour=hour, misfire_grace_time=misfire_grace_time)
+        if trigger == "date":
+            self.date_jobs.append(job)
+            self.start(job)
+        else:
+            self.jobs[id] = job
+        return job
+
+    def remove_job(self, job_id: str):
+        self.jobs.pop(job_id, None)
+
+    def start(self, job: SimpleNamespace):
+        task = self.clock.spawn(job.func(*job.args, **job.kwargs))
+        self.running.add(task)
+        task.add_done_callback(self.running.discard)
+
+    def crash(self) -> int:
+        """模拟进程退出：取消所有正在运行的任务"""
+        for task in self.running:
+            task.cancel()
+        return len(self.running)
+
+
+class Simulation:
+    def __init__(self, args):
+        self.args = args
+        self.stats = SimStats()
+        self.clock = VirtualClock(_START)
+        self.jobs = FakeJobScheduler(self.clock)
+        self.down_until = -1.0
+
+        rng = Random(args.seed)
+        horizon = args.days * _DAY
+        self.feeds: Dict[str, FakeFeed] = {}
+        states: Dict[str, FollowerState] = {}
+        for i in range(args.followers):
+            user_id = f"user{i:05d}"
+            # 对数正态分布的发帖频率，均值约为 posts_per_day
+            rate = args.posts_per_day * rng.lognormvariate(-0.5, 1.0)
+            vip = rng.random() < args.vip_share
+            feed = self.feeds[user_id] = FakeFeed(user_id, max(rate, 0.01), horizon, rng, vip)
+            states[user_id] = FollowerState(user_id=user_id, priority=VIP if vip else NORMAL,
+                                            latest_post_datetime=_at(feed.initial_watermark()))
+        self.followers = SimFollowerModel(states)
+        self.journal = SimJournalModel(self.stats)
+        self.strategy = FakeStrategy(self.clock, self.feeds, self.followers, self.stats, args)
+
+        base = get_settings()
+        self.settings = dataclasses.replace(
+            base,
+            num_groups=args.groups,
+            user_interval_seconds=args.interval,
+            skip_recent_seconds=args.skip_recent,
+            # 模拟只关心调度，去重、摘要与过滤都不参与
+            dedup_enabled=False,
+            digest_categories=frozenset(),
+        )
+
+    @property
+    def down(self) -> bool:
+        return self.clock.elapsed < self.down_until
+
+    async def _send(self, bot, content: TwitterContent, target_chat_id: str, category: str = "Uncategorized",
+                    post_time: str = ""):
+        await self.clock.sleep(self.args.send_seconds)
+        feed = self.feeds[content.author]
+        published = feed.times[int(content.link.rsplit("/", 1)[1])]
+        feed.latencies.append(self.clock.elapsed - published)
+        self.stats.delivered += 1
+
+    async def _notify_error(self, bot, message: str):
+        self.stats.error_notifications += 1
+
+    def _patches(self) -> Dict[str, object]:
+        bot = object()
+        return {
+            "get_settings": lambda: self.settings,
+            "follower_model": self.followers,
+            "journal_model": self.journal,
+            "get_strategy": lambda: self.strategy,
+            "get_telegram_bot": lambda: bot,
+            "get_target_chat_id": lambda: "sim",
+            "get_filter_engine": lambda: None,
+            "send_twitter_content": self._send,
+            "send_error_notification": self._notify_error,
+            "scheduler": self.jobs,
+        }
+
+    def _fire(self, job: SimpleNamespace):
+        group_index = job.args[0] if job.args else sched.VIP_GROUP
+        if self.down:
+            self.stats.lost_triggers += 1
+            return
+        if group_index in sched._running_groups:
+            # process_group_users 会跳过这次触发，这里只计数
+            self.stats.skipped_triggers += 1
+        self.jobs.start(job)
+
+    async def _run_cron(self):
+        """分组任务按 cron 整点触发（启动当天 0 点的触发由启动时的补跑覆盖）"""
+        for hour_index in range(1, self.args.days * 24):
+            await self.clock.sleep(hour_index * 3600 - self.clock.elapsed)
+            for job in list(self.jobs.jobs.values()):
+                if job.trigger == "cron" and job.id.startswith("group_job_") and job.hour == hour_index % 24:
+                    self._fire(job)
+
+    async def _run_vip(self):
+        """VIP 通道按 interval 触发"""
+        job = SimpleNamespace(id="vip_poll", func=sched.run_vip_lane, args=(), kwargs={})
+        interval = self.settings.vip_interval_minutes * 60
+        while True:
+            await self.clock.sleep(interval)
+            self._fire(job)
+
+    async def _startup(self):
+        """对应 lifespan：建立分组任务，并按分组进度日志补跑"""
+        started = len(self.jobs.date_jobs)
+        await sched.refresh_daily_scheduler()
+        self.stats.catch_up_groups += sum(len(job.args[0]) for job in self.jobs.date_jobs[started:]
+                                          if job.id == "makeup_job")
+
+    async def _restart(self):
+        restart_at, downtime = self.args.restart_at * 3600, self.args.downtime * 60
+        await self.clock.sleep(restart_at - self.clock.elapsed)
+        self.stats.interrupted_groups += len(sched._running_groups - {sched.VIP_GROUP})
+        self.jobs.crash()
+        self.down_until = restart_at + downtime
+        await self.clock.sleep(downtime)
+        await self._startup()
+
+    async def run(self):
+        previous = set_clock(self.clock)
+        originals = {name: getattr(sched, name) for name in self._patches()}
+        for name, value in self._patches().items():
+            setattr(sched, name, value)
+        sched._running_groups.clear()
+        try:
+            self.clock.spawn(self._startup())
+            self.clock.spawn(self._run_cron())
+            self.clock.spawn(self._run_vip())
+            if self.args.restart_at is not None:
+                self.clock.spawn(self._restart())
+            await self.clock.run(until=self.args.days * _DAY)
+        finally:
+            for name, value in originals.items():
+                setattr(sched, name, value)
+            sched._running_groups.clear()
+            set_clock(previous)
+
+
+def _percentiles(values: List[float], points=(50, 90, 99)) -> str:
+    if not values:
+        return "-"
+    values = sorted(values)
+    parts = [f"p{p} {values[min(len(values) - 1, int(len(values) * p / 100))] / 60:.1f}m" for p in points]
+    return " ".join(parts + [f"max {values[-1] / 60:.1f}m"])
+
+
+def _outage(value: str) -> Tuple[float, float]:
+    start, _, minutes = value.partition(":")
+    return float(start), float(minutes or 30)
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--followers", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--groups", type=int, default=settings.num_groups)
+    parser.add_argument("--interval", type=float, default=settings.user_interval_seconds, help="组内用户请求间隔（秒）")
+    parser.add_argument("--skip-recent", type=float, default=settings.skip_recent_seconds)
+    parser.add_argument("--posts-per-day", type=float, default=3.0, help="每个订阅的平均发帖数/天")
+    parser.add_argument("--feed-window", type=int, default=20, help="订阅源每次返回的条目数")
+    parser.add_argument("--fetch-mu", type=float, default=0.0, help="抓取耗时对数正态分布的 mu（秒，中位数 e^mu）")
+    parser.add_argument("--send-seconds", type=float, default=0.5, help="每条推送的耗时（秒）")
+    parser.add_argument("--vip-share", type=float, default=0.01, help="priority = vip 的订阅比例")
+    parser.add_argument("--outage", type=_outage, default=None, metavar="HOUR:MINUTES",
+                        help="每天从 HOUR 点开始上游不可用 MINUTES 分钟")
+    parser.add_argument("--restart-at", type=float, default=None, metavar="HOUR", help="在第 HOUR 小时模拟一次服务重启")
+    parser.add_argument("--downtime", type=float, default=10, help="重启的停机时长（分钟）")
+    parser.add_argument("--top", type=int, default=5, help="列出延迟最高的订阅数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log-level", default="CRITICAL", help="调度器日志级别")
+    args = parser.parse_args()
+    sched.logger.setLevel(args.log_level.upper())
+
+    sim = Simulation(args)
+    started = time.perf_counter()
+    asyncio.run(sim.run())
+    wall = time.perf_counter() - started
+
+    feeds, stats = sim.feeds, sim.stats
+    horizon = args.days * _DAY
+    published = sum(bisect_right(f.times, horizon) - bisect_right(f.times, 0.0) for f in feeds.values())
+    pending = published - stats.delivered - stats.missed
+    lanes = {VIP: [f for f in feeds.values() if f.vip], NORMAL: [f for f in feeds.values() if not f.vip]}
+    counters = metrics.snapshot()["counters"]
+
+    print(f"simulated {args.days} day(s), {args.followers} followers ({len(lanes[VIP])} vip), {args.groups} groups, "
+          f"interval {args.interval:g}s in {wall:.2f}s wall")
+    print(f"fetches: {stats.fetches} total, {stats.fetch_errors} failed, "
+          f"peak {max(stats.fetches_per_hour.values(), default=0)}/hour, "
+          f"peak concurrent fetches {stats.peak_in_flight}, peak concurrent groups {stats.peak_groups}")
+    print(f"triggers: {stats.skipped_triggers} skipped (group still running), {stats.lost_triggers} lost while down")
+    if args.outage is not None:
+        print(f"upstream pause: {stats.pauses} waits, {stats.pause_seconds / 60:.1f}m total")
+    if args.restart_at is not None:
+        print(f"restart: {stats.interrupted_groups} groups interrupted, {stats.catch_up_groups} groups caught up, "
+              f"{stats.resumed_users} users skipped by journal resume")
+    print(f"posts: {published} published, {stats.delivered} delivered, {stats.missed} missed (feed window overflow), "
+          f"{pending} not yet delivered")
+    for lane, lane_feeds in lanes.items():
+        latencies = [lat for f in lane_feeds for lat in f.latencies]
+        print(f"delivery latency ({lane:<6}):           {_percentiles(latencies)}")
+    feed_medians = [statistics.median(f.latencies) for f in feeds.values() if f.latencies]
+    print(f"delivery latency (per-feed median): {_percentiles(feed_medians)}")
+    print(f"vip slo misses: {int(counters.get('lane.vip.slo_miss', 0))}")
+    worst = sorted((f for f in feeds.values() if f.latencies), key=lambda f: max(f.latencies), reverse=True)[:args.top]
+    for feed in worst:
+        print(f"  {feed.user_id}{' (vip)' if feed.vip else ''}: {feed.posts_per_day:.1f} posts/day, "
+              f"{len(feed.latencies)} delivered, median {statistics.median(feed.latencies) / 60:.1f}m, "
+              f"max {max(feed.latencies) / 60:.1f}m")
+
+
+if __name__ == "__main__":
+    main()
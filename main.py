@@ -1,7 +1,11 @@
 from fastapi import FastAPI
 import uvicorn
+from fastapi import Depends
+from api.router import router as api_router, verify_metrics_access
+from api.telegram_webhook import router as webhook_router
 from scheduler.scheduler import lifespan
 from utils.config_manager import get_config
+from utils.metrics import metrics
 
 # 初始化应用配置
 app_config = {
@@ -11,6 +15,8 @@ app_config = {
 }
 
 app = FastAPI(**app_config,lifespan=lifespan)
+app.include_router(api_router)
+app.include_router(webhook_router)
 
 @app.get("/")
 async def root():
@@ -23,6 +29,12 @@ async def root():
     }
 
 
+@app.get("/metrics", dependencies=[Depends(verify_metrics_access)])
+async def get_metrics():
+    """运行指标（计数器、仪表、直方图）"""
+    return metrics.snapshot()
+
+
 @app.get("/hello/{name}")
 async def say_hello(name: str):
     """问候端点"""
@@ -0,0 +1,55 @@
+import json
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import select
+from model.model import get_async_session, BackfillJob
+from utils.date_handler import utcnow
+
+UNFINISHED = ("pending", "running")
+
+
+async def create_job(target: str, since: datetime, user_ids: List[str]) -> BackfillJob:
+    async with get_async_session() as session:
+        job = BackfillJob(target=target, since=since, user_ids=json.dumps(user_ids))
+        session.add(job)
+        await session.flush()
+        return job
+
+
+async def get_job(job_id: int) -> Optional[BackfillJob]:
+    async with get_async_session() as session:
+        return await session.get(BackfillJob, job_id)
+
+
+async def list_jobs(limit: int = 10) -> List[BackfillJob]:
+    """按创建时间倒序获取最近的补推任务"""
+    async with get_async_session() as session:
+        result = await session.execute(
+            select(BackfillJob).order_by(BackfillJob.id.desc()).limit(limit)  # type: ignore[union-attr]
+        )
+        return result.scalars().all()
+
+
+async def get_unfinished_jobs() -> List[BackfillJob]:
+    async with get_async_session() as session:
+        result = await session.execute(
+            select(BackfillJob).where(BackfillJob.status.in_(UNFINISHED)).order_by(BackfillJob.id)  # type: ignore[attr-defined]
+        )
+        return result.scalars().all()
+
+
+async def update_job(job_id: int, **fields) -> Optional[BackfillJob]:
+    """更新任务字段；计数字段以增量形式传入 sent/skipped/errors"""
+    async with get_async_session() as session:
+        job = await session.get(BackfillJob, job_id)
+        if job is None:
+            return None
+        job.sent_count += fields.pop("sent", 0)
+        job.skipped_count += fields.pop("skipped", 0)
+        job.error_count += fields.pop("errors", 0)
+        for key, value in fields.items():
+            setattr(job, key, value)
+        job.update_time = utcnow()
+        session.add(job)
+        return job
@@ -0,0 +1,68 @@
+import json
+from datetime import datetime
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import delete, select
+from model.model import get_async_session, DigestBuffer
+from strategy.context import TwitterContent
+
+
+async def buffer_posts(user_id: str, category: str, posts: List[Tuple[TwitterContent, datetime]]) -> Set[str]:
+    """
+    把新帖子写入摘要缓冲区，已缓冲的链接（可能由其他关注用户写入）会被跳过。
+    返回被跳过的链接，调用方需自行推进这些帖子的水位线。
+    """
+    if not posts:
+        return set()
+    async with get_async_session() as session:
+        result = await session.execute(
+            select(DigestBuffer.link).where(DigestBuffer.link.in_([c.link for c, _ in posts]))  # type: ignore[attr-defined]
+        )
+        existing = set(result.scalars().all())
+        skipped: Set[str] = set()
+        for content, dt in posts:
+            if content.link in existing:
+                skipped.add(content.link)
+                continue
+            existing.add(content.link)
+            session.add(DigestBuffer(
+                category=category,
+                user_id=user_id,
+                author=content.author,
+                title=content.title,
+                content=content.content[:200] if content.content else "",
+                link=content.link,
+                media_snapshot=json.dumps(content.media_list) if content.media_list else None,
+                publish_date=content.publish_date,
+                publish_time=dt,
+            ))
+        return skipped
+
+
+async def get_buffered_posts() -> Dict[str, List[DigestBuffer]]:
+    """按分类获取所有缓冲中的帖子，按发布时间升序"""
+    async with get_async_session() as session:
+        result = await session.execute(select(DigestBuffer).order_by(DigestBuffer.publish_time))
+        grouped: Dict[str, List[DigestBuffer]] = {}
+        for row in result.scalars().all():
+            grouped.setdefault(row.category, []).append(row)
+        return grouped
+
+
+async def delete_buffered(ids: List[int]):
+    """摘要送达后删除对应缓冲记录"""
+    if not ids:
+        return
+    async with get_async_session() as session:
+        await session.execute(delete(DigestBuffer).where(DigestBuffer.id.in_(ids)))  # type: ignore[union-attr]
+
+
+def to_content(row: DigestBuffer) -> TwitterContent:
+    return TwitterContent(
+        author=row.author,
+        content=row.content,
+        link=row.link,
+        publish_date=row.publish_date,
+        title=row.title,
+        media_list=json.loads(row.media_snapshot) if row.media_snapshot else [],
+    )
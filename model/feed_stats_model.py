@@ -0,0 +1,21 @@
+from typing import Any, Dict, List
+
+from sqlalchemy import select
+from model.model import get_async_session, FeedStatsSnapshot
+from utils.date_handler import utcnow
+
+
+async def save_feed_stats(summaries: Dict[str, Dict[str, Any]]):
+    """批量写入订阅统计摘要（按 user_id 覆盖）"""
+    if not summaries:
+        return
+    now = utcnow()
+    async with get_async_session() as session:
+        for user_id, summary in summaries.items():
+            await session.merge(FeedStatsSnapshot(user_id=user_id, update_time=now, **summary))
+
+
+async def get_feed_stats() -> List[FeedStatsSnapshot]:
+    async with get_async_session() as session:
+        result = await session.execute(select(FeedStatsSnapshot))
+        return result.scalars().all()
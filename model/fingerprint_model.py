@@ -0,0 +1,50 @@
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from sqlalchemy import delete, select
+from model.model import get_async_session, ContentFingerprint
+
+
+async def find_fingerprints(fingerprints: Iterable[str], since: datetime) -> Dict[str, ContentFingerprint]:
+    """查找 since 之后推送过的指纹"""
+    fingerprints = list(fingerprints)
+    if not fingerprints:
+        return {}
+    async with get_async_session() as session:
+        result = await session.execute(
+            select(ContentFingerprint).where(
+                ContentFingerprint.fingerprint.in_(fingerprints),  # type: ignore[attr-defined]
+                ContentFingerprint.send_time >= since,  # type: ignore[arg-type]
+            )
+        )
+        return {row.fingerprint: row for row in result.scalars().all()}
+
+
+async def get_recent_fingerprints(since: datetime, limit: int) -> List[ContentFingerprint]:
+    """按推送时间倒序获取 since 之后的指纹，最多 limit 条"""
+    async with get_async_session() as session:
+        result = await session.execute(
+            select(ContentFingerprint)
+            .where(ContentFingerprint.send_time >= since)  # type: ignore[arg-type]
+            .order_by(ContentFingerprint.send_time.desc())  # type: ignore[attr-defined]
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+
+async def save_fingerprints(fingerprints: Iterable[str], user_id: str, author: str, link: str, send_time: datetime):
+    """写入（或刷新）已推送内容的指纹"""
+    async with get_async_session() as session:
+        for fingerprint in fingerprints:
+            await session.merge(ContentFingerprint(
+                fingerprint=fingerprint, user_id=user_id, author=author, link=link, send_time=send_time,
+            ))
+
+
+async def delete_fingerprints_before(cutoff: datetime) -> int:
+    """删除过期指纹，返回删除数量"""
+    async with get_async_session() as session:
+        result = await session.execute(
+            delete(ContentFingerprint).where(ContentFingerprint.send_time < cutoff)  # type: ignore[arg-type]
+        )
+        return result.rowcount or 0
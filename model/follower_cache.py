@@ -0,0 +1,122 @@
+"""
+关注用户状态的进程内缓存。
+
+follower_table 数据量小、变更少，但每次定时检查都要读取。启动（及每日刷新）时整体加载一次，
+之后由 follower_model 的写入函数在事务提交后同步更新（write-through），调度与跳过判断不再查库。
+每次变更 version 加一，调用方可以用它低成本地判断数据是否变化（调度器据此缓存各通道的用户列表）。
+
+重新加载期间（begin_reload 到 end_reload）发生写入的用户记入 dirty，加载方在替换前重新读取这些用户，
+避免查询进行中推进的水位线被旧行覆盖而导致重复推送。
+"""
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from utils.metrics import metrics
+
+
+@dataclass(frozen=True)
+class FollowerState:
+    """FollowerTable 的只读快照，字段名与表一致"""
+    user_id: str
+    category: str = "default"
+    source: str = "twitter"
+    latest_post_link: Optional[str] = None
+    latest_post_datetime: Optional[datetime] = None
+    latest_send_datetime: Optional[datetime] = None
+    priority: str = "normal"
+
+    @classmethod
+    def from_row(cls, row) -> "FollowerState":
+        return cls(
+            user_id=row.user_id,
+            category=row.category,
+            source=row.source,
+            latest_post_link=row.latest_post_link,
+            latest_post_datetime=row.latest_post_datetime,
+            latest_send_datetime=row.latest_send_datetime,
+            priority=row.priority,
+        )
+
+
+class FollowerCache:
+    """
+    user_id -> FollowerState。未加载前所有写入都被忽略，读取方应回退到数据库，
+    避免不完整的缓存被当成完整视图。
+    """
+
+    def __init__(self):
+        self._states: Dict[str, FollowerState] = {}
+        self.loaded = False
+        self.version = 0
+        self._reloading = 0
+        self._dirty: Set[str] = set()
+        metrics.register_gauge("follower_cache.size", lambda: len(self._states))
+        metrics.register_gauge("follower_cache.version", lambda: self.version)
+
+    def begin_reload(self) -> None:
+        if not self._reloading:
+            self._dirty.clear()
+        self._reloading += 1
+
+    def end_reload(self) -> None:
+        self._reloading = max(0, self._reloading - 1)
+        if not self._reloading:
+            self._dirty.clear()
+
+    def take_dirty(self) -> Set[str]:
+        """取出并清空重新加载期间被写入过的用户"""
+        dirty, self._dirty = self._dirty, set()
+        return dirty
+
+    def _touch(self, user_id: str) -> None:
+        if self._reloading:
+            self._dirty.add(user_id)
+
+    def replace_all(self, rows: Iterable) -> None:
+        """用数据库中的全部记录重建缓存（保持查询顺序，分组结果与直接查库一致）"""
+        self._states = {row.user_id: FollowerState.from_row(row) for row in rows}
+        self.loaded = True
+        self.version += 1
+
+    def get(self, user_id: str) -> Optional[FollowerState]:
+        return self._states.get(user_id)
+
+    def active(self) -> List[FollowerState]:
+        return [state for state in self._states.values() if state.category != "disable"]
+
+    def active_ids(self) -> List[str]:
+        return [state.user_id for state in self.active()]
+
+    def categories(self) -> List[str]:
+        return list(dict.fromkeys(state.category for state in self._states.values()))
+
+    def category_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for state in self._states.values():
+            counts[state.category] = counts.get(state.category, 0) + 1
+        return counts
+
+    def put(self, row) -> None:
+        """写入（或覆盖）一条记录，row 可以是 FollowerTable 或 FollowerState"""
+        self._touch(row.user_id)
+        if not self.loaded:
+            return
+        self._states[row.user_id] = row if isinstance(row, FollowerState) else FollowerState.from_row(row)
+        self.version += 1
+
+    def update(self, user_id: str, **changes) -> None:
+        self._touch(user_id)
+        state = self._states.get(user_id)
+        if state is None:
+            return
+        self._states[user_id] = replace(state, **changes)
+        self.version += 1
+
+    def remove(self, user_id: str) -> None:
+        self._touch(user_id)
+        if self._states.pop(user_id, None) is not None:
+            self.version += 1
+
+
+follower_cache = FollowerCache()
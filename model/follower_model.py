@@ -1,10 +1,14 @@
 import json
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
 
-from sqlalchemy import select
-from model.model import get_async_session, FollowerTable, SendHistory
+from sqlalchemy import delete, func, select
+from model.follower_cache import FollowerState, follower_cache
+from model.model import get_async_session, AuthorStats, FeedStatsSnapshot, FollowerTable, SendHistory
 from strategy.context import TwitterContent
+from utils.date_handler import utcnow
+from utils.feed_stats import feed_stats
+from utils.tracing import traced
 
 
 # ---------------------------------------------------------------------------
@@ -20,12 +24,16 @@ async def get_all_follower() -> List[FollowerTable]:
 
 async def add_new_follower(user_id: str, category: str = "default", source: str = "twitter"):
     """添加新的关注用户"""
+    follower = FollowerTable(user_id=user_id, category=category, source=source)
     async with get_async_session() as session:
-        session.add(FollowerTable(user_id=user_id, category=category, source=source))
+        session.add(follower)
+    follower_cache.put(follower)
 
 
 async def get_all_category() -> List[str]:
     """获取所有分类"""
+    if follower_cache.loaded:
+        return follower_cache.categories()
     async with get_async_session() as session:
         result = await session.execute(select(FollowerTable.category).distinct())
         return result.scalars().all()
@@ -38,6 +46,28 @@ async def update_follower(user_id: str, category: str):
         if follower:
             follower.category = category
             session.add(follower)
+    if follower:
+        follower_cache.update(user_id, category=category)
+
+
+async def set_priority(target: str, priority: str) -> List[str]:
+    """
+    设置调度优先级。target 是已关注的用户 ID 时只更新该用户，否则视为分类名，更新该分类下的所有用户。
+    返回被更新的用户 ID。
+    """
+    async with get_async_session() as session:
+        follower = await session.get(FollowerTable, target)
+        if follower is not None:
+            followers = [follower]
+        else:
+            result = await session.execute(select(FollowerTable).where(FollowerTable.category == target))
+            followers = result.scalars().all()
+        for follower in followers:
+            follower.priority = priority
+            session.add(follower)
+    for follower in followers:
+        follower_cache.update(follower.user_id, priority=priority)
+    return [follower.user_id for follower in followers]
 
 
 async def delete_follower(user_id: str):
@@ -46,6 +76,9 @@ async def delete_follower(user_id: str):
         follower = await session.get(FollowerTable, user_id)
         if follower:
             await session.delete(follower)
+        await session.execute(delete(FeedStatsSnapshot).where(FeedStatsSnapshot.user_id == user_id))  # type: ignore[arg-type]
+    follower_cache.remove(user_id)
+    feed_stats.remove(user_id)
 
 async def select_follower_by_category(category: str) -> List[FollowerTable]:
     """根据分类获取用户"""
@@ -54,12 +87,101 @@ async def select_follower_by_category(category: str) -> List[FollowerTable]:
         return result.scalars().all()
 
 
+# ---------------------------------------------------------------------------
+# 分页查询（HTTP API）
+# ---------------------------------------------------------------------------
+
+async def list_followers(after: Optional[str] = None, limit: int = 100,
+                         category: Optional[str] = None) -> List[FollowerTable]:
+    """按 user_id 键集分页获取用户，after 为上一页最后一个 user_id"""
+    query = select(FollowerTable).order_by(FollowerTable.user_id).limit(limit)
+    if after is not None:
+        query = query.where(FollowerTable.user_id > after)  # type: ignore[arg-type]
+    if category is not None:
+        query = query.where(FollowerTable.category == category)
+    async with get_async_session() as session:
+        result = await session.execute(query)
+        return result.scalars().all()
+
+
+async def get_category_counts() -> Dict[str, int]:
+    """获取每个分类的用户数"""
+    if follower_cache.loaded:
+        return follower_cache.category_counts()
+    async with get_async_session() as session:
+        result = await session.execute(
+            select(FollowerTable.category, func.count()).group_by(FollowerTable.category)
+        )
+        return {category: count for category, count in result.all()}
+
+
+def _history_query(author: Optional[str], since: Optional[datetime], until: Optional[datetime]):
+    query = select(SendHistory).order_by(SendHistory.id.desc())  # type: ignore[union-attr]
+    if author is not None:
+        query = query.where(SendHistory.author == author)
+    if since is not None:
+        query = query.where(SendHistory.send_time >= since)
+    if until is not None:
+        query = query.where(SendHistory.send_time < until)
+    return query
+
+
+async def list_send_history(before_id: Optional[int] = None, limit: int = 100, author: Optional[str] = None,
+                            since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[SendHistory]:
+    """按 id 倒序键集分页获取推送历史，before_id 为上一页最后一个 id"""
+    query = _history_query(author, since, until).limit(limit)
+    if before_id is not None:
+        query = query.where(SendHistory.id < before_id)  # type: ignore[operator]
+    async with get_async_session() as session:
+        result = await session.execute(query)
+        return result.scalars().all()
+
+
+async def iter_send_history(author: Optional[str] = None, since: Optional[datetime] = None,
+                            until: Optional[datetime] = None, batch_size: int = 500) -> AsyncIterator[SendHistory]:
+    """逐批遍历推送历史（用于导出），每批使用独立的短 session，内存占用与总量无关"""
+    before_id: Optional[int] = None
+    while True:
+        rows = await list_send_history(before_id, batch_size, author, since, until)
+        for row in rows:
+            yield row
+        if len(rows) < batch_size:
+            return
+        before_id = rows[-1].id
+
+
 # ---------------------------------------------------------------------------
 # Scheduler 专用查询/写入
 # ---------------------------------------------------------------------------
 
+async def load_follower_cache():
+    """
+    从数据库整体加载关注用户缓存（启动与每日刷新时调用，顺便校正缓存）。
+    查询期间被写入的用户（写穿发生在事务提交之后）重新单独读取，直到没有新的写入再整体替换。
+    """
+    follower_cache.begin_reload()
+    try:
+        rows = {row.user_id: row for row in await get_all_follower()}
+        while True:
+            dirty = follower_cache.take_dirty()
+            if not dirty:
+                break
+            async with get_async_session() as session:
+                for user_id in dirty:
+                    row = await session.get(FollowerTable, user_id)
+                    if row is None:
+                        rows.pop(user_id, None)
+                    else:
+                        rows[user_id] = row
+        follower_cache.replace_all(rows.values())
+    finally:
+        follower_cache.end_reload()
+
+
 async def get_active_user_ids() -> List[str]:
     """获取所有活跃用户 ID 列表（category != 'disable'）"""
+    if follower_cache.loaded:
+        return follower_cache.active_ids()
     async with get_async_session() as session:
         result = await session.execute(
             select(FollowerTable.user_id).where(FollowerTable.category != "disable")  # type: ignore[arg-type]
@@ -67,6 +189,17 @@ async def get_active_user_ids() -> List[str]:
         return result.scalars().all()
 
 
+async def get_active_followers() -> List[FollowerState]:
+    """获取所有活跃用户的状态（缓存已加载时不查库）"""
+    if follower_cache.loaded:
+        return follower_cache.active()
+    async with get_async_session() as session:
+        result = await session.execute(
+            select(FollowerTable).where(FollowerTable.category != "disable")  # type: ignore[arg-type]
+        )
+        return [FollowerState.from_row(row) for row in result.scalars().all()]
+
+
 async def get_follower_snapshot(user_id: str) -> Optional[FollowerTable]:
     """
     获取单个用户信息快照（expire_on_commit=False 保证 session 关闭后仍可读取字段）。
@@ -75,6 +208,44 @@ async def get_follower_snapshot(user_id: str) -> Optional[FollowerTable]:
         return await session.get(FollowerTable, user_id)
 
 
+async def get_follower_state(user_id: str) -> Optional[FollowerState]:
+    """获取用户状态，缓存已加载时不查库"""
+    if follower_cache.loaded:
+        return follower_cache.get(user_id)
+    follower = await get_follower_snapshot(user_id)
+    return FollowerState.from_row(follower) if follower else None
+
+
+async def _record_post(session, user_id: str, content: TwitterContent, dt: datetime, target_chat_id: str, now: datetime):
+    media_snapshot_str = json.dumps(content.media_list) if content.media_list else None
+    history = SendHistory(
+        author=content.author,
+        content=content.content[:200] if content.content else "",  # type: ignore[index]
+        link=content.link,
+        media_snapshot=media_snapshot_str,
+        chat_id=str(target_chat_id),
+        create_time=dt,
+        send_time=now,
+    )
+    session.add(history)
+
+    stats = await session.get(AuthorStats, content.author)
+    if stats is None:
+        stats = AuthorStats(author=content.author, sent_count=0, first_send_time=now)
+    stats.sent_count += 1
+    stats.last_send_time = now
+    session.add(stats)
+
+    follower = await session.get(FollowerTable, user_id)
+    if follower and (follower.latest_post_datetime is None or dt >= follower.latest_post_datetime):
+        follower.latest_post_datetime = dt
+        follower.latest_post_link = content.link
+        follower.latest_send_datetime = now
+        session.add(follower)
+    return follower
+
+
+@traced("db.save_post_result")
 async def save_post_result(
         user_id: str,
         content: TwitterContent,
@@ -85,21 +256,58 @@ async def save_post_result(
     将成功发送的帖子写入 SendHistory，并更新 FollowerTable 状态。
     """
     async with get_async_session() as session:
-        media_snapshot_str = json.dumps(content.media_list) if content.media_list else None
-        history = SendHistory(
-            author=content.author,
-            content=content.content[:200] if content.content else "",  # type: ignore[index]
-            link=content.link,
-            media_snapshot=media_snapshot_str,
-            chat_id=str(target_chat_id),
-            create_time=dt,
-            send_time=datetime.now(),
+        follower = await _record_post(session, user_id, content, dt, target_chat_id, utcnow())
+    if follower is not None:
+        follower_cache.put(follower)
+
+
+@traced("db.save_post_results")
+async def save_post_results(items: List[Tuple[str, TwitterContent, datetime]], target_chat_id: str):
+    """
+    批量写入已发送的帖子（摘要模式），单个事务内完成，水位线只会向前推进。
+    :param items: (user_id, content, 发布时间) 列表
+    """
+    followers = {}
+    async with get_async_session() as session:
+        now = utcnow()
+        for user_id, content, dt in items:
+            follower = await _record_post(session, user_id, content, dt, target_chat_id, now)
+            if follower is not None:
+                followers[user_id] = follower
+    # 事务提交后再写缓存，回滚时缓存保持不变
+    for follower in followers.values():
+        follower_cache.put(follower)
+
+
+async def get_sent_links(links: List[str]) -> Set[str]:
+    """返回已经推送过的链接"""
+    if not links:
+        return set()
+    async with get_async_session() as session:
+        result = await session.execute(
+            select(SendHistory.link).where(SendHistory.link.in_(links))  # type: ignore[attr-defined]
         )
-        session.add(history)
+        return set(result.scalars().all())
 
+
+async def advance_watermark(user_id: str, dt: datetime, link: str):
+    """
+    只推进水位线，不写推送历史（用于被去重跳过的帖子）。
+    """
+    async with get_async_session() as session:
         follower = await session.get(FollowerTable, user_id)
-        if follower:
+        if follower and (follower.latest_post_datetime is None or dt >= follower.latest_post_datetime):
             follower.latest_post_datetime = dt
-            follower.latest_post_link = content.link
-            follower.latest_send_datetime = datetime.now()
+            follower.latest_post_link = link
             session.add(follower)
+    if follower is not None:
+        follower_cache.put(follower)
+
+
+async def get_author_stats(limit: int = 20) -> List[AuthorStats]:
+    """按推送数量倒序获取作者统计"""
+    async with get_async_session() as session:
+        result = await session.execute(
+            select(AuthorStats).order_by(AuthorStats.sent_count.desc()).limit(limit)  # type: ignore[attr-defined]
+        )
+        return result.scalars().all()
@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import delete, select, text
+from model.model import async_engine, get_async_session, SendHistory
+
+
+# ---------------------------------------------------------------------------
+# SendHistory 保留策略相关查询
+# ---------------------------------------------------------------------------
+
+async def get_row_cap_id(max_rows: int) -> Optional[int]:
+    """返回超出 max_rows 的最新一条记录 id（id 不大于它的记录需要清理），未超出时返回 None"""
+    async with get_async_session() as session:
+        result = await session.execute(
+            select(SendHistory.id).order_by(SendHistory.id.desc()).offset(max_rows).limit(1)  # type: ignore[union-attr]
+        )
+        return result.scalar_one_or_none()
+
+
+async def select_expired_batch(cutoff: datetime, cap_id: Optional[int], limit: int) -> List[SendHistory]:
+    """获取一批需要归档的记录：发送时间早于 cutoff，或 id 不大于 cap_id"""
+    condition = SendHistory.send_time < cutoff
+    if cap_id is not None:
+        condition = condition | (SendHistory.id <= cap_id)  # type: ignore[operator]
+    async with get_async_session() as session:
+        result = await session.execute(
+            select(SendHistory).where(condition).order_by(SendHistory.id).limit(limit)  # type: ignore[arg-type]
+        )
+        return result.scalars().all()
+
+
+async def delete_history_by_ids(ids: List[int]) -> int:
+    """按 id 批量删除，每批一个短事务，避免长时间持有写锁"""
+    if not ids:
+        return 0
+    async with get_async_session() as session:
+        result = await session.execute(delete(SendHistory).where(SendHistory.id.in_(ids)))  # type: ignore[union-attr]
+        return result.rowcount
+
+
+async def incremental_vacuum(pages: int = 0) -> None:
+    """
+    回收空闲页。首次调用时如果数据库不是 INCREMENTAL 模式，会切换模式并执行一次完整 VACUUM。
+    :param pages: 每次回收的页数，0 表示全部
+    """
+    async with async_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        mode = (await conn.execute(text("PRAGMA auto_vacuum"))).scalar_one()
+        if mode != 2:
+            await conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+            await conn.execute(text("VACUUM"))
+            return
+        await conn.execute(text(f"PRAGMA incremental_vacuum({int(pages)})" if pages else "PRAGMA incremental_vacuum"))
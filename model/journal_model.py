@@ -0,0 +1,88 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from model.model import get_async_session, FollowerFetchState, GroupRunState
+from utils.date_handler import utcnow
+
+
+# ---------------------------------------------------------------------------
+# 用户抓取日志
+# ---------------------------------------------------------------------------
+
+async def mark_attempt(user_id: str, when: Optional[datetime] = None):
+    """记录一次抓取尝试"""
+    async with get_async_session() as session:
+        state = await session.get(FollowerFetchState, user_id) or FollowerFetchState(user_id=user_id)
+        state.last_attempt_time = when or utcnow()
+        session.add(state)
+
+
+async def mark_result(user_id: str, success: bool, error: Optional[str] = None):
+    """记录抓取结果，失败时保留错误摘要"""
+    async with get_async_session() as session:
+        state = await session.get(FollowerFetchState, user_id) or FollowerFetchState(user_id=user_id)
+        if success:
+            state.last_success_time = utcnow()
+            state.last_error = None
+        else:
+            state.last_error = (error or "")[:500]
+        session.add(state)
+
+
+async def get_fetch_states(user_ids: List[str]) -> Dict[str, FollowerFetchState]:
+    """批量获取用户抓取日志"""
+    if not user_ids:
+        return {}
+    async with get_async_session() as session:
+        result = await session.execute(
+            select(FollowerFetchState).where(FollowerFetchState.user_id.in_(user_ids))  # type: ignore[attr-defined]
+        )
+        return {state.user_id: state for state in result.scalars().all()}
+
+
+# ---------------------------------------------------------------------------
+# 分组进度游标
+# ---------------------------------------------------------------------------
+
+async def get_group_runs() -> Dict[int, GroupRunState]:
+    """获取所有分组的最近一次运行进度"""
+    async with get_async_session() as session:
+        result = await session.execute(select(GroupRunState))
+        return {run.group_index: run for run in result.scalars().all()}
+
+
+async def start_group_run(group_index: int, scheduled_time: datetime, total: int) -> GroupRunState:
+    """
+    开始（或继续）一个分组的运行。
+    同一计划时间的未完成运行会保留原游标，实现断点续跑。
+    """
+    async with get_async_session() as session:
+        run = await session.get(GroupRunState, group_index)
+        if run is None or run.scheduled_time != scheduled_time:
+            run = run or GroupRunState(group_index=group_index, scheduled_time=scheduled_time)
+            run.scheduled_time = scheduled_time
+            run.cursor = 0
+            run.finished_time = None
+        run.total = total
+        session.add(run)
+        return run
+
+
+async def advance_group_cursor(group_index: int, cursor: int):
+    """更新分组进度游标"""
+    async with get_async_session() as session:
+        run = await session.get(GroupRunState, group_index)
+        if run:
+            run.cursor = cursor
+            session.add(run)
+
+
+async def finish_group_run(group_index: int):
+    """标记分组本轮运行完成"""
+    async with get_async_session() as session:
+        run = await session.get(GroupRunState, group_index)
+        if run:
+            run.cursor = run.total
+            run.finished_time = utcnow()
+            session.add(run)
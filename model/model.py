@@ -2,19 +2,61 @@ import os
 from contextlib import asynccontextmanager
 from typing import Optional, AsyncGenerator
 
-from sqlalchemy import Column, DateTime
+from sqlalchemy import Column, DateTime, create_engine, event, text
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlmodel import Field, SQLModel
-from datetime import datetime
+from datetime import datetime, timezone
+
+from utils.date_handler import utcnow
+from utils.logger import get_logger
 
 sqlite_file_name = "database.db"
 # 获取项目路径
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sqlite_async_url = f"sqlite+aiosqlite:///{project_root}/{sqlite_file_name}"
+# 同步连接地址，仅供 APScheduler 的 SQLAlchemyJobStore 使用
+sqlite_sync_url = f"sqlite:///{project_root}/{sqlite_file_name}"
+# 写锁被占用时等待的毫秒数，超时才报 database is locked
+SQLITE_BUSY_TIMEOUT_MS = 5000
 
 # 异步引擎：用于所有业务查询/写入
-async_engine = create_async_engine(sqlite_async_url, echo=True)
+# SQL 日志由 [logging] sql_echo 控制，经 utils.logger 的队列输出，不使用 echo=True 的同步 handler
+async_engine = create_async_engine(sqlite_async_url, echo=False)
 AsyncSessionFactory = async_sessionmaker(async_engine, expire_on_commit=False)
+# 同步引擎：APScheduler 任务库与异步引擎写同一个文件
+sqlite_sync_engine = create_engine(sqlite_sync_url)
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """WAL 允许读写并发，busy_timeout 让两个引擎争用写锁时等待而不是立即失败"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+event.listen(async_engine.sync_engine, "connect", _configure_sqlite)
+event.listen(sqlite_sync_engine, "connect", _configure_sqlite)
+
+logger = get_logger(__name__)
+
+
+class UTCDateTime(TypeDecorator):
+    """
+    以不带时区的 UTC 字符串存储，读取时恢复为带时区的 UTC datetime。
+    写入不带时区的值时视为 UTC。
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def process_result_value(self, value, dialect):
+        return value.replace(tzinfo=timezone.utc) if value is not None else None
 
 
 class FollowerTable(SQLModel, table=True):
@@ -32,9 +74,11 @@ class FollowerTable(SQLModel, table=True):
     # 上次最后发帖的link
     latest_post_link: Optional[str] = Field(default=None)
     # 标准化的datetime字段（用于数据库存储和比较）
-    latest_post_datetime: Optional[datetime] = Field(default=None, sa_column=Column(DateTime,nullable=True))
+    latest_post_datetime: Optional[datetime] = Field(default=None, sa_column=Column(UTCDateTime, nullable=True))
     # 上次发送的时间
-    latest_send_datetime: Optional[datetime] = Field(default=None, sa_column=Column(DateTime,nullable=True))
+    latest_send_datetime: Optional[datetime] = Field(default=None, sa_column=Column(UTCDateTime, nullable=True))
+    # 调度优先级：vip 走独立的高频轮询通道，normal 按分组每天轮询
+    priority: str = Field(default="normal")
 
     class Config:
         arbitrary_types_allowed = True
@@ -52,8 +96,204 @@ class SendHistory(SQLModel, table=True):
     link: str
     media_snapshot: Optional[str] = Field(default=None) # 快照字段
     chat_id: str
-    create_time: datetime
-    send_time: datetime = Field(default_factory=datetime.now)
+    create_time: datetime = Field(sa_column=Column(UTCDateTime, nullable=False))
+    send_time: datetime = Field(default_factory=utcnow, sa_column=Column(UTCDateTime, nullable=False))
+
+
+class DigestBuffer(SQLModel, table=True):
+    """
+    摘要模式分类的待发送帖子缓冲区，摘要送达后删除
+    """
+    __tablename__ = "digest_buffer"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    category: str = Field(index=True)
+    user_id: str
+    author: str
+    title: str
+    content: str
+    link: str = Field(unique=True)
+    media_snapshot: Optional[str] = Field(default=None)
+    publish_date: str
+    publish_time: datetime = Field(sa_column=Column(UTCDateTime, nullable=False))
+    create_time: datetime = Field(default_factory=utcnow, sa_column=Column(UTCDateTime, nullable=False))
+
+
+class AuthorStats(SQLModel, table=True):
+    """
+    按作者聚合的推送计数，SendHistory 归档删除后统计仍然可用
+    """
+    __tablename__ = "author_stats"
+
+    author: str = Field(primary_key=True)
+    sent_count: int = Field(default=0)
+    first_send_time: Optional[datetime] = Field(default=None, sa_column=Column(UTCDateTime, nullable=True))
+    last_send_time: Optional[datetime] = Field(default=None, sa_column=Column(UTCDateTime, nullable=True))
+
+
+class FollowerFetchState(SQLModel, table=True):
+    """
+    每个关注用户的抓取日志：最近一次尝试/成功的时间，用于重启后断点续跑
+    """
+    __tablename__ = "follower_fetch_state"
+
+    user_id: str = Field(primary_key=True)
+    last_attempt_time: Optional[datetime] = Field(default=None, sa_column=Column(UTCDateTime, nullable=True))
+    last_success_time: Optional[datetime] = Field(default=None, sa_column=Column(UTCDateTime, nullable=True))
+    last_error: Optional[str] = Field(default=None)
+
+
+class GroupRunState(SQLModel, table=True):
+    """
+    每个调度分组最近一次运行的进度游标
+    """
+    __tablename__ = "group_run_state"
+
+    group_index: int = Field(primary_key=True)
+    # 本轮运行对应的计划触发时间
+    scheduled_time: datetime = Field(sa_column=Column(UTCDateTime, nullable=False))
+    # 已处理的用户数
+    cursor: int = Field(default=0)
+    total: int = Field(default=0)
+    finished_time: Optional[datetime] = Field(default=None, sa_column=Column(UTCDateTime, nullable=True))
+
+
+class ContentFingerprint(SQLModel, table=True):
+    """
+    已推送内容的指纹（媒体 ID / 规范化媒体 URL / 文本 shingle 哈希），用于跨用户去重
+    """
+    __tablename__ = "content_fingerprint"
+
+    fingerprint: str = Field(primary_key=True)
+    user_id: str
+    author: str
+    link: str
+    send_time: datetime = Field(sa_column=Column(UTCDateTime, nullable=False, index=True))
+
+
+class BackfillJob(SQLModel, table=True):
+    """
+    补推任务：按用户或分类重新抓取并补发 since 之后漏发的帖子，cursor 记录已完成的用户数以便断点续跑
+    """
+    __tablename__ = "backfill_job"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # 用户 ID 或分类名
+    target: str
+    since: datetime = Field(sa_column=Column(UTCDateTime, nullable=False))
+    # JSON 数组，创建任务时确定的用户列表
+    user_ids: str
+    # pending / running / done / failed
+    status: str = Field(default="pending", index=True)
+    cursor: int = Field(default=0)
+    sent_count: int = Field(default=0)
+    skipped_count: int = Field(default=0)
+    error_count: int = Field(default=0)
+    last_error: Optional[str] = Field(default=None)
+    create_time: datetime = Field(default_factory=utcnow, sa_column=Column(UTCDateTime, nullable=False))
+    update_time: datetime = Field(default_factory=utcnow, sa_column=Column(UTCDateTime, nullable=False))
+
+
+class FeedStatsSnapshot(SQLModel, table=True):
+    """
+    每个订阅最近若干次抓取的滚动统计，由内存中的环形缓冲定期写入
+    """
+    __tablename__ = "feed_stats"
+
+    user_id: str = Field(primary_key=True)
+    samples: int = Field(default=0)
+    avg_latency_ms: Optional[float] = Field(default=None)
+    p95_latency_ms: Optional[float] = Field(default=None)
+    avg_payload_bytes: Optional[int] = Field(default=None)
+    avg_items: Optional[float] = Field(default=None)
+    new_items_per_poll: Optional[float] = Field(default=None)
+    # 连续失败次数
+    error_streak: int = Field(default=0)
+    errors_total: int = Field(default=0)
+    last_error: Optional[str] = Field(default=None)
+    update_time: datetime = Field(default_factory=utcnow, sa_column=Column(UTCDateTime, nullable=False))
+
+
+# 数据库结构版本（PRAGMA user_version）
+SCHEMA_VERSION = 3
+
+# 版本 1 之前按本地时间 datetime.now() 写入的列；帖子发布时间（解析自 GMT 的 pubDate）本来就是 UTC
+_LOCAL_TIME_COLUMNS = {
+    "follower_table": ("latest_send_datetime",),
+    "send_history": ("send_time",),
+    "digest_buffer": ("create_time",),
+    "author_stats": ("first_send_time", "last_send_time"),
+    "follower_fetch_state": ("last_attempt_time", "last_success_time"),
+    "group_run_state": ("scheduled_time", "finished_time"),
+    "content_fingerprint": ("send_time",),
+    "backfill_job": ("create_time", "update_time"),
+    "feed_stats": ("update_time",),
+}
+
+
+def _local_to_utc(value: str) -> str:
+    # 不带时区的 datetime.astimezone() 按本机时区解释
+    dt = datetime.fromisoformat(value).astimezone(timezone.utc)
+    return dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _migrate_to_utc(sync_conn):
+    """一次性把本地时间列转换为 UTC，使用当前进程的时区（与写入这些数据的进程相同时才准确）"""
+    tables = set(sync_conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'").scalars())
+    converted = 0
+    for table, columns in _LOCAL_TIME_COLUMNS.items():
+        if table not in tables:
+            continue
+        for column in columns:
+            rows = sync_conn.exec_driver_sql(
+                f"SELECT rowid, {column} FROM {table} WHERE {column} IS NOT NULL").all()
+            if rows:
+                sync_conn.exec_driver_sql(
+                    f"UPDATE {table} SET {column} = ? WHERE rowid = ?",
+                    [(_local_to_utc(value), rowid) for rowid, value in rows],
+                )
+                converted += len(rows)
+    return converted
+
+
+def _add_follower_priority(sync_conn):
+    """create_all 不会给已有的表加列"""
+    columns = {row[1] for row in sync_conn.exec_driver_sql("PRAGMA table_info(follower_table)")}
+    if columns and "priority" not in columns:
+        sync_conn.exec_driver_sql("ALTER TABLE follower_table ADD COLUMN priority VARCHAR NOT NULL DEFAULT 'normal'")
+        logger.info("Added follower_table.priority column.")
+
+
+def _seed_author_stats(sync_conn):
+    """
+    用现有 SendHistory 初始化 author_stats。升级后的推送可能已经写入了部分计数，
+    与历史聚合合并时取较大的计数和更早/更晚的时间，不会重复累加。
+    """
+    sync_conn.exec_driver_sql(
+        "INSERT INTO author_stats (author, sent_count, first_send_time, last_send_time) "
+        "SELECT author, COUNT(*), MIN(send_time), MAX(send_time) FROM send_history WHERE true GROUP BY author "
+        "ON CONFLICT(author) DO UPDATE SET "
+        "sent_count = MAX(author_stats.sent_count, excluded.sent_count), "
+        "first_send_time = MIN(COALESCE(author_stats.first_send_time, excluded.first_send_time), excluded.first_send_time), "
+        "last_send_time = MAX(COALESCE(author_stats.last_send_time, excluded.last_send_time), excluded.last_send_time)"
+    )
+
+
+async def init_db():
+    """创建缺失的数据表，并按 user_version 执行一次性数据迁移"""
+    async with async_engine.begin() as conn:
+        version = (await conn.execute(text("PRAGMA user_version"))).scalar_one()
+        if version < 1:
+            converted = await conn.run_sync(_migrate_to_utc)
+            if converted:
+                logger.info("Migrated %d local timestamps to UTC.", converted)
+        if version < 2:
+            await conn.run_sync(_add_follower_priority)
+        await conn.run_sync(SQLModel.metadata.create_all)
+        if version < 3:
+            await conn.run_sync(_seed_author_stats)
+        if version < SCHEMA_VERSION:
+            await conn.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
 
 
 @asynccontextmanager
@@ -0,0 +1,200 @@
+"""
+补推任务：重新抓取指定用户或分类，补发 since 之后漏发的帖子。
+
+- 已在 send_history 中的链接会被跳过，任务中断后重跑不会重复发送；
+- 与实时推送共用跨用户去重索引：已经通过其他用户推送过的内容会被跳过，补推的内容也会被记录；
+- 只能补推订阅源当前返回的条目（RSSHub 通常只返回最近约 20 条），更早的帖子无法补推；
+- 发送经过 send_gate 的 BACKFILL 通道：实时推送优先，且按 [backfill] rate_per_minute 限速；
+- 每处理完一个用户推进 cursor，服务重启后未完成的任务从断点继续。
+"""
+import asyncio
+import json
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from model import backfill_model, follower_model
+from model.model import BackfillJob
+from scheduler.scheduler import follower_lock
+from strategy.dedup import content_fingerprints, dedup_index
+from strategy.filters import get_filter_engine
+from strategy.strategy_factory import get_strategy
+from tg_func.message_sender import send_twitter_content
+from tg_func.send_gate import BACKFILL, send_gate
+from utils.config_manager import get_settings
+from utils.date_handler import DateHandler
+from utils.logger import get_logger, log_context
+from utils.metrics import metrics
+from utils.telegram_client import get_target_chat_id, get_telegram_bot
+
+logger = get_logger(__name__)
+
+_RELATIVE_RE = re.compile(r"^(\d+)([mhd])$")
+_UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+
+_tasks: Dict[int, asyncio.Task] = {}
+
+# 补推的覆盖范围说明，随 Bot 回复和 API 响应返回
+WINDOW_NOTE = "补推只覆盖订阅源当前返回的条目（通常为最近约 20 条），更早的帖子无法补推"
+
+
+def parse_since(value: str) -> datetime:
+    """
+    解析起始时间：相对时间（30m / 6h / 2d）或 ISO 格式（2024-01-01、2024-01-01T08:00）。
+    返回 UTC 时间，ISO 格式未带时区时按 UTC 解释。
+    """
+    value = value.strip()
+    now = DateHandler.utcnow()
+    # 只有相对时间不区分大小写；ISO 格式原样解析（小写的 t / z 无法被 fromisoformat 识别）
+    match = _RELATIVE_RE.match(value.lower())
+    if match:
+        return now - timedelta(**{_UNITS[match.group(2)]: int(match.group(1))})
+    return DateHandler.ensure_utc(datetime.fromisoformat(value))
+
+
+async def _resolve_user_ids(target: str) -> List[str]:
+    """目标是已关注的用户 ID 时只补推该用户，否则视为分类名"""
+    follower = await follower_model.get_follower_snapshot(target)
+    if follower is not None:
+        return [follower.user_id]
+    return [f.user_id for f in await follower_model.select_follower_by_category(target)]
+
+
+async def start_backfill(target: str, since: datetime) -> BackfillJob:
+    """创建补推任务并在后台运行，目标不存在时抛出 ValueError"""
+    user_ids = await _resolve_user_ids(target)
+    if not user_ids:
+        raise ValueError(f"未找到用户或分类: {target}")
+    job = await backfill_model.create_job(target, since, user_ids)
+    logger.info("Backfill job %d created: %s since %s (%d users)", job.id, target, since, len(user_ids))
+    _spawn(job.id)
+    return job
+
+
+async def resume_backfills():
+    """服务启动时继续运行未完成的补推任务"""
+    for job in await backfill_model.get_unfinished_jobs():
+        logger.info("Resuming backfill job %d at %d/%d", job.id, job.cursor, len(json.loads(job.user_ids)))
+        _spawn(job.id)
+
+
+async def stop_backfills():
+    """服务关闭时取消正在运行的任务，状态保持 running，下次启动继续"""
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _spawn(job_id: int):
+    if job_id in _tasks:
+        return
+    task = asyncio.create_task(_run_backfill(job_id), name=f"backfill_{job_id}")
+    _tasks[job_id] = task
+    task.add_done_callback(lambda _: _tasks.pop(job_id, None))
+
+
+async def _run_backfill(job_id: int):
+    job = await backfill_model.update_job(job_id, status="running")
+    if job is None:
+        return
+    user_ids = json.loads(job.user_ids)
+    bot = get_telegram_bot()
+    strategy = get_strategy()
+
+    with log_context(backfill=job_id):
+        try:
+            for index in range(job.cursor, len(user_ids)):
+                user_id = user_ids[index]
+                sent = skipped = errors = 0
+                error = None
+                try:
+                    sent, skipped = await _backfill_user(user_id, job.since, bot, strategy)
+                except Exception as e:
+                    logger.error("Backfill failed for %s: %s", user_id, e)
+                    errors, error = 1, f"{user_id}: {e}"[:500]
+                fields = {"cursor": index + 1, "sent": sent, "skipped": skipped, "errors": errors}
+                if error:
+                    fields["last_error"] = error
+                job = await backfill_model.update_job(job_id, **fields)
+        except asyncio.CancelledError:
+            # 服务关闭：保留 running 状态，下次启动从 cursor 继续
+            raise
+        except Exception as e:
+            logger.error("Backfill job %d aborted: %s", job_id, e)
+            await backfill_model.update_job(job_id, status="failed", last_error=str(e)[:500])
+            return
+
+        await backfill_model.update_job(job_id, status="done")
+        logger.info("Backfill job %d finished: sent=%d skipped=%d errors=%d",
+                    job_id, job.sent_count, job.skipped_count, job.error_count)
+
+
+async def _backfill_user(user_id: str, since: datetime, bot, strategy) -> Tuple[int, int]:
+    """补推单个用户，返回 (发送数, 跳过数)"""
+    async with follower_lock(user_id):
+        follower = await follower_model.get_follower_state(user_id)
+        if follower is None or follower.category == "disable":
+            return 0, 0
+
+        with log_context(user_id=user_id, stage="fetch"):
+            contents = await strategy.get_new_media(user_id)
+        contents = get_filter_engine().apply(contents, user_id, follower.category or "Uncategorized")
+
+        posts = []
+        oldest = None
+        for content in contents:
+            dt = DateHandler.parse_rfc2822(content.publish_date)
+            if dt:
+                oldest = dt if oldest is None else min(oldest, dt)
+            if dt and dt >= since:
+                posts.append((content, dt))
+        posts.sort(key=lambda x: x[1])
+        if oldest is not None and oldest > since:
+            # 订阅源窗口没有覆盖到 since，之间的帖子已经无法取回
+            metrics.inc("backfill.window_truncated")
+            logger.warning("Backfill for %s only reaches back to %s (requested %s).", user_id, oldest, since)
+
+        settings = get_settings()
+        sent_links = await follower_model.get_sent_links([c.link for c, _ in posts])
+        sent = 0
+        for content, dt in posts:
+            if content.link in sent_links:
+                continue
+            fingerprints = content_fingerprints(content) if settings.dedup_enabled else []
+            if await dedup_index.find(fingerprints) is not None:
+                metrics.inc("backfill.dedup_skipped")
+                continue
+            target_chat_id = get_target_chat_id()
+            async with send_gate.lane(BACKFILL, get_settings().backfill_rate_per_minute):
+                await send_twitter_content(bot, content, target_chat_id, category=follower.category,
+                                           post_time=DateHandler.format_notify(dt, target_chat_id))
+            await follower_model.save_post_result(user_id, content, dt, str(target_chat_id))
+            await dedup_index.remember(fingerprints, user_id, content)
+            metrics.inc("backfill.sent")
+            sent += 1
+        return sent, len(posts) - sent
+
+
+def describe(job: BackfillJob) -> Dict:
+    """任务进度摘要，供 Bot 命令和 API 使用"""
+    total = len(json.loads(job.user_ids))
+    return {
+        "id": job.id,
+        "target": job.target,
+        "since": job.since,
+        "status": job.status,
+        "progress": f"{job.cursor}/{total}",
+        "sent": job.sent_count,
+        "skipped": job.skipped_count,
+        "errors": job.error_count,
+        "last_error": job.last_error,
+        "create_time": job.create_time,
+        "update_time": job.update_time,
+        "note": WINDOW_NOTE,
+    }
+
+
+async def get_job_status(job_id: int) -> Optional[Dict]:
+    job = await backfill_model.get_job(job_id)
+    return describe(job) if job else None
@@ -0,0 +1,38 @@
+from model import digest_model, follower_model
+from utils.config_manager import get_settings
+from utils.date_handler import DateHandler
+from utils.logger import get_logger
+from utils.telegram_client import get_telegram_bot, get_target_chat_id, send_error_notification
+from tg_func.message_sender import send_digest
+
+logger = get_logger(__name__)
+
+
+async def flush_digests():
+    """
+    把缓冲区中各分类的帖子合并成一条摘要发送。
+    只有摘要送达后才写入 SendHistory、推进水位线并清空对应缓冲记录；发送失败时保留缓冲，下个窗口重试。
+    """
+    grouped = await digest_model.get_buffered_posts()
+    if not grouped:
+        return
+
+    bot = get_telegram_bot()
+    target_chat_id = get_target_chat_id()
+    mode = get_settings().digest_mode
+
+    for category, rows in grouped.items():
+        posts = [(digest_model.to_content(row), DateHandler.format_notify(row.publish_time, target_chat_id)) for row in rows]
+        try:
+            await send_digest(bot, target_chat_id, category, posts, mode)
+        except Exception as e:
+            logger.error("Digest delivery failed for #%s (%d posts): %s", category, len(rows), e)
+            await send_error_notification(bot, f"摘要发送失败 #{category}\n错误: {e}")
+            continue
+
+        await follower_model.save_post_results(
+            [(row.user_id, content, row.publish_time) for row, (content, _) in zip(rows, posts)],
+            str(target_chat_id),
+        )
+        await digest_model.delete_buffered([row.id for row in rows])
+        logger.info("Digest delivered for #%s: %d posts.", category, len(rows))
@@ -0,0 +1,59 @@
+"""
+订阅统计落库与报表：内存中的环形缓冲定期写入 feed_stats 表，
+报表合并数据库中的历史摘要与内存中的最新摘要，列出最慢、最大、最活跃和持续失败的订阅。
+"""
+from typing import Any, Dict, List
+
+from model import feed_stats_model
+from utils.feed_stats import feed_stats
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+async def load_feed_stats():
+    """启动时载入落库的摘要，作为各订阅统计的基线，避免重启后的第一次落库覆盖历史计数"""
+    try:
+        feed_stats.seed({
+            row.user_id: row.model_dump(exclude={"user_id", "update_time"})
+            for row in await feed_stats_model.get_feed_stats()
+        })
+    except Exception as e:
+        logger.error(f"Failed to load feed stats: {e}")
+
+
+async def flush_feed_stats():
+    """把上次落库后有变化的订阅统计写入数据库"""
+    summaries = feed_stats.pop_dirty()
+    if not summaries:
+        return
+    try:
+        await feed_stats_model.save_feed_stats(summaries)
+        logger.debug("Flushed stats for %d feeds.", len(summaries))
+    except Exception as e:
+        # 重新标记，下次落库时写入最新摘要，避免这段时间的变化丢失
+        feed_stats.mark_dirty(summaries)
+        logger.error(f"Failed to flush feed stats: {e}")
+
+
+def _top(summaries: Dict[str, Dict[str, Any]], key: str, top_n: int) -> List[Dict[str, Any]]:
+    ranked = sorted(
+        ((user_id, summary[key]) for user_id, summary in summaries.items() if summary.get(key)),
+        key=lambda item: item[1], reverse=True,
+    )
+    return [{"user_id": user_id, key: value} for user_id, value in ranked[:top_n]]
+
+
+async def build_feed_report(top_n: int = 10) -> Dict[str, Any]:
+    summaries: Dict[str, Dict[str, Any]] = {
+        row.user_id: row.model_dump(exclude={"user_id", "update_time"})
+        for row in await feed_stats_model.get_feed_stats()
+    }
+    summaries.update(feed_stats.summaries())
+    return {
+        "feeds": len(summaries),
+        "slowest": _top(summaries, "p95_latency_ms", top_n),
+        "largest": _top(summaries, "avg_payload_bytes", top_n),
+        "noisiest": _top(summaries, "new_items_per_poll", top_n),
+        "failing": _top(summaries, "error_streak", top_n),
+    }
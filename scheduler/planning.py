@@ -0,0 +1,52 @@
+"""
+调度规划的纯函数：调度通道、分组、触发时间和跳过判断。
+不依赖数据库和 APScheduler，调度器与模拟脚本（benchmarks/sim_scheduler.py）共用同一套逻辑。
+"""
+import zlib
+from datetime import datetime, timedelta
+from typing import AbstractSet, List, Optional, Sequence, Tuple
+
+# (组内用户 ID, 组序号, 触发小时)
+GroupPlan = Tuple[List[str], int, int]
+
+# 调度通道：VIP 用户单独高频轮询，其余用户按分组每天轮询
+VIP = "vip"
+NORMAL = "normal"
+PRIORITIES = (VIP, NORMAL)
+
+
+def lane_of(follower, vip_categories: AbstractSet[str]) -> str:
+    """用户自身设置为 vip，或所在分类在 [priority] vip_categories 中时走 VIP 通道"""
+    return VIP if follower.priority == VIP or follower.category in vip_categories else NORMAL
+
+
+def group_of(user_id: str, num_groups: int) -> int:
+    """
+    用户所属的组序号，只由 user_id 和分组数决定（crc32，不受 PYTHONHASHSEED 影响）。
+    白天增删用户、修改分类或优先级都不会让其他用户换组，不会漏跑或同一天被轮询两次。
+    """
+    return zlib.crc32(user_id.encode("utf-8")) % num_groups
+
+
+def plan_groups(user_ids: Sequence[str], num_groups: int) -> List[GroupPlan]:
+    """把用户按 group_of 分为 num_groups 组（组内保持原顺序），每组间隔 24 // num_groups 小时触发"""
+    if not user_ids:
+        return []
+    hour_interval = max(1, 24 // num_groups)
+    members: List[List[str]] = [[] for _ in range(num_groups)]
+    for user_id in user_ids:
+        members[group_of(user_id, num_groups)].append(user_id)
+    return [(group_ids, i, (i * hour_interval) % 24) for i, group_ids in enumerate(members)]
+
+
+def last_trigger_time(trigger_hour: int, now: datetime) -> datetime:
+    """返回不晚于 now 的最近一次计划触发时间（cron 按本机时区触发，now 应为带时区的本地时间）"""
+    trigger = now.replace(hour=trigger_hour, minute=0, second=0, microsecond=0)
+    if trigger > now:
+        trigger -= timedelta(days=1)
+    return trigger
+
+
+def checked_recently(latest_send: Optional[datetime], now: datetime, skip_seconds: float) -> bool:
+    """距上次推送不足 skip_seconds 秒的用户本轮跳过"""
+    return latest_send is not None and now - latest_send < timedelta(seconds=skip_seconds)
@@ -0,0 +1,59 @@
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from typing import List
+
+from model import history_model
+from model.model import SendHistory
+from utils.config_manager import get_settings
+from utils.date_handler import DateHandler
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _append_archive(path: str, rows: List[SendHistory]):
+    """把一批记录以 JSON Lines 追加写入 gzip 文件（在线程中执行）"""
+    with gzip.open(path, "at", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row.model_dump(), ensure_ascii=False, default=str) + "\n")
+
+
+async def run_retention():
+    """
+    SendHistory 保留任务（author_stats 已在 init_db 的迁移中根据历史记录初始化）：
+    1. 按 max_age_days / max_rows 分批选出旧记录，先归档到 gzip JSONL，再按 id 删除；
+    2. 执行 incremental vacuum 回收空间。
+    """
+    settings = get_settings()
+    if not settings.retention_enabled:
+        return
+
+    cutoff = DateHandler.utcnow() - timedelta(days=settings.retention_max_age_days)
+    cap_id = await history_model.get_row_cap_id(settings.retention_max_rows) if settings.retention_max_rows else None
+
+    os.makedirs(settings.retention_archive_dir, exist_ok=True)
+    archive_path = os.path.join(
+        settings.retention_archive_dir, f"send_history_{datetime.now():%Y%m%d_%H%M%S}.jsonl.gz"
+    )
+
+    total = 0
+    while True:
+        rows = await history_model.select_expired_batch(cutoff, cap_id, settings.retention_batch_size)
+        if not rows:
+            break
+        await asyncio.to_thread(_append_archive, archive_path, rows)
+        total += await history_model.delete_history_by_ids([row.id for row in rows])
+        if len(rows) < settings.retention_batch_size:
+            break
+        # 批次之间让出写锁，避免阻塞正常的推送写入
+        await asyncio.sleep(settings.retention_batch_pause_seconds)
+
+    if not total:
+        logger.info("Retention: nothing to archive.")
+        return
+
+    await history_model.incremental_vacuum()
+    logger.info(f"Retention: archived and deleted {total} send_history rows to {archive_path}.")
@@ -1,28 +1,65 @@
-import math
+from __future__ import annotations
+
 from contextlib import asynccontextmanager
-from typing import List, Tuple
+from typing import TYPE_CHECKING, AbstractSet, Dict, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
 
-from sqlmodel import SQLModel
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from fastapi import FastAPI
 
-from model.model import async_engine, FollowerTable
-from model import follower_model
+from model.model import init_db
+from model import digest_model, follower_model, journal_model
+from model.follower_cache import FollowerState, follower_cache
 from strategy.context import TwitterContent
-from strategy.rss_parse import RssStrategy
+from strategy.dedup import content_fingerprints, dedup_index
+from strategy.filters import get_filter_engine
 from strategy.strategy_factory import get_strategy
 from utils.date_handler import DateHandler
-from tg_func.message_sender import send_twitter_content
-from tg_func.commands_handller import setup_commands
-from utils.config_manager import get_config
-from utils.logger import get_logger
+from tg_func.message_sender import send_duplicate_note, send_twitter_content
+from tg_func.media_probe import close_probe_client
+from tg_func.send_gate import LIVE, VIP as VIP_PRIORITY, send_gate
+from scheduler.digest import flush_digests
+from scheduler.feed_stats import flush_feed_stats, load_feed_stats
+from scheduler.planning import (NORMAL, VIP, GroupPlan, checked_recently, group_of, lane_of, last_trigger_time,
+                                plan_groups)
+from scheduler.retention import run_retention
+from utils.config_manager import ConfigError, ConfigWatcher, Settings, add_reload_listener, get_settings
+from utils.logger import get_logger, log_context
+from utils.clock import get_clock
+from utils.loop_monitor import loop_monitor
+from utils.mem_profile import mem_profiler
+from utils.cpu_pool import configure_cpu_pool, shutdown_cpu_pool
+from utils.feed_stats import feed_stats
+from utils.metrics import metrics
+from utils.tracing import configure_tracing, shutdown_tracing, span
 from utils.telegram_client import get_telegram_bot, get_telegram_application, send_error_notification, get_target_chat_id
-from telegram import Bot
 import asyncio
+import time
+import weakref
+
+if TYPE_CHECKING:
+    # 仅用于类型标注，避免导入本模块时加载 FastAPI / PTB / httpx
+    from fastapi import FastAPI
+    from telegram import Bot
+    from telegram.ext import Application
+    from strategy.rss_parse import RssStrategy
 
 logger = get_logger(__name__)
 scheduler = AsyncIOScheduler()
+config_watcher = ConfigWatcher()
+# 正在运行的分组，防止定时任务与补跑任务重复执行同一组
+_running_groups: Set[int] = set()
+
+# 每个用户一把锁，防止多个任务同时处理同一用户导致重复发送
+_follower_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+# 变更后需要重新分组的配置项
+_SCHEDULE_FIELDS = ("num_groups", "misfire_grace_seconds", "vip_categories")
+
+# VIP 通道在分组进度日志中使用的组序号（普通分组从 0 开始）
+VIP_GROUP = -1
+
+# 各通道的用户列表，按 (关注用户缓存 version, vip_categories) 失效，缓存未变化时不重新筛选
+_lane_user_ids: Dict[str, Tuple[Tuple[int, frozenset], List[str]]] = {}
 
 
 # ---------------------------------------------------------------------------
@@ -31,126 +68,392 @@ scheduler = AsyncIOScheduler()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with async_engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
-
-    # Initialize Telegram Bot Application
+    settings = get_settings()
+    settings.apply_logging()
+    configure_tracing(settings.tracing_exporter, settings.tracing_file, settings.tracing_otlp_endpoint)
+    configure_cpu_pool(settings.parse_mode, settings.parse_workers)
+
+    loop_monitor.configure(settings.loop_monitor_interval, settings.loop_slow_threshold, settings.asyncio_debug)
+    if settings.loop_monitor_enabled:
+        loop_monitor.start(settings.loop_monitor_interval, settings.loop_slow_threshold, settings.asyncio_debug)
+    if settings.memory_profile:
+        mem_profiler.start(settings.memory_profile_frames)
+
+    started = time.perf_counter()
     tg_app = get_telegram_application()
-    await tg_app.initialize()
+
+    # 建表/迁移与 Bot 的 initialize（getMe）互不依赖，并发执行；任一失败时关闭另一侧再抛出
+    results = await asyncio.gather(init_db(), tg_app.initialize(), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        await tg_app.shutdown()
+        raise errors[0]
+    # 数据库结构就绪后才开始接收命令，避免启动期间的命令访问旧表结构
+    await _start_bot(tg_app)
+    logger.info("Database and bot ready in %.2fs", time.perf_counter() - started)
+
+    # 在任何轮询开始前载入已落库的订阅统计，作为各订阅的基线
+    feed_stats.set_window(settings.stats_window)
+    await load_feed_stats()
+
+    # 启动定时任务（持久化任务库中已有的任务会按 coalesce / misfire 规则处理停机期间错过的触发）
+    _configure_scheduler(settings)
+    scheduler.start()
+
+    # 注册命令菜单（网络请求）与初始化分组任务（数据库查询）同样可以并发
+    from tg_func.commands_handller import setup_commands
+    await asyncio.gather(setup_commands(tg_app), refresh_daily_scheduler())
+    logger.info("Startup finished in %.2fs", time.perf_counter() - started)
+
+    # 每天 23:50 (默认) 重新分配明天的任务，避开 0 点的执行高峰
+    # 固定 ID + replace_existing：重启时覆盖任务库中的同名任务，不会重复创建
+    scheduler.add_job(
+        refresh_daily_scheduler, 'cron',
+        hour=settings.daily_refresh_hour, minute=settings.daily_refresh_minute, id='daily_refresh',
+        replace_existing=True
+    )
+
+    # SendHistory 归档清理，默认关闭，开启后每天 retention_hour 点执行
+    scheduler.add_job(run_retention, 'cron', hour=settings.retention_hour, minute=30, id='retention',
+                      replace_existing=True)
+
+    # 摘要模式分类按窗口合并发送
+    scheduler.add_job(flush_digests, 'interval', minutes=settings.digest_window_minutes, id='digest_flush',
+                      replace_existing=True)
+
+    # 订阅统计定期落库
+    scheduler.add_job(flush_feed_stats, 'interval', minutes=settings.stats_flush_minutes, id='feed_stats_flush',
+                      replace_existing=True)
+
+    # VIP 通道独立于分组，每 vip_interval_minutes 分钟轮询一次
+    scheduler.add_job(run_vip_lane, 'interval', minutes=settings.vip_interval_minutes, id='vip_poll',
+                      replace_existing=True)
+
+    # 配置热更新：文件变更或 /reload 命令都会触发 _on_config_reload
+    add_reload_listener(_on_config_reload)
+    config_watcher.start()
+
+    # 继续运行上次未完成的补推任务
+    from scheduler.backfill import resume_backfills, stop_backfills
+    await resume_backfills()
+
+    yield
+
+    await stop_backfills()
+    await config_watcher.stop()
+    await flush_feed_stats()
+    await close_probe_client()
+    shutdown_cpu_pool()
+    await loop_monitor.stop()
+    mem_profiler.stop()
+    shutdown_tracing()
+
+    # Stop Telegram Bot Application
+    if tg_app.updater.running:
+        await tg_app.updater.stop()
+    await tg_app.stop()
+    await tg_app.shutdown()
+
+    scheduler.shutdown()
+
+
+def _configure_scheduler(settings: Settings):
+    """
+    任务库与任务默认策略，只能在 scheduler.start() 之前设置（修改后需重启生效）：
+    - sqlalchemy：任务保存在 database.db 的 apscheduler_jobs 表，重启后保留下次触发时间。
+      任务库是同步的，在事件循环线程中读写（每次只涉及几行）；与 aiosqlite 的写入通过 WAL 和 busy_timeout 协调，
+      写锁被占用时最多阻塞事件循环 busy_timeout 毫秒；
+    - memory：每次启动重新创建。
+    """
+    jobstores = {}
+    if settings.job_store == "sqlalchemy":
+        from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+        from model.model import sqlite_sync_engine
+
+        jobstores["default"] = SQLAlchemyJobStore(engine=sqlite_sync_engine, tablename="apscheduler_jobs")
+    elif settings.job_store != "memory":
+        logger.warning(f"Unknown job_store '{settings.job_store}', falling back to memory.")
+    scheduler.configure(
+        jobstores=jobstores,
+        job_defaults={"coalesce": settings.job_coalesce, "max_instances": settings.job_max_instances},
+    )
+
+
+async def _start_bot(tg_app: Application):
+    """
+    启动已 initialize 的 Telegram Bot Application，并按 update_mode 开始接收命令：
+    - polling：长轮询；
+    - webhook：向 Telegram 注册 webhook，Update 由 api.telegram_webhook 写入更新队列。
+    失败时停止并关闭 Application，不留下半启动的状态。
+    """
     await tg_app.start()
+    try:
+        await _start_receiving(tg_app)
+    except BaseException:
+        await tg_app.stop()
+        await tg_app.shutdown()
+        raise
+
+
+async def _start_receiving(tg_app: Application):
+    settings = get_settings()
+    if settings.telegram_update_mode == "webhook":
+        if not settings.webhook_url or not settings.webhook_secret:
+            raise ConfigError("[telegram] update_mode = webhook 时必须配置 webhook_url 和 webhook_secret")
+        await tg_app.bot.set_webhook(
+            url=settings.webhook_url,
+            secret_token=settings.webhook_secret,
+            drop_pending_updates=True,
+        )
+        logger.info(f"Webhook registered: {settings.webhook_url}")
+        return
+
+    # 从 webhook 切回轮询时需要先删除已注册的 webhook
+    await tg_app.bot.delete_webhook(drop_pending_updates=True)
     # timeout 缩短为 10s，避免长轮询被代理超时掐断
     try:
         await tg_app.updater.start_polling(drop_pending_updates=True, timeout=10, poll_interval=2)
     except Exception as e:
         logger.error(f"Polling 启动失败: {e}")
         raise
-    await setup_commands(tg_app)
 
-    # 启动定时任务
-    scheduler.start()
 
-    # 初始化任务
-    await refresh_daily_scheduler()
+def _on_config_reload(old: Settings, new: Settings):
+    """配置变更回调：重新应用日志配置，按需调整每日刷新时间并重新分组。"""
+    new.apply_logging()
+    configure_cpu_pool(new.parse_mode, new.parse_workers)
+    loop_monitor.configure(new.loop_monitor_interval, new.loop_slow_threshold, new.asyncio_debug)
+    if new.loop_monitor_enabled and not old.loop_monitor_enabled:
+        loop_monitor.start(new.loop_monitor_interval, new.loop_slow_threshold, new.asyncio_debug)
+    elif old.loop_monitor_enabled and not new.loop_monitor_enabled:
+        asyncio.get_running_loop().create_task(loop_monitor.stop())
+    if new.memory_profile and not old.memory_profile:
+        mem_profiler.start(new.memory_profile_frames)
+    elif old.memory_profile and not new.memory_profile:
+        mem_profiler.stop()
+
+    if (old.daily_refresh_hour, old.daily_refresh_minute) != (new.daily_refresh_hour, new.daily_refresh_minute):
+        scheduler.reschedule_job(
+            'daily_refresh', trigger='cron',
+            hour=new.daily_refresh_hour, minute=new.daily_refresh_minute
+        )
+        logger.info(f"Daily refresh rescheduled to {new.daily_refresh_hour:02d}:{new.daily_refresh_minute:02d}.")
 
-    # 获取每日刷新时间配置
-    refresh_hour = get_config("base", "daily_refresh_hour", fallback=23, cast=int)
-    refresh_minute = get_config("base", "daily_refresh_minute", fallback=50, cast=int)
+    if old.digest_window_minutes != new.digest_window_minutes:
+        scheduler.reschedule_job('digest_flush', trigger='interval', minutes=new.digest_window_minutes)
 
-    # 每天 23:50 (默认) 重新分配明天的任务，避开 0 点的执行高峰
-    scheduler.add_job(refresh_daily_scheduler, 'cron', hour=refresh_hour, minute=refresh_minute, id='daily_refresh')
+    feed_stats.set_window(new.stats_window)
+    if old.stats_flush_minutes != new.stats_flush_minutes:
+        scheduler.reschedule_job('feed_stats_flush', trigger='interval', minutes=new.stats_flush_minutes)
 
-    yield
+    if old.retention_hour != new.retention_hour:
+        scheduler.reschedule_job('retention', trigger='cron', hour=new.retention_hour, minute=30)
 
-    # Stop Telegram Bot Application
-    await tg_app.updater.stop()
-    await tg_app.stop()
-    await tg_app.shutdown()
+    if old.vip_interval_minutes != new.vip_interval_minutes:
+        scheduler.reschedule_job('vip_poll', trigger='interval', minutes=new.vip_interval_minutes)
 
-    scheduler.shutdown()
+    if any(getattr(old, f) != getattr(new, f) for f in _SCHEDULE_FIELDS):
+        logger.info("Schedule settings changed, regrouping users.")
+        asyncio.get_running_loop().create_task(refresh_daily_scheduler())
 
 
 async def refresh_daily_scheduler():
     """
     每天刷新一次调度逻辑：
-    1. 获取活跃用户总数
+    1. 获取普通通道的活跃用户（VIP 用户由 vip_poll 任务单独轮询）
     2. 将用户分为 N 组 (每组间隔若干小时)
     3. 为每一组创建一个定时任务
     """
     logger.info("Refreshing daily scheduler...")
     try:
-        all_user_ids = await follower_model.get_active_user_ids()
+        # 每天从数据库重建一次关注用户缓存，之后的调度与跳过判断都只读缓存
+        await follower_model.load_follower_cache()
+        all_user_ids = await get_lane_user_ids(NORMAL)
     except Exception as e:
         logger.error(f"Failed to refresh scheduler: {e}")
         return
 
+    # 每天重新预热去重索引，同时清理窗口外的指纹
+    if get_settings().dedup_enabled:
+        try:
+            await dedup_index.warm()
+        except Exception as e:
+            logger.error(f"Failed to warm dedup index: {e}")
+
     total_count = len(all_user_ids)
     if total_count == 0:
         logger.warning("No active users found.")
         return
 
-    num_groups = get_config("base", "num_groups", fallback=6, cast=int)
-    misfire_grace = get_config("base", "misfire_grace_seconds", fallback=3600, cast=int)
-    hour_interval = max(1, 24 // num_groups)
-    group_size = math.ceil(total_count / num_groups)
-
-    # 清除旧的组任务 (保留 daily_refresh)
-    for job in scheduler.get_jobs():
-        if job.id.startswith("group_job_"):
-            scheduler.remove_job(job.id)
-
-    logger.info(f"Scheduling {total_count} users into {num_groups} groups (approx {group_size} per group).")
-
-    for i in range(num_groups):
-        start_idx = i * group_size
-        end_idx = min((i + 1) * group_size, total_count)
-
-        if start_idx >= total_count:
-            break
-
-        group_ids = all_user_ids[start_idx:end_idx]
-        hour_trigger = (i * hour_interval) % 24
-
+    settings = get_settings()
+    num_groups = settings.num_groups
+    misfire_grace = settings.misfire_grace_seconds
+    groups = plan_groups(all_user_ids, num_groups)
+
+    logger.info(f"Scheduling {total_count} users into {num_groups} groups (approx {total_count // num_groups} per group).")
+
+    # 任务参数只有组序号，用户列表在运行时解析；定义未变化的任务原样保留（保留持久化的下次触发时间）
+    stale = {job.id: job for job in scheduler.get_jobs() if job.id.startswith("group_job_")}
+    for group_ids, i, hour_trigger in groups:
+        job = stale.pop(f"group_job_{i}", None)
+        if (job is not None and tuple(job.args) == (i,) and job.kwargs == {"trigger_hour": hour_trigger}
+                and job.misfire_grace_time == misfire_grace):
+            logger.info(f"Kept job group_{i}: {len(group_ids)} users at {hour_trigger:02d}:00")
+            continue
         scheduler.add_job(
-            process_group_users,
+            run_group_job,
             'cron',
             hour=hour_trigger,
             minute=0,
-            args=[group_ids, i],
+            args=[i],
+            kwargs={"trigger_hour": hour_trigger},
             id=f"group_job_{i}",
-            misfire_grace_time=misfire_grace
+            misfire_grace_time=misfire_grace,
+            replace_existing=True
         )
         logger.info(f"Added job group_{i}: {len(group_ids)} users at {hour_trigger:02d}:00")
 
-    # 手动补跑：检查启动时是否有刚错过的组（1小时内）
-    now = datetime.now()
-    current_hour = now.hour
-
-    for i in range(num_groups):
-        trigger_hour = (i * hour_interval) % 24
-        if trigger_hour <= current_hour < trigger_hour + 1\
-                :
-            logger.info(f"Detected missed job (Now: {now}, Trigger: {trigger_hour}:00). Executing group {i} immediately.")
-            start_idx = i * group_size
-            end_idx = min((i + 1) * group_size, total_count)
-            group_ids = all_user_ids[start_idx:end_idx]
-            scheduler.add_job(
-                process_group_users,
-                'date',
-                args=[group_ids, i],
-                id=f"makeup_job_{i}_{int(now.timestamp())}",
-                next_run_time=now
-            )
+    # 分组数减少后多出来的任务
+    for job_id in stale:
+        scheduler.remove_job(job_id)
+
+    await _schedule_catch_up(groups)
+
+
+async def _schedule_catch_up(groups: List[GroupPlan]):
+    """
+    根据分组进度日志补跑错过或中断的分组：
+    - 最近一次计划触发后没有运行记录的分组视为错过；
+    - 有运行记录但未完成的分组从断点继续；
+    - 从未运行过的分组仅在 misfire_grace_seconds 内补跑。
+    """
+    try:
+        runs = await journal_model.get_group_runs()
+    except Exception as e:
+        logger.error(f"Failed to load group journal, skip catch-up: {e}")
+        return
+
+    now = get_clock().local_now()
+    grace = timedelta(seconds=get_settings().misfire_grace_seconds)
+    pending: List[Tuple[int, datetime]] = []
+
+    for group_ids, i, trigger_hour in groups:
+        if i in _running_groups:
+            continue
+        last_trigger = last_trigger_time(trigger_hour, now)
+        run = runs.get(i)
+        if run is None:
+            missed = now - last_trigger <= grace
+        else:
+            missed = run.scheduled_time < last_trigger or run.finished_time is None
+        if missed:
+            scheduled_time = last_trigger if run is None or run.scheduled_time < last_trigger else run.scheduled_time
+            logger.info(f"Detected missed/unfinished group {i} (Trigger: {scheduled_time}), queued for catch-up.")
+            pending.append((i, scheduled_time))
+
+    if not pending:
+        return
+
+    # 固定 ID：重启后重新检测时覆盖尚未执行的补跑任务，而不是再加一个
+    scheduler.add_job(
+        _run_catch_up,
+        'date',
+        args=[pending],
+        id="makeup_job",
+        next_run_time=now,
+        replace_existing=True
+    )
+
+
+async def _run_catch_up(pending: List[Tuple[int, datetime]]):
+    """以受限并发补跑分组，避免重启后所有分组同时请求上游"""
+    semaphore = asyncio.Semaphore(get_settings().catchup_concurrency)
+
+    async def run_one(group_index: int, scheduled_time: datetime):
+        async with semaphore:
+            group_ids = await resolve_group(group_index)
+            if group_ids:
+                await process_group_users(group_ids, group_index, scheduled_time=scheduled_time)
+
+    await asyncio.gather(*(run_one(*item) for item in pending))
+
+
+async def get_lane_user_ids(lane: str) -> List[str]:
+    """某个调度通道的活跃用户（读取关注用户缓存，不查库；缓存 version 未变化时直接复用上次结果）"""
+    vip_categories = get_settings().vip_categories
+    key = (follower_cache.version, vip_categories)
+    cached = _lane_user_ids.get(lane)
+    if follower_cache.loaded and cached is not None and cached[0] == key:
+        return cached[1]
+    user_ids = [state.user_id for state in await follower_model.get_active_followers()
+                if lane_of(state, vip_categories) == lane]
+    if follower_cache.loaded:
+        _lane_user_ids[lane] = (key, user_ids)
+    return user_ids
+
+
+async def resolve_group(group_index: int) -> Optional[List[str]]:
+    """按当前普通通道的活跃用户解析组内用户，组归属由 user_id 决定，与列表顺序和总人数无关"""
+    num_groups = get_settings().num_groups
+    if group_index >= num_groups:
+        logger.warning(f"Group {group_index} no longer exists, skipped.")
+        return None
+    return [user_id for user_id in await get_lane_user_ids(NORMAL) if group_of(user_id, num_groups) == group_index]
+
+
+async def run_group_job(group_index: int, trigger_hour: Optional[int] = None):
+    """分组定时任务入口：任务库中只保存组序号，用户列表在运行时解析"""
+    group_ids = await resolve_group(group_index)
+    if group_ids:
+        await process_group_users(group_ids, group_index, trigger_hour=trigger_hour)
+
+
+async def run_vip_lane():
+    """VIP 通道定时任务入口：每次运行都检查全部 VIP 用户，上一轮未结束时跳过"""
+    user_ids = await get_lane_user_ids(VIP)
+    if user_ids:
+        await process_group_users(user_ids, VIP_GROUP, lane=VIP)
 
 
 # ---------------------------------------------------------------------------
 # 异步任务处理（直接 await DB 函数）
 # ---------------------------------------------------------------------------
 
-async def process_group_users(user_ids: List[str], group_index: int):
+async def process_group_users(
+        user_ids: List[str],
+        group_index: int,
+        trigger_hour: Optional[int] = None,
+        scheduled_time: Optional[datetime] = None,
+        lane: str = NORMAL,
+):
     """
-    处理一组用户，组内每个用户请求间隔 1 分钟。
+    处理一组用户，组内每个用户请求间隔 user_interval_seconds（VIP 通道为 vip_user_interval_seconds）。
+    进度写入日志表：本轮计划时间之后已尝试过的用户会被跳过，重启后从断点继续。
     """
-    logger.info(f"Starting Group {group_index} processing ({len(user_ids)} users).")
+    if group_index in _running_groups:
+        logger.warning(f"Group {group_index} is already running, skip duplicate trigger.")
+        return
+
+    _running_groups.add(group_index)
+    try:
+        await _process_group_users(user_ids, group_index, trigger_hour, scheduled_time, lane)
+    finally:
+        _running_groups.discard(group_index)
+
+
+async def _process_group_users(
+        user_ids: List[str],
+        group_index: int,
+        trigger_hour: Optional[int],
+        scheduled_time: Optional[datetime],
+        lane: str = NORMAL,
+):
+    vip = lane == VIP
+    now = get_clock().local_now()
+    if scheduled_time is None:
+        scheduled_time = last_trigger_time(trigger_hour, now) if trigger_hour is not None else now
+
+    logger.info(f"Starting Group {group_index} processing ({len(user_ids)} users, scheduled {scheduled_time}).")
 
     try:
         bot = get_telegram_bot()
@@ -164,42 +467,101 @@ async def process_group_users(user_ids: List[str], group_index: int):
         logger.error(f"Group {group_index}: Failed to init Strategy: {e}")
         return
 
-    for idx, user_id in enumerate(user_ids):
-        logger.info(f"Group {group_index} - Processing {idx + 1}/{len(user_ids)}: {user_id}")
-
-        try:
-            follower = await follower_model.get_follower_snapshot(user_id)
-
-            if follower and follower.category != "disable":
-                if follower.latest_send_datetime and datetime.now() - follower.latest_send_datetime < timedelta(hours=1):
-                    logger.info(f"User {user_id} skipped (less than 1 hour since last check/send).")
-                    continue
-                await process_follower(follower, bot, strategy)
-            else:
-                logger.info(f"User {user_id} skipped (not found or disabled).")
-        except Exception as e:
-            logger.error(f"Error processing user {user_id} in group {group_index}: {e}")
-            await send_error_notification(bot, f"Group {group_index} Error User {user_id}: {e}")
+    try:
+        await journal_model.start_group_run(group_index, scheduled_time, len(user_ids))
+        states = await journal_model.get_fetch_states(user_ids)
+    except Exception as e:
+        logger.error(f"Group {group_index}: Failed to load journal: {e}")
+        return
 
-        if idx < len(user_ids) - 1:
-            logger.debug(f"Group {group_index}: Waiting 60s before next user...")
-            await asyncio.sleep(60)
+    pending_ids = [
+        user_id for user_id in user_ids
+        if not (user_id in states and states[user_id].last_attempt_time
+                and states[user_id].last_attempt_time >= scheduled_time)
+    ]
+    cursor = len(user_ids) - len(pending_ids)
+    if cursor:
+        logger.info(f"Group {group_index}: resuming at {cursor}/{len(user_ids)}.")
+
+    for idx, user_id in enumerate(pending_ids):
+        cursor += 1
+        with log_context(group=group_index, user_id=user_id):
+            logger.info("Group %s - Processing %d/%d: %s", group_index, cursor, len(user_ids), user_id)
+
+            try:
+                follower = await follower_model.get_follower_state(user_id)
+
+                if follower and follower.category != "disable":
+                    skip_seconds = get_settings().skip_recent_seconds
+                    # VIP 通道本身就是高频轮询，不做"最近检查过"的跳过
+                    if not vip and checked_recently(follower.latest_send_datetime, DateHandler.utcnow(), skip_seconds):
+                        logger.info("User %s skipped (checked within the last %ss).", user_id, skip_seconds)
+                        await journal_model.advance_group_cursor(group_index, cursor)
+                        continue
+                    # RSSHub 全部不可用时暂停轮询等待探测恢复，而不是让每个用户都耗尽重试
+                    if not await strategy.wait_upstream(get_settings().upstream_pause_max_seconds):
+                        logger.warning("Group %s: upstream still unavailable, continuing without waiting.", group_index)
+                    await journal_model.mark_attempt(user_id)
+                    ok = await process_follower(follower, bot, strategy, lane=lane)
+                    await journal_model.mark_result(user_id, ok, None if ok else "process_follower failed")
+                else:
+                    logger.info("User %s skipped (not found or disabled).", user_id)
+                await journal_model.advance_group_cursor(group_index, cursor)
+            except Exception as e:
+                logger.error("Error processing user %s in group %s: %s", user_id, group_index, e)
+                await send_error_notification(bot, f"Group {group_index} Error User {user_id}: {e}")
+
+        if idx < len(pending_ids) - 1:
+            settings = get_settings()
+            interval = settings.vip_user_interval_seconds if vip else settings.user_interval_seconds
+            logger.debug("Group %s: Waiting %ss before next user...", group_index, interval)
+            await get_clock().sleep(interval)
 
+    try:
+        await journal_model.finish_group_run(group_index)
+    except Exception as e:
+        logger.error(f"Group {group_index}: Failed to finish journal run: {e}")
     logger.info(f"Group {group_index} processing finished.")
 
 
-async def process_follower(follower: FollowerTable, bot: Bot, strategy: RssStrategy):
-    logger.info(f"Checking updates for user: {follower.user_id}")
+def follower_lock(user_id: str) -> asyncio.Lock:
+    """获取用户锁，实时推送与补推共用，保证同一用户的帖子不会被并发处理"""
+    lock = _follower_locks.get(user_id)
+    if lock is None:
+        lock = _follower_locks[user_id] = asyncio.Lock()
+    return lock
 
+
+async def process_follower(follower: FollowerState, bot: Bot, strategy: RssStrategy, lane: str = NORMAL) -> bool:
+    """
+    检查单个用户的更新并发送。返回 False 表示抓取或发送失败，需要下次重试。
+    lane 为 VIP 时抓取可使用预留的上游并发名额，发送排在实时推送之前。
+    """
+    async with follower_lock(follower.user_id):
+        # 拿到锁后重新读取状态：其他任务可能刚刚发送过并推进了水位线（缓存为写穿，读取不查库）
+        fresh = await follower_model.get_follower_state(follower.user_id)
+        if fresh is None or fresh.category == "disable":
+            return True
+        with span("follower.process", user_id=fresh.user_id, category=fresh.category, lane=lane) as root_span:
+            ok = await _process_follower(fresh, bot, strategy, lane)
+            root_span.set_attribute("success", ok)
+            return ok
+
+
+async def _process_follower(follower: FollowerState, bot: Bot, strategy: RssStrategy, lane: str = NORMAL) -> bool:
+    logger.debug("Checking updates for user: %s", follower.user_id)
+
+    started = time.perf_counter()
     try:
-        contents = await strategy.get_new_media(follower.user_id)
+        with log_context(stage="fetch"), mem_profiler.stage("fetch"):
+            contents = await strategy.get_new_media(follower.user_id, vip=lane == VIP)
     except Exception as e:
-        logger.error(f"Fetch failed for {follower.user_id}: {e}")
+        logger.error("Fetch failed for %s: %s", follower.user_id, e,
+                     extra={"stage": "fetch", "latency_ms": round((time.perf_counter() - started) * 1000, 1)})
         await send_error_notification(bot, f"Fetch failed for {follower.user_id}: {e}")
-        return
-
-    if not contents:
-        return
+        return False
+    logger.debug("Fetched %d items for %s", len(contents), follower.user_id,
+                 extra={"stage": "fetch", "latency_ms": round((time.perf_counter() - started) * 1000, 1)})
 
     # 解析日期并验证
     valid_contents: List[Tuple[TwitterContent, datetime]] = []
@@ -208,9 +570,6 @@ async def process_follower(follower: FollowerTable, bot: Bot, strategy: RssStrat
         if dt:
             valid_contents.append((c, dt))
 
-    if not valid_contents:
-        return
-
     # 按时间升序排序（旧 -> 新）
     valid_contents.sort(key=lambda x: x[1])
 
@@ -218,29 +577,124 @@ async def process_follower(follower: FollowerTable, bot: Bot, strategy: RssStrat
 
     new_posts: List[Tuple[TwitterContent, datetime]] = []
     if last_date is None:
-        logger.info(f"First run for {follower.user_id}, sending latest post as test.")
-        new_posts.append(valid_contents[-1])
+        if valid_contents:
+            logger.info("First run for %s, sending latest post as test.", follower.user_id)
+            new_posts.append(valid_contents[-1])
     else:
         for content, dt in valid_contents:
             if dt > last_date:
                 new_posts.append((content, dt))
 
+    feed_stats.record_poll(follower.user_id, len(new_posts))
     if not new_posts:
-        return
-
+        return True
+
+    # 单次最多处理 max_queued_posts 条（最早的优先），其余等水位线推进后下次轮询再处理
+    max_queued = get_settings().max_queued_posts
+    if len(new_posts) > max_queued:
+        metrics.inc("caps.queued_posts", len(new_posts) - max_queued)
+        logger.warning("User %s has %d new posts, processing the oldest %d this round.",
+                       follower.user_id, len(new_posts), max_queued)
+        del new_posts[max_queued:]
+
+    # 只过滤水位线之后的新帖，每条帖子只计入一次命中；被过滤的帖子随后推进水位线，下次不会再被检查
+    # 过滤规则返回新列表，不修改 SingleFlight 共享的抓取结果
+    rejected: Set[str] = set()
+    engine = get_filter_engine()
+    if engine:
+        with mem_profiler.stage("filter"):
+            kept = engine.apply([content for content, _ in new_posts], follower.user_id,
+                                follower.category or "Uncategorized")
+        if len(kept) != len(new_posts):
+            kept_links = {content.link for content in kept}
+            rejected = {content.link for content, _ in new_posts if content.link not in kept_links}
+            logger.debug("Filtered %d/%d new items for %s", len(rejected), len(new_posts), follower.user_id)
+
+    if follower.category in get_settings().digest_categories:
+        await _buffer_digest_posts(follower, new_posts, rejected)
+        return True
+
+    with mem_profiler.stage("send"):
+        return await _send_new_posts(follower, bot, new_posts, lane, rejected)
+
+
+async def _buffer_digest_posts(follower: FollowerState, new_posts: List[Tuple[TwitterContent, datetime]],
+                               rejected: AbstractSet[str] = frozenset()):
+    """
+    摘要模式：新帖只写入缓冲区，水位线在摘要送达后才推进。
+    被过滤、与已推送内容重复、或链接已由其他关注用户缓冲的帖子不会以本用户的身份进入摘要，
+    在这里直接推进本用户的水位线。写入缓冲区即记录指纹，同一窗口内其他用户转发的相同内容不会再次缓冲。
+    """
+    settings = get_settings()
+    skipped: List[Tuple[TwitterContent, datetime]] = []
+    candidates: List[Tuple[TwitterContent, datetime, List[str]]] = []
+    batch_fingerprints: Set[str] = set()
     for content, dt in new_posts:
+        if content.link in rejected:
+            skipped.append((content, dt))
+            continue
+        fingerprints = content_fingerprints(content) if settings.dedup_enabled else []
+        duplicate = await dedup_index.find(fingerprints)
+        if duplicate is not None or batch_fingerprints.intersection(fingerprints):
+            metrics.inc("dedup.digest")
+            logger.info("Skipped duplicate digest post for %s - %s", follower.user_id, content.link,
+                        extra={"stage": "dedup"})
+            skipped.append((content, dt))
+            continue
+        batch_fingerprints.update(fingerprints)
+        candidates.append((content, dt, fingerprints))
+
+    already_buffered = await digest_model.buffer_posts(
+        follower.user_id, follower.category, [(content, dt) for content, dt, _ in candidates])
+    for content, dt, fingerprints in candidates:
+        if content.link in already_buffered:
+            skipped.append((content, dt))
+        else:
+            await dedup_index.remember(fingerprints, follower.user_id, content)
+    logger.info("Buffered %d posts for digest #%s (%s).", len(candidates) - len(already_buffered),
+                follower.category, follower.user_id)
+
+    if skipped:
+        content, dt = max(skipped, key=lambda post: post[1])
+        await follower_model.advance_watermark(follower.user_id, dt, content.link)
+
+
+async def _send_new_posts(follower: FollowerState, bot: Bot, new_posts: List[Tuple[TwitterContent, datetime]],
+                          lane: str = NORMAL, rejected: AbstractSet[str] = frozenset()) -> bool:
+    """按时间顺序发送新帖；rejected 中的（被过滤规则拒绝的）帖子不发送，只按顺序推进水位线"""
+    settings = get_settings()
+    priority = VIP_PRIORITY if lane == VIP else LIVE
+    for content, dt in new_posts:
+        send_started = time.perf_counter()
         try:
-            target_chat_id = get_target_chat_id()
-            post_time_str = DateHandler.format_notify(dt)
+            if content.link in rejected:
+                await follower_model.advance_watermark(follower.user_id, dt, content.link)
+                continue
 
-            # 发送 Telegram 通知（纯异步，不阻塞）
-            await send_twitter_content(
-                bot,
-                content,
-                target_chat_id,
-                category=follower.category,
-                post_time=post_time_str
-            )
+            target_chat_id = get_target_chat_id()
+            post_time_str = DateHandler.format_notify(dt, target_chat_id)
+
+            fingerprints = content_fingerprints(content) if settings.dedup_enabled else []
+            duplicate = await dedup_index.find(fingerprints)
+            if duplicate is not None:
+                if settings.dedup_mode == "note":
+                    await send_duplicate_note(bot, target_chat_id, content, duplicate.author, duplicate.link,
+                                              category=follower.category)
+                await follower_model.advance_watermark(follower.user_id, dt, content.link)
+                metrics.inc(f"dedup.{settings.dedup_mode}")
+                logger.info("Skipped duplicate of %s for %s - %s", duplicate.link, follower.user_id, content.link,
+                            extra={"stage": "dedup"})
+                continue
+
+            # 发送 Telegram 通知（纯异步，不阻塞）；VIP 优先于实时推送，补推会让行
+            async with send_gate.lane(priority):
+                await send_twitter_content(
+                    bot,
+                    content,
+                    target_chat_id,
+                    category=follower.category,
+                    post_time=post_time_str
+                )
 
             # 直接 await 异步 DB 写入
             await follower_model.save_post_result(
@@ -249,14 +703,26 @@ async def process_follower(follower: FollowerTable, bot: Bot, strategy: RssStrat
                 dt,
                 str(target_chat_id),
             )
-
-            logger.info(f"Successfully sent and saved update for {follower.user_id} - {content.link}")
+            await dedup_index.remember(fingerprints, follower.user_id, content)
+
+            # 发布 -> 送达 的端到端延迟
+            delivered_latency = (DateHandler.utcnow() - dt).total_seconds()
+            metrics.observe("publish_to_delivered_seconds", delivered_latency)
+            metrics.observe(f"lane.{lane}.publish_to_delivered_seconds", delivered_latency)
+            if lane == VIP and delivered_latency > settings.vip_slo_seconds:
+                metrics.inc("lane.vip.slo_miss")
+                logger.warning("VIP post %s delivered %.0fs after publish (SLO %.0fs).",
+                               content.link, delivered_latency, settings.vip_slo_seconds)
+            logger.info("Successfully sent and saved update for %s - %s", follower.user_id, content.link,
+                        extra={"stage": "send", "latency_ms": round((time.perf_counter() - send_started) * 1000, 1)})
 
         except Exception as e:
-            logger.error(f"Failed to send notification for {follower.user_id}: {e}")
+            logger.error("Failed to send notification for %s: %s", follower.user_id, e, extra={"stage": "send"})
             await send_error_notification(bot, f"发送通知失败 [{follower.user_id}]\n{content.link}\n错误: {e}")
             # 一旦失败，停止更新该用户状态，等待下次轮询重试
-            break
+            return False
+
+    return True
 
 
 if __name__ == '__main__':
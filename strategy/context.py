@@ -12,6 +12,9 @@ class TwitterContent:
     publish_date: str
     title:str
     media_list: List[str]
+    # 是否为转推 / 回复（由标题前缀判断）
+    is_retweet: bool = False
+    is_reply: bool = False
 
 class ParseTwitterContext:
     """
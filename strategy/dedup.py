@@ -0,0 +1,132 @@
+"""
+跨用户内容去重。
+
+多个关注用户转发同一份媒体时，按内容指纹识别重复：
+- 媒体：twimg 媒体 ID（pbs.twimg.com/media/<id>、video.twimg.com/.../<id>），其余 URL 去掉查询参数后取哈希；
+- 文本：去掉链接、@提及、RT 前缀后按字符 shingle 取哈希，只用于无媒体的帖子。
+最近的指纹保存在有上限的内存 LRU 中，同时写入 content_fingerprint 表，重启后按窗口预热。
+"""
+import hashlib
+import re
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+from model import fingerprint_model
+from strategy.context import TwitterContent
+from utils.config_manager import get_settings
+from utils.date_handler import utcnow
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SHINGLE_SIZE = 5
+# 短文本（"早安"、"好耶"）很容易撞车，不参与文本去重
+_MIN_TEXT_LENGTH = 30
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_URL_RE = re.compile(r"https?://\S+")
+_MENTION_RE = re.compile(r"(^rt\s+@\w+:?|@\w+)")
+_NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+# /media/<id>.jpg、/tweet_video/<id>.mp4、/ext_tw_video/<id>/...、/amplify_video/<id>/...
+_TWIMG_ID_RE = re.compile(r"^/(?:media|tweet_video|tweet_video_thumb|ext_tw_video|ext_tw_video_thumb|amplify_video|amplify_video_thumb)/([^/.?]+)")
+
+
+def _hash(value: str) -> str:
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()[:20]
+
+
+def media_fingerprint(url: str) -> str:
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    if host.endswith("twimg.com"):
+        match = _TWIMG_ID_RE.match(parsed.path)
+        if match:
+            return f"m:{match.group(1)}"
+    return f"u:{_hash(host + parsed.path)}"
+
+
+def text_fingerprint(content: TwitterContent) -> Optional[str]:
+    text = _TAG_RE.sub(" ", content.content or content.title or "")
+    text = _MENTION_RE.sub(" ", _URL_RE.sub(" ", text.lower()))
+    text = _NON_WORD_RE.sub("", text)
+    if len(text) < _MIN_TEXT_LENGTH:
+        return None
+    shingles = sorted({text[i: i + _SHINGLE_SIZE] for i in range(len(text) - _SHINGLE_SIZE + 1)})
+    return f"t:{_hash(''.join(shingles))}"
+
+
+def content_fingerprints(content: TwitterContent) -> List[str]:
+    """有媒体时按媒体去重，纯文本帖子按文本去重"""
+    if content.media_list:
+        return list(dict.fromkeys(media_fingerprint(url) for url in content.media_list))
+    fingerprint = text_fingerprint(content)
+    return [fingerprint] if fingerprint else []
+
+
+class Delivered(NamedTuple):
+    send_time: datetime
+    user_id: str
+    author: str
+    link: str
+
+
+class DedupIndex:
+    """
+    指纹索引：内存 LRU + content_fingerprint 表。
+    预热后若窗口内的指纹全部装得下，内存即为完整视图，未命中时不再查库。
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Delivered]" = OrderedDict()
+        self._complete = False
+
+    def _window_start(self) -> datetime:
+        return utcnow() - timedelta(hours=get_settings().dedup_window_hours)
+
+    def _put(self, fingerprint: str, entry: Delivered):
+        self._entries[fingerprint] = entry
+        self._entries.move_to_end(fingerprint)
+        if len(self._entries) > get_settings().dedup_cache_size:
+            self._entries.popitem(last=False)
+            self._complete = False
+
+    async def warm(self):
+        """从数据库加载窗口内的指纹，并清理过期记录"""
+        settings = get_settings()
+        since = self._window_start()
+        deleted = await fingerprint_model.delete_fingerprints_before(since)
+        rows = await fingerprint_model.get_recent_fingerprints(since, settings.dedup_cache_size + 1)
+        self._entries.clear()
+        for row in reversed(rows):
+            self._entries[row.fingerprint] = Delivered(row.send_time, row.user_id, row.author, row.link)
+        self._complete = len(rows) <= settings.dedup_cache_size
+        if len(self._entries) > settings.dedup_cache_size:
+            self._entries.popitem(last=False)
+        logger.info("Dedup index warmed: %d fingerprints (deleted %d expired).", len(self._entries), deleted)
+
+    async def find(self, fingerprints: List[str]) -> Optional[Delivered]:
+        """返回窗口内最早推送过相同指纹的记录"""
+        if not fingerprints:
+            return None
+        since = self._window_start()
+        hits = [entry for fp in fingerprints if (entry := self._entries.get(fp)) and entry.send_time >= since]
+        if not hits and not self._complete:
+            rows = await fingerprint_model.find_fingerprints(fingerprints, since)
+            for fp, row in rows.items():
+                entry = Delivered(row.send_time, row.user_id, row.author, row.link)
+                self._put(fp, entry)
+                hits.append(entry)
+        return min(hits, key=lambda e: e.send_time) if hits else None
+
+    async def remember(self, fingerprints: List[str], user_id: str, content: TwitterContent):
+        if not fingerprints:
+            return
+        entry = Delivered(utcnow(), user_id, content.author, content.link)
+        await fingerprint_model.save_fingerprints(fingerprints, user_id, content.author, content.link, entry.send_time)
+        for fp in fingerprints:
+            self._put(fp, entry)
+
+
+dedup_index = DedupIndex()
@@ -0,0 +1,79 @@
+"""
+RSS 响应解析：XML/JSON 解析 + 媒体链接提取，纯 CPU 计算。
+只依赖标准库和 TwitterContent，可以直接交给线程池或进程池执行（见 utils.cpu_pool）。
+条目数和每条帖子的媒体数可以设上限，被截断的数量记在返回的 ParsedFeed 上，由调用方计入指标。
+"""
+import html
+import json
+import re
+import xml.etree.ElementTree as ET
+from itertools import islice
+from typing import Iterable, List, Tuple
+
+from strategy.context import TwitterContent
+
+_VIDEO_RE = re.compile(r'<video[^>]*src=["\']([^"\']*)')
+_IMAGE_RE = re.compile(r'<img[^>]*src=["\']([^"\']*)')
+
+# (author, description, title, pubDate, link)
+RawItem = Tuple[str, str, str, str, str]
+
+
+def _text(item: ET.Element, tag: str) -> str:
+    elem = item.find(tag)
+    return elem.text if elem is not None and elem.text else ""
+
+
+def _iter_xml(body: str) -> Iterable[RawItem]:
+    root = ET.fromstring(body)
+    for item in root.iter("item"):
+        yield _text(item, "author"), _text(item, "description"), _text(item, "title"), \
+            _text(item, "pubDate"), _text(item, "link")
+
+
+def _iter_json(body: str) -> Iterable[RawItem]:
+    for item in json.loads(body):
+        yield item.get("author") or "", item.get("description") or "", item.get("title") or "", \
+            item.get("pubDate") or "", item.get("link") or ""
+
+
+class ParsedFeed(list):
+    """解析结果列表，附带因上限被丢弃的条目数和媒体数（列表子类，进程池中可以正常序列化）"""
+    dropped_items: int = 0
+    dropped_media: int = 0
+
+
+def extract_media(description: str) -> List[str]:
+    """提取视频和图片链接（视频在前），还原 HTML 转义的 &amp;"""
+    videos = [html.unescape(url) for url in _VIDEO_RE.findall(description) if url]
+    images = [html.unescape(url) for url in _IMAGE_RE.findall(description) if url]
+    return videos + images
+
+
+def parse_twitter_feed(body: str, is_json: bool = False, max_items: int = 0, max_media: int = 0) -> ParsedFeed:
+    """
+    解析 RSSHub 的 twitter/media 响应，直接返回 TwitterContent 列表。
+    :param max_items: 最多保留的条目数（RSSHub 按时间倒序返回，保留最新的），0 表示不限制
+    :param max_media: 每条帖子最多保留的媒体数，0 表示不限制
+    """
+    result = ParsedFeed()
+    items = _iter_json(body) if is_json else _iter_xml(body)
+    for author, description, title, pub_date, link in (islice(items, max_items) if max_items else items):
+        media_list = extract_media(description)
+        if max_media and len(media_list) > max_media:
+            result.dropped_media += len(media_list) - max_media
+            del media_list[max_media:]
+        result.append(TwitterContent(
+            author=author,
+            content=description,
+            link=link,
+            publish_date=pub_date,
+            title=title,
+            media_list=media_list,
+            # RSSHub 的转推标题以 "RT " 开头，回复以 "Re " 开头
+            is_retweet=title.startswith("RT "),
+            is_reply=title.startswith("Re "),
+        ))
+    if max_items:
+        result.dropped_items = sum(1 for _ in items)
+    return result
@@ -0,0 +1,139 @@
+"""
+发送前的内容过滤规则。
+
+规则来自配置文件：
+    [filter]                 # 对所有用户生效
+    [filter.<category>]      # 对某个分类生效
+    [filter.user.<user_id>]  # 对单个用户生效
+一条内容需要通过所有适用作用域的规则才会被发送。配置快照变化时重新编译。
+"""
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from strategy.context import TwitterContent
+from tg_func.media_probe import classify_by_url
+from utils.config_manager import ConfigManager, Settings, get_settings
+from utils.logger import get_logger
+from utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# (检查名, 返回 True 表示保留的判断函数)
+Check = Tuple[str, Callable[[TwitterContent], bool]]
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _compile_keywords(words: List[str]) -> Optional[re.Pattern]:
+    if not words:
+        return None
+    return re.compile("|".join(re.escape(word) for word in words), re.IGNORECASE)
+
+
+def _text(content: TwitterContent) -> str:
+    return f"{content.title}\n{content.content}"
+
+
+def _media_kinds(content: TwitterContent) -> set:
+    return {classify_by_url(url) or "unknown" for url in content.media_list}
+
+
+@dataclass(frozen=True)
+class FilterRule:
+    """一个作用域下编译好的检查列表"""
+    scope: str
+    checks: Tuple[Check, ...]
+
+    def rejects(self, content: TwitterContent) -> Optional[str]:
+        """返回拒绝该内容的检查名，全部通过时返回 None"""
+        for name, check in self.checks:
+            if not check(content):
+                return name
+        return None
+
+
+def compile_rule(scope: str, options: Dict[str, str]) -> FilterRule:
+    checks: List[Check] = []
+
+    if include := _compile_keywords(_split(options.get("include_keywords", ""))):
+        checks.append(("include_keywords", lambda c, p=include: p.search(_text(c)) is not None))
+    if exclude := _compile_keywords(_split(options.get("exclude_keywords", ""))):
+        checks.append(("exclude_keywords", lambda c, p=exclude: p.search(_text(c)) is None))
+    if options.get("include_regex"):
+        pattern = re.compile(options["include_regex"], re.IGNORECASE)
+        checks.append(("include_regex", lambda c, p=pattern: p.search(_text(c)) is not None))
+    if options.get("exclude_regex"):
+        pattern = re.compile(options["exclude_regex"], re.IGNORECASE)
+        checks.append(("exclude_regex", lambda c, p=pattern: p.search(_text(c)) is None))
+    if options.get("min_media"):
+        minimum = int(options["min_media"])
+        checks.append(("min_media", lambda c, n=minimum: len(c.media_list) >= n))
+    if options.get("max_media"):
+        maximum = int(options["max_media"])
+        checks.append(("max_media", lambda c, n=maximum: len(c.media_list) <= n))
+    if media_types := set(_split(options.get("media_types", ""))):
+        checks.append(("media_types", lambda c, t=media_types: bool(_media_kinds(c) & t)))
+    if authors := {a.lower() for a in _split(options.get("exclude_authors", ""))}:
+        checks.append(("exclude_authors", lambda c, a=authors: c.author.lower() not in a))
+    if ConfigManager._to_bool(options.get("exclude_retweets", "false")):
+        checks.append(("exclude_retweets", lambda c: not c.is_retweet))
+    if ConfigManager._to_bool(options.get("exclude_replies", "false")):
+        checks.append(("exclude_replies", lambda c: not c.is_reply))
+
+    return FilterRule(scope=scope, checks=tuple(checks))
+
+
+class FilterEngine:
+    def __init__(self, rules: Sequence[FilterRule]):
+        self._rules: Dict[str, FilterRule] = {rule.scope: rule for rule in rules if rule.checks}
+        self.hits: Dict[str, int] = {}
+
+    def __bool__(self):
+        return bool(self._rules)
+
+    def apply(self, contents: List[TwitterContent], user_id: str, category: str) -> List[TwitterContent]:
+        """返回通过过滤的内容（新列表，不修改入参）"""
+        rules = [rule for rule in (self._rules.get("*"), self._rules.get(category), self._rules.get(f"user:{user_id}"))
+                 if rule is not None]
+        if not rules:
+            return contents
+
+        kept = []
+        for content in contents:
+            for rule in rules:
+                reason = rule.rejects(content)
+                if reason is not None:
+                    key = f"{rule.scope}.{reason}"
+                    self.hits[key] = self.hits.get(key, 0) + 1
+                    metrics.inc(f"filter.{key}")
+                    break
+            else:
+                kept.append(content)
+        return kept
+
+
+_engine: Optional[FilterEngine] = None
+_engine_source: Optional[tuple] = None
+
+
+def build_engine(settings: Settings) -> FilterEngine:
+    rules = []
+    for scope, options in settings.filter_rules:
+        try:
+            rules.append(compile_rule(scope, dict(options)))
+        except (re.error, ValueError) as e:
+            logger.error(f"过滤规则 [{scope}] 无效，已忽略: {e}")
+    return FilterEngine(rules)
+
+
+def get_filter_engine() -> FilterEngine:
+    """返回与当前配置快照对应的过滤器，规则变化时重新编译，命中计数随之清零"""
+    global _engine, _engine_source
+    settings = get_settings()
+    if _engine is None or _engine_source != settings.filter_rules:
+        _engine = build_engine(settings)
+        _engine_source = settings.filter_rules
+    return _engine
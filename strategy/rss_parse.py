@@ -1,12 +1,19 @@
 import asyncio
-import html
-import re
-from typing import List
+import time
+from typing import Dict, List
 
-from utils.rss_client import RssClient
+from utils.rss_client import RssClient, UpstreamError
 from strategy.context import TwitterContent
-from utils.config_manager import get_config
+from strategy.feed_parser import parse_twitter_feed
+from utils.config_manager import ConfigError, get_config, get_settings
+from utils.cpu_pool import run_cpu
+from utils.feed_stats import feed_stats
 from utils.logger import get_logger
+from utils.mem_profile import mem_profiler
+from utils.metrics import metrics
+from utils.single_flight import SingleFlight
+from utils.tracing import span, traced
+from utils.upstream import HEALTHY, Upstream, UpstreamPool
 
 logger = get_logger(__name__)
 
@@ -21,54 +28,108 @@ class RssStrategy:
              pass
 
         self.base_url = get_config("rss", "rss_base_url", required=True)
-        self.client = RssClient(self.base_url)
+        settings = get_settings()
+        self._mirrors: tuple = ()
+        self._clients: Dict[str, RssClient] = {}
+        self.pool = UpstreamPool(settings.rss_mirrors, settings.upstream_max_concurrency,
+                                 settings.upstream_cooldown_seconds, probe=self._probe,
+                                 reserved=settings.vip_reserved_fetch_slots)
+        self._sync_upstreams()
+        # 同一订阅的并发请求合并为一次抓取+解析
+        self._flights: SingleFlight[List[TwitterContent]] = SingleFlight("rss_fetch")
 
-    async def get_new_media(self, user_id: str, retry_count: int = 3, retry_interval: float = 5) -> List[TwitterContent]:
+    def _sync_upstreams(self):
+        """配置热更新后切换到新的 rss_base_url / 镜像列表，已有镜像保留健康状态"""
+        settings = get_settings()
+        mirrors = settings.rss_mirrors
+        if not mirrors:
+            raise ConfigError("[rss] rss_base_url 未配置")
+        key = (mirrors, settings.upstream_max_concurrency, settings.upstream_cooldown_seconds,
+               settings.vip_reserved_fetch_slots)
+        if key == self._mirrors:
+            return
+        if self._mirrors and mirrors != self._mirrors[0]:
+            logger.info(f"RSSHub mirrors changed: {[url for url, _ in mirrors]}")
+        self._clients = {url: self._clients.get(url) or RssClient(url) for url, _ in mirrors}
+        self.pool.update(*key)
+        self._mirrors = key
+        self.base_url = mirrors[0][0]
+
+    async def _probe(self, base_url: str) -> bool:
+        client = self._clients.get(base_url)
+        return client is not None and await client.probe(get_settings().upstream_probe_path)
+
+    async def wait_upstream(self, timeout: float) -> bool:
+        """所有镜像都不可用时等待恢复，返回是否可以继续抓取"""
+        return await self.pool.wait_available(timeout)
+
+    @traced("strategy.get_new_media")
+    async def get_new_media(self, user_id: str, retry_count: int = 3, retry_interval: float = 5,
+                            vip: bool = False) -> List[TwitterContent]:
         """
         通过RSS获取用户新媒体内容，失败时自动重试
         :param user_id: 用户ID
         :param retry_count: 最大重试次数
         :param retry_interval: 每次重试间隔（秒）
-        :return: TwitterContent列表
+        :param vip: VIP 通道的请求可以使用预留的上游并发名额
+        :return: TwitterContent列表（可能与其他调用方共享，不要原地修改）
         """
+        self._sync_upstreams()
+        # 按通道区分合并键：VIP 请求不能挂在一个只能排普通名额的在途请求上
+        lane = "vip" if vip else "normal"
+        return await self._flights.do(
+            f"twitter/media/{user_id}/{lane}",
+            lambda: self._fetch_new_media(user_id, retry_count, retry_interval, vip),
+            ttl=get_settings().fetch_cache_ttl,
+        )
+
+    async def _fetch_new_media(self, user_id: str, retry_count: int, retry_interval: float,
+                               vip: bool = False) -> List[TwitterContent]:
+        tried: List[Upstream] = []
+        error: Exception = RuntimeError("所有 RSSHub 镜像均不可用")
         for attempt in range(retry_count):
-            try:
-                # 获取原始RSS数据
-                raw_data = await self.client.get_x_rss_by_user_media(user_id)
+            upstream = self.pool.pick(exclude=tried)
+            if upstream is None:
+                # 所有镜像都已下线，不再逐个重试，等待探测恢复
                 break
+            try:
+                # 获取原始RSS数据；XML 解析与媒体提取按 [rss] parse_mode 在事件循环外执行
+                async with self.pool.limiter.slot(use_reserved=vip):
+                    # 拿到并发名额后再计时，耗时统计不包含排队等待
+                    started = time.perf_counter()
+                    raw = await self._clients[upstream.base_url].get_x_rss_raw_by_user_media(user_id)
+                self.pool.record_success(upstream, time.perf_counter() - started)
+                settings = get_settings()
+                try:
+                    with span("rss.parse", user_id=user_id, bytes=raw.payload_bytes), mem_profiler.stage("parse"):
+                        result = await run_cpu(parse_twitter_feed, raw.text, raw.is_json,
+                                               settings.max_items_per_feed, settings.max_media_per_post)
+                except Exception as e:
+                    raise ValueError(f"解析响应失败: {e}") from e
+                if result.dropped_items:
+                    metrics.inc("caps.feed_items", result.dropped_items)
+                if result.dropped_media:
+                    metrics.inc("caps.post_media", result.dropped_media)
+                feed_stats.record_fetch(user_id, (time.perf_counter() - started) * 1000, raw.payload_bytes, len(result))
+                return result
+            except UpstreamError as e:
+                error = e
+                if self.pool.record_failure(upstream, e.status_code, str(e)) == "client":
+                    # 订阅本身的问题（如用户不存在），换镜像重试也没有意义
+                    break
+                tried.append(upstream)
             except Exception as e:
-                if attempt < retry_count - 1:
-                    logger.warning(f"RSS fetch failed for {user_id}, retrying ({attempt + 1}/{retry_count})... Error: {e}")
-                    await asyncio.sleep(retry_interval)
-                else:
-                    raise RuntimeError(f"RSS fetch failed for user {user_id} after {retry_count} attempts: {str(e)}") from e
-        else:
-            raw_data = []
+                error = e
 
-        result: List[TwitterContent] = []
-
-        for item in raw_data:
-            author = item.author
-            description = item.description
-            title = item.title
-            date = item.pubDate
-            link = item.link
-
-            ## 正则提取所有视频（自动去除&后面的内容 -> 修正为完整URL）
-            vedio_list = re.findall(r'<video[^>]*src=["\']([^"\']*)', description)
-            vedio_list = [html.unescape(url) for url in vedio_list if url]
-
-            ##正则提取img里面的所有链接（自动去除&后面的内容 -> 修正为完整URL）
-            image_list = re.findall(r'<img[^>]*src=["\']([^"\']*)', description)
-            image_list = [html.unescape(url) for url in image_list if url]
-
-            ## 合并成列表
-            media_list = vedio_list + image_list
-
-            # 放入TwitterContent里面
-            result.append(TwitterContent(author=author,content=description,link=link,publish_date=date,title=title,media_list=media_list))
+            if attempt < retry_count - 1 and self.pool.available():
+                logger.warning("RSS fetch failed for %s via %s, retrying (%d/%d)... Error: %s",
+                               user_id, upstream.base_url, attempt + 1, retry_count, error)
+                # 还有未尝试过的可用镜像时立即切换，否则等待重试间隔
+                if not any(u.state == HEALTHY and u not in tried for u in self.pool.upstreams):
+                    await asyncio.sleep(retry_interval)
 
-        return result
+        feed_stats.record_error(user_id, str(error))
+        raise RuntimeError(f"RSS fetch failed for user {user_id}: {str(error)}") from error
 
 async def test():
     try:
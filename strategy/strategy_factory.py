@@ -1,4 +1,3 @@
-from strategy.rss_parse import RssStrategy
 from utils.config_manager import get_config
 from utils.logger import get_logger
 
@@ -12,6 +11,9 @@ def get_strategy():
     if _instance is not None:
         return _instance
 
+    # 延迟导入：RssStrategy 依赖 httpx / pydantic，只在第一次使用时加载
+    from strategy.rss_parse import RssStrategy
+
     strategy_type = get_config("base", "type", fallback="rss")
 
     if strategy_type == "rss":
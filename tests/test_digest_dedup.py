@@ -0,0 +1,121 @@
+"""
+摘要模式与跨用户去重的交互：摘要分类的帖子在写入缓冲区前检查去重索引，写入后记录指纹；
+被去重跳过或链接已由其他关注用户缓冲的帖子不进入缓冲区，但会推进当前用户的水位线。
+使用临时 SQLite 数据库。
+"""
+import asyncio
+import dataclasses
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import model.model as model
+import scheduler.scheduler as sched
+from model import digest_model, follower_model
+from model.follower_cache import FollowerState
+from strategy.context import TwitterContent
+from strategy.dedup import DedupIndex, media_fingerprint
+from utils.config_manager import get_settings
+from utils.metrics import metrics
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DIGEST = "art"
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db", poolclass=NullPool)
+    monkeypatch.setattr(model, "async_engine", engine)
+    monkeypatch.setattr(model, "AsyncSessionFactory", async_sessionmaker(engine, expire_on_commit=False))
+    asyncio.run(model.init_db())
+    yield
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def digest_settings(monkeypatch):
+    settings = dataclasses.replace(get_settings(), digest_categories=frozenset({DIGEST}), dedup_enabled=True)
+    monkeypatch.setattr(sched, "get_settings", lambda: settings)
+    monkeypatch.setattr(sched, "get_filter_engine", lambda: None)
+    monkeypatch.setattr(sched, "dedup_index", DedupIndex())
+
+
+class FakeStrategy:
+    def __init__(self, feeds):
+        self.feeds = feeds
+
+    async def get_new_media(self, user_id, vip=False):
+        return self.feeds[user_id]
+
+
+def _post(author: str, status: int, hours: float, media=()) -> TwitterContent:
+    return TwitterContent(author=author, content="", link=f"https://x.com/{author}/status/{status}",
+                          publish_date=format_datetime(BASE + timedelta(hours=hours), usegmt=True),
+                          title="", media_list=list(media))
+
+
+async def _follow(*user_ids: str):
+    async with model.get_async_session() as session:
+        for user_id in user_ids:
+            session.add(model.FollowerTable(user_id=user_id, category=DIGEST, latest_post_datetime=BASE))
+
+
+async def _poll(strategy: FakeStrategy, *user_ids: str):
+    for user_id in user_ids:
+        state = FollowerState(user_id=user_id, category=DIGEST, latest_post_datetime=BASE)
+        assert await sched._process_follower(state, None, strategy)
+
+
+async def _watermark(user_id: str):
+    follower = await follower_model.get_follower_snapshot(user_id)
+    return follower.latest_post_datetime, follower.latest_post_link
+
+
+def test_link_buffered_by_another_follower_advances_watermark(database, digest_settings):
+    # 两个关注用户的订阅源里出现同一条帖子（例如都转推了 carol）
+    shared = _post("carol", 1, hours=1)
+    strategy = FakeStrategy({"alice": [shared], "bob": [shared]})
+
+    async def scenario():
+        await _follow("alice", "bob")
+        await _poll(strategy, "alice", "bob")
+        return await digest_model.get_buffered_posts(), await _watermark("alice"), await _watermark("bob")
+
+    buffered, alice, bob = asyncio.run(scenario())
+
+    assert [(row.user_id, row.link) for row in buffered[DIGEST]] == [("alice", shared.link)]
+    # alice 的水位线在摘要送达后才推进；bob 的这条帖子不会经由摘要送达，直接推进
+    assert alice == (BASE, None)
+    assert bob == (BASE + timedelta(hours=1), shared.link)
+
+
+def test_digest_posts_are_deduplicated(database, digest_settings):
+    delivered_media = "https://pbs.twimg.com/media/AAA.jpg"
+    buffered_media = "https://pbs.twimg.com/media/BBB.jpg"
+    strategy = FakeStrategy({
+        # 与已直接推送的内容重复
+        "alice": [_post("alice", 1, hours=1, media=[delivered_media])],
+        # 新内容，写入缓冲区
+        "bob": [_post("bob", 2, hours=2, media=[buffered_media])],
+        # 与 bob 刚缓冲的内容重复（链接不同）
+        "carol": [_post("carol", 3, hours=3, media=[buffered_media])],
+    })
+    before = metrics.snapshot()["counters"].get("dedup.digest", 0)
+
+    async def scenario():
+        await _follow("alice", "bob", "carol")
+        await sched.dedup_index.remember([media_fingerprint(delivered_media)], "dave", _post("dave", 9, hours=0))
+        await _poll(strategy, "alice", "bob", "carol")
+        watermarks = {user_id: await _watermark(user_id) for user_id in ("alice", "bob", "carol")}
+        return await digest_model.get_buffered_posts(), watermarks
+
+    buffered, watermarks = asyncio.run(scenario())
+
+    assert [row.user_id for row in buffered[DIGEST]] == ["bob"]
+    assert watermarks["alice"][0] == BASE + timedelta(hours=1)
+    assert watermarks["bob"][0] == BASE
+    assert watermarks["carol"][0] == BASE + timedelta(hours=3)
+    assert metrics.snapshot()["counters"]["dedup.digest"] - before == 2
@@ -0,0 +1,69 @@
+"""
+RSS 解析测试：媒体提取、条目/媒体上限，以及 inline / thread / process 三种执行方式得到相同的结果
+（process 模式下 ParsedFeed 及其截断计数需要能在进程间序列化）。
+"""
+import asyncio
+import json
+
+import pytest
+
+from strategy.feed_parser import parse_twitter_feed
+from utils.cpu_pool import configure_cpu_pool, run_cpu, shutdown_cpu_pool
+
+_ITEM = """
+<item>
+  <title>{title}</title>
+  <author>alice</author>
+  <link>https://x.com/alice/status/{index}</link>
+  <pubDate>Mon, 01 Jan 2024 0{index}:00:00 GMT</pubDate>
+  <description><![CDATA[<video src="https://video.twimg.com/tweet_video/v{index}.mp4"></video>
+    <img src="https://pbs.twimg.com/media/a{index}.jpg?format=jpg&amp;name=orig">
+    <img src="https://pbs.twimg.com/media/b{index}.jpg">]]></description>
+</item>"""
+
+XML = "<rss><channel>{}</channel></rss>".format(
+    "".join(_ITEM.format(index=i, title=title) for i, title in enumerate(["hello", "RT carol: hi", "Re bob: ok"])))
+
+
+def test_parse_extracts_media_and_flags():
+    feed = parse_twitter_feed(XML)
+
+    assert [post.link for post in feed] == [f"https://x.com/alice/status/{i}" for i in range(3)]
+    # 视频在前，HTML 转义的 &amp; 被还原
+    assert feed[0].media_list == ["https://video.twimg.com/tweet_video/v0.mp4",
+                                  "https://pbs.twimg.com/media/a0.jpg?format=jpg&name=orig",
+                                  "https://pbs.twimg.com/media/b0.jpg"]
+    assert [(post.is_retweet, post.is_reply) for post in feed] == [(False, False), (True, False), (False, True)]
+    assert feed.dropped_items == feed.dropped_media == 0
+
+
+def test_parse_applies_caps():
+    feed = parse_twitter_feed(XML, max_items=2, max_media=1)
+
+    assert len(feed) == 2
+    assert all(len(post.media_list) == 1 for post in feed)
+    assert feed.dropped_items == 1
+    assert feed.dropped_media == 4
+
+
+def test_parse_json():
+    body = json.dumps([{"author": "alice", "title": "hello", "link": "https://x.com/alice/status/1",
+                        "pubDate": "Mon, 01 Jan 2024 00:00:00 GMT",
+                        "description": '<img src="https://pbs.twimg.com/media/a.jpg">'}])
+
+    feed = parse_twitter_feed(body, is_json=True)
+
+    assert feed[0].author == "alice"
+    assert feed[0].media_list == ["https://pbs.twimg.com/media/a.jpg"]
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+def test_run_cpu_modes_agree(mode):
+    configure_cpu_pool(mode, 1)
+    try:
+        feed = asyncio.run(run_cpu(parse_twitter_feed, XML, False, 2, 1))
+    finally:
+        shutdown_cpu_pool()
+
+    assert feed == parse_twitter_feed(XML, False, 2, 1)
+    assert (feed.dropped_items, feed.dropped_media) == (1, 4)
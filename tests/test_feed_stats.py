@@ -0,0 +1,80 @@
+"""
+订阅统计落库测试：成功时清空待落库标记，失败时重新标记（下次落库写入最新摘要），
+落库失败期间被删除的订阅不会被恢复。
+"""
+import asyncio
+
+import pytest
+
+import scheduler.feed_stats as feed_stats_job
+from utils.feed_stats import FeedStatsRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = FeedStatsRegistry(window=10)
+    monkeypatch.setattr(feed_stats_job, "feed_stats", registry)
+    return registry
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    """记录每次 save_feed_stats 的参数；列表中放入异常时下一次调用抛出该异常"""
+    calls = []
+    failures = []
+
+    async def save_feed_stats(summaries):
+        if failures:
+            raise failures.pop(0)
+        calls.append(summaries)
+
+    monkeypatch.setattr(feed_stats_job.feed_stats_model, "save_feed_stats", save_feed_stats)
+    return calls, failures
+
+
+def test_flush_writes_dirty_feeds_once(registry, saved):
+    calls, _ = saved
+    registry.record_fetch("alice", 120.0, 2048, 5)
+    registry.record_poll("bob", 2)
+
+    asyncio.run(feed_stats_job.flush_feed_stats())
+    asyncio.run(feed_stats_job.flush_feed_stats())
+
+    assert len(calls) == 1
+    assert set(calls[0]) == {"alice", "bob"}
+    assert calls[0]["alice"]["p95_latency_ms"] == 120.0
+
+
+def test_failed_flush_is_retried(registry, saved):
+    calls, failures = saved
+    registry.record_fetch("alice", 100.0, 1024, 3)
+    registry.record_error("alice", "timeout")
+    failures.append(RuntimeError("database is locked"))
+
+    asyncio.run(feed_stats_job.flush_feed_stats())
+    assert calls == []
+
+    # 之后没有新的变化，下次落库仍然写入上次失败的摘要
+    asyncio.run(feed_stats_job.flush_feed_stats())
+
+    assert len(calls) == 1
+    assert calls[0]["alice"]["errors_total"] == 1
+
+
+def test_failed_flush_does_not_restore_removed_feeds(registry, saved, monkeypatch):
+    calls, _ = saved
+    save_feed_stats = feed_stats_job.feed_stats_model.save_feed_stats
+    registry.record_fetch("alice", 100.0, 1024, 3)
+    registry.record_fetch("bob", 100.0, 1024, 3)
+
+    async def remove_then_fail(summaries):
+        # 落库期间删除了关注用户
+        registry.remove("bob")
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(feed_stats_job.feed_stats_model, "save_feed_stats", remove_then_fail)
+    asyncio.run(feed_stats_job.flush_feed_stats())
+    monkeypatch.setattr(feed_stats_job.feed_stats_model, "save_feed_stats", save_feed_stats)
+    asyncio.run(feed_stats_job.flush_feed_stats())
+
+    assert [set(summaries) for summaries in calls] == [{"alice"}]
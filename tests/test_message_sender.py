@@ -0,0 +1,103 @@
+"""
+发送降级路径测试：媒体组被拒绝时逐个重发，逐个发送时只有 BadRequest 记为该媒体失败，
+RetryAfter 等待后重发，网络错误直接抛出（消息可能已送达，由调用方下次轮询重试）。
+"""
+import asyncio
+
+import pytest
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+import tg_func.message_sender as message_sender
+from strategy.context import TwitterContent
+from tg_func.media_probe import PHOTO
+
+CHAT_ID = "42"
+
+# PTB 22.2+ 读取 RetryAfter.retry_after 时提示将改为 timedelta，_retry_delay 两种类型都支持
+pytestmark = pytest.mark.filterwarnings("ignore::telegram.warnings.PTBDeprecationWarning")
+
+
+class FakeBot:
+    """按 URL 预设每次调用的结果：异常实例依次抛出，用完后视为发送成功"""
+
+    def __init__(self, album_errors=(), item_errors=None):
+        self.album_errors = list(album_errors)
+        self.item_errors = {url: list(errors) for url, errors in (item_errors or {}).items()}
+        self.calls = []
+
+    async def send_media_group(self, chat_id, media):
+        self.calls.append(("media_group", [item.media for item in media], media[0].caption))
+        if self.album_errors:
+            raise self.album_errors.pop(0)
+
+    async def send_photo(self, chat_id, photo, caption=None, parse_mode=None):
+        self.calls.append(("photo", photo, caption))
+        errors = self.item_errors.get(photo)
+        if errors:
+            raise errors.pop(0)
+
+    async def send_message(self, chat_id, text, parse_mode=None, **kwargs):
+        self.calls.append(("message", text, None))
+
+
+BATCH = [("https://pbs.twimg.com/media/a.jpg", PHOTO), ("https://pbs.twimg.com/media/b.jpg", PHOTO)]
+
+
+def test_rejected_album_falls_back_to_single_sends():
+    bot = FakeBot(album_errors=[BadRequest("Wrong file identifier")],
+                  item_errors={BATCH[1][0]: [BadRequest("Wrong file identifier")]})
+
+    failed, caption_sent = asyncio.run(message_sender._send_batch(bot, CHAT_ID, BATCH, "caption"))
+
+    assert failed == [BATCH[1][0]]
+    assert caption_sent
+    # caption 只随第一个成功发送的媒体送达一次
+    assert [call[0] for call in bot.calls] == ["media_group", "photo", "photo"]
+    assert bot.calls[1][2] == "caption"
+    assert bot.calls[2][2] is None
+
+
+def test_single_send_waits_on_retry_after():
+    bot = FakeBot(album_errors=[BadRequest("Wrong file identifier")],
+                  item_errors={BATCH[0][0]: [RetryAfter(0)]})
+
+    failed, caption_sent = asyncio.run(message_sender._send_batch(bot, CHAT_ID, BATCH, "caption"))
+
+    assert failed == []
+    assert caption_sent
+    assert [call[1] for call in bot.calls if call[0] == "photo"] == [BATCH[0][0], BATCH[0][0], BATCH[1][0]]
+
+
+def test_single_send_gives_up_after_repeated_retry_after():
+    bot = FakeBot(item_errors={BATCH[0][0]: [RetryAfter(0)] * message_sender._SEND_ATTEMPTS})
+
+    with pytest.raises(RetryAfter):
+        asyncio.run(message_sender._send_batch(bot, CHAT_ID, BATCH[:1], "caption"))
+
+
+@pytest.mark.parametrize("error", [NetworkError("connection reset"), asyncio.TimeoutError()])
+def test_single_send_network_errors_propagate(error):
+    bot = FakeBot(album_errors=[BadRequest("Wrong file identifier")], item_errors={BATCH[0][0]: [error]})
+
+    with pytest.raises(type(error)):
+        asyncio.run(message_sender._send_batch(bot, CHAT_ID, BATCH, "caption"))
+
+
+def test_failed_media_are_appended_as_links(monkeypatch):
+    async def probe_all(urls):
+        return [PHOTO] * len(urls)
+
+    monkeypatch.setattr(message_sender, "probe_all", probe_all)
+    content = TwitterContent(author="alice", content="", link="https://x.com/alice/status/1", publish_date="",
+                             title="hello", media_list=[url for url, _ in BATCH])
+    bot = FakeBot(album_errors=[BadRequest("Wrong file identifier")],
+                  item_errors={url: [BadRequest("Wrong file identifier")] for url, _ in BATCH})
+
+    asyncio.run(message_sender.send_twitter_content(bot, content, CHAT_ID, category="art"))
+
+    kind, text, _ = bot.calls[-1]
+    assert kind == "message"
+    # caption 没有送达时降级消息带完整的说明文字和失败媒体的链接
+    assert "@alice  #art" in text
+    assert "(媒体发送失败 2/2)" in text
+    assert all(url in text for url, _ in BATCH)
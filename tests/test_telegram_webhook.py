@@ -0,0 +1,112 @@
+"""
+/telegram/webhook 端到端测试：Bot 指向本地的假 Telegram Bot API 服务器，
+校验 secret token 正确时 Update 进入 PTB Application 的更新队列，错误时返回 403 且不入队。
+"""
+import asyncio
+import dataclasses
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from telegram.ext import Application
+
+import api.telegram_webhook as telegram_webhook
+from utils.config_manager import get_settings
+
+TOKEN = "123456:TEST-TOKEN"
+SECRET = "test_secret-1"
+
+UPDATE = {
+    "update_id": 1001,
+    "message": {
+        "message_id": 7,
+        "date": 1700000000,
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "Admin"},
+        "text": "/get_cate_list",
+    },
+}
+
+
+class _FakeBotApi(BaseHTTPRequestHandler):
+    """只实现 getMe，记录收到的方法名"""
+
+    calls = []
+
+    def do_POST(self):
+        method = self.path.rsplit("/", 1)[-1]
+        self.calls.append(method)
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if method == "getMe":
+            body = {"ok": True, "result": {"id": 123456, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}}
+        else:
+            body = {"ok": False, "error_code": 404, "description": "Not Found"}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_telegram():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeBotApi)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    _FakeBotApi.calls = []
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def webhook_settings(monkeypatch):
+    settings = dataclasses.replace(get_settings(), telegram_update_mode="webhook", webhook_secret=SECRET)
+    monkeypatch.setattr(telegram_webhook, "get_settings", lambda: settings)
+
+
+async def _post_update(fake_url: str, monkeypatch, secret):
+    application = (Application.builder().token(TOKEN)
+                   .base_url(f"{fake_url}/bot").base_file_url(f"{fake_url}/file/bot").build())
+    monkeypatch.setattr(telegram_webhook, "get_telegram_application", lambda: application)
+    await application.initialize()
+    try:
+        app = FastAPI()
+        app.include_router(telegram_webhook.router)
+        headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret is not None else {}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post(telegram_webhook.WEBHOOK_PATH, json=UPDATE, headers=headers)
+        queued = []
+        while not application.update_queue.empty():
+            queued.append(application.update_queue.get_nowait())
+        return response, queued
+    finally:
+        await application.shutdown()
+
+
+def test_valid_secret_enqueues_update(fake_telegram, webhook_settings, monkeypatch):
+    response, queued = asyncio.run(_post_update(fake_telegram, monkeypatch, SECRET))
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    assert len(queued) == 1
+    assert queued[0].update_id == UPDATE["update_id"]
+    assert queued[0].message.text == "/get_cate_list"
+    # Bot 初始化请求发往了本地假服务器
+    assert "getMe" in _FakeBotApi.calls
+
+
+# 非 ASCII 的 header（按 latin-1 解码）应返回 403，而不是 compare_digest 的 TypeError
+@pytest.mark.parametrize("secret", ["wrong-secret", None, pytest.param("密钥".encode(), id="non-ascii")])
+def test_invalid_secret_is_rejected(fake_telegram, webhook_settings, monkeypatch, secret):
+    response, queued = asyncio.run(_post_update(fake_telegram, monkeypatch, secret))
+
+    assert response.status_code == 403
+    assert queued == []
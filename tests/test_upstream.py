@@ -0,0 +1,92 @@
+"""
+上游并发控制测试：AimdLimiter 的预留名额只给 VIP 请求使用，过载减半不低于 reserved + 1；
+SingleFlight 合并同一 key 的并发请求，失败结果不缓存。
+"""
+import asyncio
+
+import pytest
+
+from utils.single_flight import SingleFlight
+from utils.upstream import AimdLimiter
+
+
+def test_reserved_slots_are_kept_for_vip():
+    async def scenario():
+        limiter = AimdLimiter(max_limit=3, reserved=1)
+        release = asyncio.Event()
+        entered = []
+
+        async def hold(name, vip):
+            async with limiter.slot(use_reserved=vip):
+                entered.append(name)
+                await release.wait()
+
+        tasks = [asyncio.create_task(hold(f"normal{i}", False)) for i in range(3)]
+        await asyncio.sleep(0)
+        # 普通请求最多占用 limit - reserved 个名额
+        assert entered == ["normal0", "normal1"]
+
+        tasks.append(asyncio.create_task(hold("vip", True)))
+        await asyncio.sleep(0)
+        assert entered[-1] == "vip"
+        assert limiter.in_flight == 3
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_overload_keeps_a_normal_slot_above_reserved():
+    limiter = AimdLimiter(max_limit=8, reserved=2)
+    for _ in range(10):
+        limiter.on_overload()
+    assert limiter.limit == 3
+    assert limiter._capacity(use_reserved=False) == 1
+
+    # 预留名额最多为 max_limit - 1
+    limiter.set_reserved(20)
+    assert limiter.reserved == 7
+
+
+def test_single_flight_shares_concurrent_calls():
+    async def scenario():
+        flights = SingleFlight("test")
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ["post"]
+
+        results = await asyncio.gather(*(flights.do("alice", fetch) for _ in range(5)))
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+
+        # ttl 内直接复用结果，不同 key 互不影响
+        await flights.do("alice", fetch, ttl=60)
+        await flights.do("alice", fetch, ttl=60)
+        await flights.do("bob", fetch, ttl=60)
+        assert len(calls) == 3
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_does_not_cache_failures():
+    async def scenario():
+        flights = SingleFlight("test")
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("upstream down")
+            return ["post"]
+
+        with pytest.raises(RuntimeError):
+            await flights.do("alice", flaky, ttl=60)
+        assert await flights.do("alice", flaky, ttl=60) == ["post"]
+        assert len(attempts) == 2
+
+    asyncio.run(scenario())
@@ -2,7 +2,7 @@ from functools import wraps
 from telegram import Update, BotCommand
 from telegram.ext import Application, CommandHandler, ContextTypes
 import model.follower_model as follower_model
-from utils.config_manager import get_config
+from utils.config_manager import ConfigError, get_settings, reload_config
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -10,12 +10,11 @@ logger = get_logger(__name__)
 
 def admin_only(func):
     """装饰器：限制命令只能由配置的 admin_chat_id 使用。未配置时拒绝所有命令。"""
-    admin_chat_id = get_config("telegram", "admin_chat_id")
-    admin_id = str(admin_chat_id).strip() if admin_chat_id else None
-
 
     @wraps(func)
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        # 每次调用时读取配置快照，热更新 admin_chat_id 后立即生效
+        admin_id = get_settings().admin_chat_id
         sender_id = str(update.effective_user.id)
         if admin_id is None:
             logger.warning(f"命令 /{func.__name__} 被拒绝: admin_chat_id 未配置，拒绝 user_id={sender_id}")
@@ -105,6 +104,155 @@ async def get_disable_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(f"当前禁用列表为：{text}")
 
 
+@admin_only
+async def reload_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Reloads config.ini and applies the new settings without restarting.
+    """
+    logger.info("Received reload command.")
+    try:
+        changed = reload_config()
+    except ConfigError as e:
+        await update.message.reply_text(f"❌ 配置重载失败：{e}")
+        return
+    await update.message.reply_text("✅ 配置已重新加载" if changed else "配置未发生变化")
+
+
+@admin_only
+async def backfill(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Re-sends posts missed since the given time for a user or category; without arguments lists recent jobs.
+    """
+    from scheduler import backfill as backfill_runner
+    from model import backfill_model
+
+    args = context.args
+    if not args:
+        jobs = await backfill_model.list_jobs()
+        if not jobs:
+            await update.message.reply_text("Usage: /backfill <user_id|category> <since>\nsince 示例: 6h、2d、2024-01-01T08:00")
+            return
+        lines = []
+        for job in jobs:
+            info = backfill_runner.describe(job)
+            lines.append(f"#{info['id']} {info['target']} [{info['status']}] {info['progress']} "
+                         f"已发送 {info['sent']} 跳过 {info['skipped']} 失败 {info['errors']}")
+        await update.message.reply_text("最近的补推任务：\n" + "\n".join(lines))
+        return
+
+    if len(args) != 2:
+        await update.message.reply_text("Usage: /backfill <user_id|category> <since>")
+        return
+
+    logger.info("Received backfill command.")
+    try:
+        since = backfill_runner.parse_since(args[1])
+        job = await backfill_runner.start_backfill(args[0], since)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    await update.message.reply_text(
+        f"✅ 补推任务 #{job.id} 已开始（{backfill_runner.describe(job)['progress']} 个用户），发送 /backfill 查看进度\n"
+        f"注意：{backfill_runner.WINDOW_NOTE}")
+
+
+@admin_only
+async def feed_stats_report(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Reports the slowest, largest, noisiest and failing feeds.
+    """
+    from scheduler.feed_stats import build_feed_report
+
+    args = context.args
+    top_n = int(args[0]) if args and args[0].isdigit() else get_settings().stats_top_n
+    report = await build_feed_report(top_n)
+
+    sections = [
+        ("🐢 最慢（p95 耗时 ms）", "slowest", "p95_latency_ms"),
+        ("📦 最大（平均响应字节）", "largest", "avg_payload_bytes"),
+        ("🔥 最活跃（每次轮询新帖数）", "noisiest", "new_items_per_poll"),
+        ("❌ 连续失败", "failing", "error_streak"),
+    ]
+    lines = [f"订阅统计（共 {report['feeds']} 个）"]
+    for title, key, field in sections:
+        if report[key]:
+            lines.append(f"\n{title}")
+            lines.extend(f"{i + 1}. {item['user_id']}: {item[field]}" for i, item in enumerate(report[key]))
+    await update.message.reply_text("\n".join(lines))
+
+
+@admin_only
+async def memory_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Turns tracemalloc profiling on/off or reports current usage, per-stage peaks and top allocation sites.
+    """
+    from utils.mem_profile import mem_profiler
+
+    args = context.args
+    action = args[0].lower() if args else "report"
+    if action == "on":
+        mem_profiler.start(int(args[1]) if len(args) > 1 and args[1].isdigit() else get_settings().memory_profile_frames)
+        await update.message.reply_text("✅ 内存分析已开启，稍后发送 /memprof 查看报告")
+        return
+    if action == "off":
+        mem_profiler.stop()
+        await update.message.reply_text("内存分析已关闭")
+        return
+
+    top_n = int(args[-1]) if args and args[-1].isdigit() else 10
+    report = mem_profiler.report(top_n)
+    if not report["enabled"]:
+        await update.message.reply_text("内存分析未开启，发送 /memprof on [frames] 开启")
+        return
+    lines = [f"当前 {report['current_kib']} KiB，峰值 {report['peak_kib']} KiB"
+             f"（tracemalloc 自身 {report['tracemalloc_overhead_kib']} KiB）"]
+    if report["stages"]:
+        lines.append("\n各阶段峰值（KiB，最大/平均）")
+        lines.extend(f"{name}: {s['max_peak_kib']} / {s['avg_peak_kib']}（{s['count']} 次）"
+                     for name, s in report["stages"].items())
+    lines.append("\n主要分配位置")
+    lines.extend(f"{i + 1}. {item['site']}: {item['size_kib']} KiB ({item['count']})"
+                 for i, item in enumerate(report["top"]))
+    await update.message.reply_text("\n".join(lines))
+
+
+@admin_only
+async def set_priority(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Sets the scheduling priority of a user or category; without arguments lists VIP followers and per-lane latency.
+    """
+    from scheduler.planning import PRIORITIES, VIP, lane_of
+    from utils.metrics import metrics
+
+    args = context.args
+    if not args:
+        settings = get_settings()
+        followers = await follower_model.get_active_followers()
+        vip_ids = [f.user_id for f in followers if lane_of(f, settings.vip_categories) == VIP]
+        lines = [f"VIP 用户（{len(vip_ids)}）：{', '.join(vip_ids) or '无'}",
+                 f"VIP 分类：{', '.join(sorted(settings.vip_categories)) or '无'}",
+                 f"轮询间隔 {settings.vip_interval_minutes} 分钟，送达目标 {settings.vip_slo_seconds:.0f}s"]
+        snapshot = metrics.snapshot()
+        for lane in PRIORITIES:
+            h = snapshot["histograms"].get(f"lane.{lane}.publish_to_delivered_seconds")
+            if h:
+                lines.append(f"{lane}: {h['count']} 条，p50 {h['p50']:.0f}s，p95 {h['p95']:.0f}s，最大 {h['max']:.0f}s")
+        lines.append(f"VIP 超出送达目标：{snapshot['counters'].get('lane.vip.slo_miss', 0):.0f} 条")
+        await update.message.reply_text("\n".join(lines))
+        return
+
+    if len(args) != 2 or args[1].lower() not in PRIORITIES:
+        await update.message.reply_text("Usage: /priority <user_id|category> <vip|normal>")
+        return
+
+    logger.info("Received priority command.")
+    updated = await follower_model.set_priority(args[0], args[1].lower())
+    if not updated:
+        await update.message.reply_text(f"未找到用户或分类：{args[0]}")
+        return
+    await update.message.reply_text(f"✅ 已将 {len(updated)} 个用户设置为 {args[1].lower()}")
+
+
 # 新增命令只需在这里加一行，注册和菜单自动同步
 BOT_COMMANDS = [
     (BotCommand("add_id", "添加关注用户 <user_id> [category] [source]"), add_new_userid),
@@ -112,15 +260,20 @@ BOT_COMMANDS = [
     (BotCommand("update_id_cate", "更新用户分类 <user_id> <category>"), update_userid_cate),
     (BotCommand("get_cate_list", "获取所有分类列表"), get_category_list),
     (BotCommand("get_disable_id", "获取所有禁用用户"), get_disable_id),
+    (BotCommand("reload", "重新加载配置文件"), reload_settings),
+    (BotCommand("stats", "订阅统计报表 [top_n]"), feed_stats_report),
+    (BotCommand("backfill", "补推漏发帖子 <user_id|category> <since>"), backfill),
+    (BotCommand("memprof", "内存分析 [on [frames]|off|report] [top_n]"), memory_profile),
+    (BotCommand("priority", "设置调度优先级 <user_id|category> <vip|normal>"), set_priority),
 ]
 
 
 def register_handlers(application: Application):
-    admin_chat_id = get_config("telegram", "admin_chat_id")
-    if not admin_chat_id or not str(admin_chat_id).strip():
+    admin_chat_id = get_settings().admin_chat_id
+    if not admin_chat_id:
         logger.warning("⚠️  admin_chat_id 未配置！所有 Bot 命令将对任何用户拒绝执行，请在配置文件或环境变量中设置 admin_chat_id。")
     else:
-        logger.info(f"✅ Bot 命令权限已启用，管理员 Chat ID: {str(admin_chat_id).strip()}")
+        logger.info(f"✅ Bot 命令权限已启用，管理员 Chat ID: {admin_chat_id}")
 
     for cmd, callback in BOT_COMMANDS:
         application.add_handler(CommandHandler(cmd.command, callback))
@@ -0,0 +1,105 @@
+import asyncio
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlparse
+
+from utils.config_manager import get_settings
+from utils.logger import get_logger
+from utils.metrics import metrics
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = get_logger(__name__)
+
+# Telegram 发送方式对应的媒体类型
+PHOTO = "photo"
+VIDEO = "video"
+ANIMATION = "animation"
+DOCUMENT = "document"
+
+_PHOTO_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+_VIDEO_EXTS = (".mp4", ".mov", ".m4v", ".webm")
+
+_CACHE_SIZE = 4096
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_client: Optional["httpx.AsyncClient"] = None
+
+
+def classify_by_url(url: str) -> Optional[str]:
+    """
+    根据 URL 推断媒体类型，无法确定时返回 None。
+    覆盖 RSSHub 输出的 twimg 链接：pbs.twimg.com/media 为图片，tweet_video 为 GIF 转码的 mp4。
+    """
+    parsed = urlparse(url)
+    host, path, query = parsed.netloc.lower(), parsed.path.lower(), parsed.query.lower()
+    if host == "pbs.twimg.com" and path.startswith("/media/"):
+        return PHOTO
+    if host == "video.twimg.com":
+        return ANIMATION if path.startswith("/tweet_video/") else VIDEO
+    if path.endswith(".gif"):
+        return ANIMATION
+    if path.endswith(_PHOTO_EXTS) or "format=jpg" in query or "format=png" in query:
+        return PHOTO
+    if path.endswith(_VIDEO_EXTS):
+        return VIDEO
+    return None
+
+
+def _classify_content_type(content_type: str) -> str:
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    if content_type == "image/gif":
+        return ANIMATION
+    if content_type.startswith("image/"):
+        return PHOTO
+    if content_type.startswith("video/"):
+        return VIDEO
+    return DOCUMENT
+
+
+def _get_client() -> "httpx.AsyncClient":
+    global _client
+    if _client is None:
+        import httpx
+        _client = httpx.AsyncClient(timeout=5, follow_redirects=True)
+    return _client
+
+
+async def probe_media_kind(url: str) -> str:
+    """
+    判断媒体类型（按 URL 缓存）：优先使用 URL 规则，无法确定时发送 HEAD 请求读取 Content-Type。
+    HEAD 失败时退回到旧的粗略判断。
+    """
+    kind = _cache.get(url)
+    if kind is not None:
+        _cache.move_to_end(url)
+        return kind
+
+    kind = classify_by_url(url)
+    if kind is None and get_settings().media_probe:
+        try:
+            response = await _get_client().head(url)
+            if response.status_code < 400 and response.headers.get("content-type"):
+                kind = _classify_content_type(response.headers["content-type"])
+                metrics.inc("media_probe.head")
+        except Exception as e:
+            logger.debug("HEAD probe failed for %s: %s", url, e)
+            metrics.inc("media_probe.head_failed")
+    if kind is None:
+        kind = VIDEO if ".mp4" in url or "video" in url else PHOTO
+
+    _cache[url] = kind
+    if len(_cache) > _CACHE_SIZE:
+        _cache.popitem(last=False)
+    return kind
+
+
+async def probe_all(urls: list[str]) -> list[str]:
+    return list(await asyncio.gather(*(probe_media_kind(url) for url in urls)))
+
+
+async def close_probe_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,18 +1,135 @@
+from __future__ import annotations
+
 import asyncio
 import html
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
-from strategy.strategy_factory import get_strategy
 from utils.logger import get_logger
+from utils.metrics import metrics
 from utils.telegram_client import get_telegram_bot, get_target_chat_id
-from telegram import Bot, InputMediaPhoto, InputMediaVideo
 from strategy.context import TwitterContent
+from tg_func.media_probe import ANIMATION, DOCUMENT, PHOTO, VIDEO, probe_all
+from utils.tracing import traced
+
+if TYPE_CHECKING:
+    from telegram import Bot
 
 logger = get_logger(__name__)
 
+# Telegram 限制：媒体组 2~10 个，媒体说明最长 1024 字符
+MEDIA_GROUP_LIMIT = 10
+CAPTION_LIMIT = 1024
+MESSAGE_LIMIT = 4096
+# 媒体组/单条媒体遇到限流时最多尝试的次数
+_SEND_ATTEMPTS = 3
+
+MediaItem = Tuple[str, str]  # (url, kind)
+
+
+def pack_media(items: List[MediaItem]) -> List[List[MediaItem]]:
+    """
+    按 Telegram 规则把媒体打包成若干批：
+    - 图片和视频可以混合在同一个媒体组；
+    - 文件只能和文件组成媒体组；
+    - GIF（animation）不能放进媒体组，单独发送。
+    每批最多 10 个，图片/视频批次排在最前面，以便携带说明文字。
+    """
+    visual = [item for item in items if item[1] in (PHOTO, VIDEO)]
+    documents = [item for item in items if item[1] == DOCUMENT]
+    animations = [item for item in items if item[1] == ANIMATION]
+
+    batches: List[List[MediaItem]] = []
+    for group in (visual, documents):
+        batches.extend(group[i: i + MEDIA_GROUP_LIMIT] for i in range(0, len(group), MEDIA_GROUP_LIMIT))
+    batches.extend([item] for item in animations)
+    return batches
+
+
+def _input_media(url: str, kind: str, caption: Optional[str]):
+    from telegram import InputMediaDocument, InputMediaPhoto, InputMediaVideo
+
+    if kind == VIDEO:
+        return InputMediaVideo(media=url, caption=caption, parse_mode="HTML")
+    if kind == DOCUMENT:
+        return InputMediaDocument(media=url, caption=caption, parse_mode="HTML")
+    return InputMediaPhoto(media=url, caption=caption, parse_mode="HTML")
+
+
+async def _send_single(bot: Bot, chat_id: str, url: str, kind: str, caption: Optional[str]):
+    if kind == VIDEO:
+        await bot.send_video(chat_id=chat_id, video=url, caption=caption, parse_mode="HTML")
+    elif kind == ANIMATION:
+        await bot.send_animation(chat_id=chat_id, animation=url, caption=caption, parse_mode="HTML")
+    elif kind == DOCUMENT:
+        await bot.send_document(chat_id=chat_id, document=url, caption=caption, parse_mode="HTML")
+    else:
+        await bot.send_photo(chat_id=chat_id, photo=url, caption=caption, parse_mode="HTML")
+    metrics.inc("telegram.api_calls")
+
+
+def _retry_delay(error) -> float:
+    """RetryAfter.retry_after 在新版 PTB 中是 timedelta，旧版是秒数"""
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else retry_after
+
+
+async def _send_batch(bot: Bot, chat_id: str, batch: List[MediaItem], caption: Optional[str]) -> Tuple[List[str], bool]:
+    """
+    发送一批媒体，返回 (发送失败的 URL 列表, caption 是否已送达)。
+    媒体组被 Telegram 拒绝（BadRequest，通常是某个媒体无效）时逐个单独重试，只放弃真正失败的那几个；
+    触发限流（RetryAfter）时等待 retry_after 后重发；超时和网络错误时消息可能已经送达，
+    直接抛出，由调用方下次轮询重试，避免重复发送。逐个发送时同样只把 BadRequest 记为该媒体失败。
+    """
+    from telegram.error import BadRequest, RetryAfter
+
+    if len(batch) > 1:
+        media = [_input_media(url, kind, caption if i == 0 else None) for i, (url, kind) in enumerate(batch)]
+        for attempt in range(_SEND_ATTEMPTS):
+            try:
+                await bot.send_media_group(chat_id=chat_id, media=media)
+                metrics.inc("telegram.api_calls")
+                return [], caption is not None
+            except RetryAfter as e:
+                if attempt == _SEND_ATTEMPTS - 1:
+                    raise
+                delay = _retry_delay(e)
+                logger.warning("Media group rate limited, retrying in %ss.", delay)
+                metrics.inc("telegram.retry_after")
+                await asyncio.sleep(delay)
+            except BadRequest as e:
+                logger.warning("Media group rejected (%d items), retrying individually: %s", len(batch), e)
+                metrics.inc("telegram.media_group_failed")
+                break
+
+    failed: List[str] = []
+    caption_sent = False
+    for url, kind in batch:
+        pending_caption = caption if caption is not None and not caption_sent else None
+        for attempt in range(_SEND_ATTEMPTS):
+            try:
+                await _send_single(bot, chat_id, url, kind, pending_caption)
+                caption_sent = caption_sent or pending_caption is not None
+                break
+            except RetryAfter as e:
+                if attempt == _SEND_ATTEMPTS - 1:
+                    raise
+                delay = _retry_delay(e)
+                logger.warning("Sending %s rate limited, retrying in %ss.", kind, delay)
+                metrics.inc("telegram.retry_after")
+                await asyncio.sleep(delay)
+            except BadRequest as e:
+                logger.error("Failed to send %s %s: %s", kind, url, e)
+                metrics.inc("telegram.media_failed")
+                failed.append(url)
+                break
+    return failed, caption_sent
+
+
+@traced("telegram.send")
 async def send_twitter_content(bot: Bot, content: TwitterContent, target_chat_id: str, category: str = "Uncategorized", post_time: str = ""):
     """
     发送推特内容到Telegram
-    根据媒体数量自动选择发送单张图片/视频还是媒体组
+    按媒体类型打包成媒体组/单条消息，失败的媒体单独重试，最终失败的媒体以链接形式附在文本里
     """
 
     # 如果原文链接里面有tg不符合要求的字符，需要进行解析
@@ -30,63 +147,97 @@ async def send_twitter_content(bot: Bot, content: TwitterContent, target_chat_id
     if not media_list:
         # 无媒体，仅发送文本
         await bot.send_message(chat_id=target_chat_id, text=msg, parse_mode="HTML")
+        metrics.inc("telegram.api_calls")
         return
 
-    # 构造媒体对象列表
-    input_media_list = []
-
-    for i, url in enumerate(media_list):
-        # 非常粗糙的类型判断，实际应检查文件扩展名或Content-Type
-        is_video = ".mp4" in url or "video" in url
+    kinds = await probe_all(media_list)
+    batches = pack_media(list(zip(media_list, kinds)))
 
-        # 只有第一个媒体带这个caption
-        # 且如果是媒体组，caption也只加一次。
-        # PTB InputMedia supports caption on individual items.
-        # But for sendMediaGroup, usually only the caption of the first item (or others) is displayed as the message caption.
-        caption = msg if i == 0 else None
+    # 说明文字超过媒体 caption 上限时先单独发送文本
+    caption: Optional[str] = msg
+    if len(msg) > CAPTION_LIMIT:
+        await bot.send_message(chat_id=target_chat_id, text=msg, parse_mode="HTML")
+        metrics.inc("telegram.api_calls")
+        caption = None
+
+    failed: List[str] = []
+    for batch in batches:
+        batch_failed, caption_sent = await _send_batch(bot, target_chat_id, batch, caption)
+        failed.extend(batch_failed)
+        if caption_sent:
+            caption = None
+
+    if failed or caption is not None:
+        # caption 未能送达或有媒体失败时，降级为文本 + 失败媒体链接
+        links = "\n".join(f'<a href="{html.escape(url)}">媒体 {i + 1}</a>' for i, url in enumerate(failed))
+        text = msg if caption is not None else header
+        await bot.send_message(
+            chat_id=target_chat_id,
+            text=f"{text}\n\n(媒体发送失败 {len(failed)}/{len(media_list)})\n{links}",
+            parse_mode="HTML",
+        )
+        metrics.inc("telegram.api_calls")
+
+
+async def send_duplicate_note(bot: Bot, target_chat_id: str, content: TwitterContent, original_author: str,
+                              original_link: str, category: str = "Uncategorized"):
+    """重复内容只发送一条"也转发了"的简短提示，不再重复上传媒体"""
+    text = (f'@{html.escape(content.author)}  #{category} 也发布了 '
+            f'<a href="{original_link}">@{html.escape(original_author)} 已推送的内容</a>\n'
+            f'<a href="{content.link}">源链接</a>')
+    await bot.send_message(chat_id=target_chat_id, text=text, parse_mode="HTML", disable_web_page_preview=True)
+    metrics.inc("telegram.api_calls")
+
+
+async def send_digest(bot: Bot, target_chat_id: str, category: str,
+                      posts: List[Tuple[TwitterContent, str]], mode: str = "text"):
+    """
+    发送分类摘要：每条帖子一行链接，超过消息长度上限时拆分为多条消息。
+    mode = album 时先发送一个最多 10 张缩略图的媒体组（失败不影响文本摘要）。
+    文本摘要发送失败时抛出异常，调用方不应推进水位线。
+    :param posts: (内容, 格式化后的发布时间) 列表
+    """
+    if not posts:
+        return
 
-        if is_video:
-            input_media_list.append(InputMediaVideo(media=url, caption=caption, parse_mode="HTML"))
+    if mode == "album":
+        thumbs = [c.media_list[0] for c, _ in posts if c.media_list]
+        kinds = await probe_all(thumbs)
+        photos = [url for url, kind in zip(thumbs, kinds) if kind == PHOTO][:MEDIA_GROUP_LIMIT]
+        try:
+            if len(photos) == 1:
+                await _send_single(bot, target_chat_id, photos[0], PHOTO, None)
+            elif photos:
+                media = [_input_media(url, PHOTO, None) for url in photos]
+                await bot.send_media_group(chat_id=target_chat_id, media=media)
+                metrics.inc("telegram.api_calls")
+        except Exception as e:
+            logger.warning("Digest album failed for #%s: %s", category, e)
+
+    header = f'#{category} 摘要 · {len(posts)} 条'
+    lines = []
+    for content, post_time in posts:
+        title = html.escape((content.title or "源链接")[:80])
+        line = f'• @{html.escape(content.author)} <a href="{content.link}">{title}</a>'
+        if post_time:
+            line += f' <i>{post_time}</i>'
+        lines.append(line)
+
+    messages = [header]
+    for line in lines:
+        if len(messages[-1]) + len(line) + 1 > MESSAGE_LIMIT:
+            messages.append(line)
         else:
-            input_media_list.append(InputMediaPhoto(media=url, caption=caption, parse_mode="HTML"))
-
-    try:
-        if len(input_media_list) == 1:
-            # 单个媒体
-            media = input_media_list[0]
-            if isinstance(media, InputMediaVideo):
-                await bot.send_video(
-                    chat_id=target_chat_id,
-                    video=media.media,
-                    caption=media.caption,
-                    parse_mode="HTML"
-                )
-            else:
-                await bot.send_photo(
-                    chat_id=target_chat_id,
-                    photo=media.media,
-                    caption=media.caption,
-                    parse_mode="HTML"
-                )
-        else:
-            # 多个媒体，使用媒体组
-            # Telegram 限制一次最多发送 10 个媒体
-            # 如果超过10个，需要分批发送
-            # 这里简单做一下切片，每10个一组
-            chunk_size = 10
-            for i in range(0, len(input_media_list), chunk_size):
-                chunk = input_media_list[i : i + chunk_size]
-                # If splitting into chunks, the second chunk won't have the caption if we only set it on the very first item (i=0 global).
-                # That is generally desired behavior (not repeating the big text block).
-                await bot.send_media_group(chat_id=target_chat_id, media=chunk)
-
-    except Exception as e:
-        logger.error(f"Failed to send media: {e}")
-        # 如果发送媒体失败（例如格式不支持），尝试降级为只发送文本链接
-        await bot.send_message(chat_id=target_chat_id, text=f"{msg}\n\n(媒体发送失败: {e})", parse_mode="HTML")
+            messages[-1] += "\n" + line
+
+    for text in messages:
+        await bot.send_message(chat_id=target_chat_id, text=text, parse_mode="HTML", disable_web_page_preview=True)
+        metrics.inc("telegram.api_calls")
 
 
 async def test():
+    from strategy.strategy_factory import get_strategy
+
     bot = get_telegram_bot()
     chat_id = get_target_chat_id()
     rss_client = get_strategy()
@@ -95,4 +246,4 @@ async def test():
 
 
 if __name__ == '__main__':
-    asyncio.run(test())
\ No newline at end of file
+    asyncio.run(test())
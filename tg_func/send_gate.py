@@ -0,0 +1,92 @@
+"""
+Telegram 发送闸门：按优先级分道发送。
+
+- VIP 用户的推送（VIP）排在最前，实时推送在其发送或排队时让行；
+- 实时推送（LIVE）不限速；
+- 低优先级的通道（如补推 BACKFILL）在有更高优先级的发送进行或排队时让行，
+  并按各自的速率预算（条/分钟）限速，保证补推永远不会挤占实时推送。
+用法：
+    async with send_gate.lane(BACKFILL, rate_per_minute=20):
+        await send_twitter_content(...)
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from utils.metrics import metrics
+
+# 数值越小优先级越高
+VIP = 0
+LIVE = 10
+BACKFILL = 90
+
+
+class _RateLimiter:
+    """简单的令牌桶，容量为 1 分钟的预算"""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_minute = rate_per_minute
+        self._tokens = rate_per_minute
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                rate = self.rate_per_minute / 60
+                self._tokens = min(self.rate_per_minute, self._tokens + (now - self._updated) * rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / rate)
+
+
+class SendGate:
+    def __init__(self):
+        self._active: Dict[int, int] = {}
+        self._waiting: Dict[int, int] = {}
+        self._limiters: Dict[int, _RateLimiter] = {}
+        self._cond = asyncio.Condition()
+
+    def _blocked(self, priority: int) -> bool:
+        return any(p < priority and (self._active.get(p) or self._waiting.get(p)) for p in {*self._active, *self._waiting})
+
+    def _limiter(self, priority: int, rate_per_minute: float) -> _RateLimiter:
+        limiter = self._limiters.get(priority)
+        if limiter is None:
+            limiter = self._limiters[priority] = _RateLimiter(rate_per_minute)
+        # 配置热更新后直接调整速率
+        limiter.rate_per_minute = rate_per_minute
+        return limiter
+
+    @asynccontextmanager
+    async def lane(self, priority: int, rate_per_minute: float = 0) -> AsyncIterator[None]:
+        if rate_per_minute > 0:
+            await self._limiter(priority, rate_per_minute).acquire()
+
+        started = time.perf_counter()
+        async with self._cond:
+            self._waiting[priority] = self._waiting.get(priority, 0) + 1
+            try:
+                await self._cond.wait_for(lambda: not self._blocked(priority))
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+            self._active[priority] = self._active.get(priority, 0) + 1
+        metrics.observe(f"send_gate.wait_seconds.{priority}", time.perf_counter() - started)
+
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._active[priority] -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Dict[int, int]]:
+        return {"active": dict(self._active), "waiting": dict(self._waiting)}
+
+
+send_gate = SendGate()
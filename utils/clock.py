@@ -0,0 +1,110 @@
+"""
+可注入的时钟：调度相关代码通过 get_clock() 取当前时间和 sleep，而不是直接调用 datetime.now() / asyncio.sleep()。
+- Clock：真实时钟（默认）；
+- VirtualClock：虚拟时钟，所有任务都在 sleep 中等待时直接跳到最早的唤醒时间，
+  用于在几秒内模拟一整天的调度（见 benchmarks/sim_scheduler.py）。
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Coroutine, List, Optional, Set, Tuple
+
+
+class Clock:
+    """真实时钟"""
+
+    def now(self) -> datetime:
+        """当前时间（带时区的 UTC）"""
+        return datetime.now(timezone.utc)
+
+    def local_now(self) -> datetime:
+        """当前时间（带时区的本地时间，cron 按本地时区触发）"""
+        return datetime.now().astimezone()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """
+    虚拟时钟。通过 spawn() 启动的任务只能在 clock.sleep() 上等待（不能等待真实 I/O），
+    run() 在这些任务全部进入 sleep 后按唤醒时间顺序逐个唤醒，同一时刻按调用 sleep 的先后顺序，结果可复现。
+    """
+
+    # 等待所有任务进入 sleep 时最多让出控制权的次数，超过后视为有任务在等待其他事件，直接推进时间
+    _MAX_SETTLE_ROUNDS = 1000
+
+    def __init__(self, start: datetime, tz: Optional[tzinfo] = None):
+        self.start = start.astimezone(timezone.utc) if start.tzinfo else start.replace(tzinfo=timezone.utc)
+        self.tz = tz or timezone.utc
+        self.elapsed = 0.0
+        self._sleepers: List[Tuple[float, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def local_now(self) -> datetime:
+        return self.now().astimezone(self.tz)
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    async def sleep(self, seconds: float):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self.elapsed + max(0.0, seconds), next(self._seq), future))
+        await future
+
+    def spawn(self, coro: Coroutine) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _settle(self):
+        for _ in range(self._MAX_SETTLE_ROUNDS):
+            if len(self._sleepers) >= len(self._tasks):
+                return
+            await asyncio.sleep(0)
+
+    async def run(self, until: Optional[float] = None):
+        """推进虚拟时间直到所有任务结束，或到达 until 秒（此时取消剩余任务）"""
+        while True:
+            await self._settle()
+            if not self._sleepers:
+                break
+            wake_at, _, future = self._sleepers[0]
+            if until is not None and wake_at > until:
+                break
+            heapq.heappop(self._sleepers)
+            self.elapsed = max(self.elapsed, wake_at)
+            if not future.cancelled():
+                future.set_result(None)
+
+        if until is not None:
+            self.elapsed = max(self.elapsed, until)
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._sleepers.clear()
+
+
+_clock: Clock = Clock()
+
+
+def get_clock() -> Clock:
+    return _clock
+
+
+def set_clock(clock: Clock) -> Clock:
+    """替换全局时钟，返回原来的时钟以便恢复"""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
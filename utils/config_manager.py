@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import asyncio
+import copy
 from configparser import ConfigParser
+from dataclasses import dataclass
 from pathlib import Path
 from threading import RLock
-from typing import Any, Callable, Dict, Iterable, Optional, TypeVar
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import os
-from utils.logger import get_logger
+from utils.logger import configure_logging, get_logger, parse_module_levels
 
 logger = get_logger(__name__)
 
@@ -27,23 +31,59 @@ class ConfigManager:
         self._env_prefix = env_prefix.upper()
         self._parser = ConfigParser()
         self._lock = RLock()
+        self._mtime: Optional[float] = None
         self.reload()
 
+    @property
+    def config_path(self) -> Path:
+        return self._config_path
+
     def reload(self) -> None:
-        """从磁盘重新加载配置。"""
+        """从磁盘重新加载配置。解析到新的 parser 后再整体替换，已删除的配置项不会残留。"""
+        self.adopt(self.load_candidate())
+
+    def load_candidate(self) -> ConfigManager:
+        """
+        从磁盘解析出一份新的配置副本，不修改当前实例。
+        配合 adopt 使用：副本校验通过后再替换，校验失败时当前 parser 与 mtime 保持不变，下次检查会重新评估该文件。
+        """
+        candidate = copy.copy(self)
+        candidate._lock = RLock()
+        # 使用 is_file()。如果宿主机不存在该文件，Docker 可能会创建一个同名的文件夹，导致 exists() 为 True 但无法作为配置文件读取。
+        if not self._config_path.is_file():
+            if self._config_path.exists():
+                logger.warning(f"{self._config_path} 是一个目录而不是文件，将跳过读取。")
+            else:
+                logger.info(f"配置文件不存在: {self._config_path}，将仅依赖环境变量配置。")
+            candidate._mtime = None
+            return candidate
+
+        # 先记录 mtime 再读取，读取期间文件再次被修改时下次检查仍会发现变化
+        mtime = self._stat_mtime()
+        parser = ConfigParser()
+        read_files = parser.read(self._config_path, encoding="utf-8")
+        if not read_files:
+            # 只有当路径存在但读取失败（比如权限问题）时才抛出异常
+            raise ConfigError(f"未能正确解析配置文件: {self._config_path}")
+        candidate._parser = parser
+        candidate._mtime = mtime
+        return candidate
+
+    def adopt(self, candidate: ConfigManager) -> None:
+        """整体替换为 load_candidate 得到的副本的 parser 与 mtime。"""
         with self._lock:
-            # 使用 is_file()。如果宿主机不存在该文件，Docker 可能会创建一个同名的文件夹，导致 exists() 为 True 但无法作为配置文件读取。
-            if not self._config_path.is_file():
-                if self._config_path.exists():
-                    logger.warning(f"{self._config_path} 是一个目录而不是文件，将跳过读取。")
-                else:
-                    logger.info(f"配置文件不存在: {self._config_path}，将仅依赖环境变量配置。")
-                return
-                
-            read_files = self._parser.read(self._config_path, encoding="utf-8")
-            if not read_files:
-                # 只有当路径存在但读取失败（比如权限问题）时才抛出异常
-                raise ConfigError(f"未能正确解析配置文件: {self._config_path}")
+            self._parser = candidate._parser
+            self._mtime = candidate._mtime
+
+    def is_stale(self) -> bool:
+        """配置文件的 mtime 与上次加载时不一致时返回 True。"""
+        return self._stat_mtime() != self._mtime
+
+    def _stat_mtime(self) -> Optional[float]:
+        try:
+            return self._config_path.stat().st_mtime if self._config_path.is_file() else None
+        except OSError:
+            return None
 
     def get(self, section: str, option: str, *, fallback: Optional[T] = None, cast: Optional[Callable[[str], T]] = None, required: bool = False) -> Optional[T | str]:
         """返回配置值，支持可选的类型转换和验证。"""
@@ -70,6 +110,9 @@ class ConfigManager:
     def get_bool(self, section: str, option: str, **kwargs: Any) -> Optional[bool]:
         return self.get(section, option, cast=self._to_bool, **kwargs)
 
+    def sections(self) -> List[str]:
+        return self._parser.sections()
+
     def as_dict(self, section: str, *, include_env: bool = True) -> Dict[str, str]:
         """以字典形式返回解析后的配置段副本。"""
         if not self._parser.has_section(section):
@@ -152,5 +195,362 @@ def get_config(section: str, option: str, **kwargs: Any) -> Optional[Any]:
     return get_manager().get(section, option, **kwargs)
 
 
-def reload_config() -> None:
-    get_manager().reload()
+# ---------------------------------------------------------------------------
+# 类型化配置快照
+# ---------------------------------------------------------------------------
+
+def _optional_str(value: Any) -> Optional[str]:
+    text = str(value).strip() if value is not None else ""
+    return text or None
+
+
+def _split_set(value: Optional[str]) -> frozenset:
+    return frozenset(item.strip() for item in (value or "").split(",") if item.strip())
+
+
+def _check_timezone(name: str) -> str:
+    if name.upper() != "UTC":
+        try:
+            ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError) as exc:
+            raise ConfigError(f"未知时区: {name}") from exc
+    return name
+
+
+def _parse_chat_timezones(value: Optional[str]) -> tuple:
+    """解析 "-1001234 Asia/Shanghai, 5678 UTC" 形式的聊天时区配置"""
+    result = []
+    for item in (value or "").split(","):
+        parts = item.split()
+        if not parts:
+            continue
+        if len(parts) != 2:
+            raise ConfigError(f"chat_timezones 格式应为 '<chat_id> <时区>': {item.strip()}")
+        result.append((parts[0], _check_timezone(parts[1])))
+    return tuple(result)
+
+
+def _parse_mirrors(primary: Optional[str], value: Optional[str]) -> tuple:
+    """解析 "http://a:1200 2, http://b:1200" 形式的镜像列表（地址 + 可选权重），主地址权重为 1"""
+    mirrors = [(primary.rstrip("/"), 1.0)] if primary else []
+    for item in (value or "").split(","):
+        parts = item.split()
+        if not parts:
+            continue
+        url = parts[0].rstrip("/")
+        weight = float(parts[1]) if len(parts) > 1 else 1.0
+        if url not in {m[0] for m in mirrors}:
+            mirrors.append((url, weight))
+    return tuple(mirrors)
+
+
+def _filter_sections(manager: ConfigManager) -> tuple:
+    """收集 [filter]、[filter.<category>]、[filter.user.<user_id>] 配置段"""
+    rules = []
+    for section in manager.sections():
+        if section == "filter":
+            scope = "*"
+        elif section.startswith("filter.user."):
+            scope = "user:" + section[len("filter.user."):]
+        elif section.startswith("filter."):
+            scope = section[len("filter."):]
+        else:
+            continue
+        rules.append((scope, tuple(sorted(manager.as_dict(section).items()))))
+    return tuple(rules)
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """
+    预先解析好的只读配置快照。
+    热路径直接读取属性，无需加锁和查询环境变量；配置变更时整体替换为新的快照。
+    """
+    base_type: str
+    rss_base_url: Optional[str]
+    # 所有 RSSHub 地址及权重：((url, weight), ...)，第一个为 rss_base_url
+    rss_mirrors: tuple
+    # 上游最大并发（AIMD 上限）、下线后的初始冷却时间（秒）、探测路径，以及全部下线时轮询最多暂停的秒数
+    upstream_max_concurrency: int
+    upstream_cooldown_seconds: float
+    upstream_probe_path: str
+    upstream_pause_max_seconds: float
+    # 单次响应体上限（字节，按解压后计）、允许的最大解压比，以及错误信息中保留的响应内容字符数
+    rss_max_body_bytes: int
+    rss_max_decompression_ratio: float
+    rss_error_body_chars: int
+    # 同一订阅抓取结果的复用时间（秒），0 表示只合并并发请求不缓存
+    fetch_cache_ttl: float
+    # RSS 解析执行方式：inline / thread / process，以及线程/进程池大小
+    parse_mode: str
+    parse_workers: int
+    num_groups: int
+    daily_refresh_hour: int
+    daily_refresh_minute: int
+    misfire_grace_seconds: int
+    # 定时任务库：sqlalchemy（保存在数据库中）或 memory；错过的多次触发是否合并为一次、同一任务的最大并发实例数
+    job_store: str
+    job_coalesce: bool
+    job_max_instances: int
+    # 组内相邻两个用户之间的请求间隔（秒）
+    user_interval_seconds: float
+    # 距上次检查不足该秒数的用户会被跳过
+    skip_recent_seconds: int
+    # 重启补跑时同时运行的分组数上限
+    catchup_concurrency: int
+    # VIP 通道：这些分类的用户与 priority = vip 的用户每 vip_interval_minutes 分钟轮询一次，
+    # 用户间隔 vip_user_interval_seconds 秒，保留 vip_reserved_fetch_slots 个上游并发名额，送达延迟目标为 vip_slo_seconds
+    vip_categories: frozenset
+    vip_interval_minutes: int
+    vip_user_interval_seconds: float
+    vip_reserved_fetch_slots: int
+    vip_slo_seconds: float
+    # 配置文件变更检测间隔（秒），0 表示关闭
+    config_watch_interval: float
+    target_chat_id: Optional[str]
+    admin_chat_id: Optional[str]
+    # 接收 Bot 命令的方式：polling（长轮询）或 webhook
+    telegram_update_mode: str
+    # Telegram 可访问的 webhook 完整地址，例如 https://example.com/telegram/webhook
+    webhook_url: Optional[str]
+    webhook_secret: Optional[str]
+    # URL 无法判断媒体类型时是否发送 HEAD 请求探测 Content-Type
+    media_probe: bool
+    # 通知中帖子时间的展示时区（IANA 名称），chat_timezones 为 ((chat_id, 时区), ...) 的单独配置
+    display_timezone: str
+    chat_timezones: tuple
+    # 过滤规则原始配置：((作用域, ((选项, 值), ...)), ...)，作用域为 "*"、分类名或 "user:<user_id>"
+    filter_rules: tuple
+    # 跨用户去重：窗口内已推送过相同媒体/文本的帖子被跳过（skip）或只发送一条简短提示（note）
+    dedup_enabled: bool
+    dedup_window_hours: float
+    dedup_mode: str
+    dedup_cache_size: int
+    # 补推通道的发送速率上限（条/分钟），与实时推送互不挤占
+    backfill_rate_per_minute: float
+    # 订阅统计：每个订阅保留的样本数、落库间隔（分钟）和 /stats 报表条数
+    stats_window: int
+    stats_flush_minutes: int
+    stats_top_n: int
+    # 摘要模式：这些分类的新帖子先缓冲，每 digest_window_minutes 合并发送一次
+    digest_categories: frozenset
+    digest_window_minutes: int
+    # text：仅文本链接；album：额外发送一组缩略图
+    digest_mode: str
+    # 日志配置：全局级别、输出格式（text/json）、模块级别、是否输出 SQL
+    log_level: str
+    log_format: str
+    log_module_levels: tuple
+    sql_echo: bool
+    # 链路追踪：none / file / otlp
+    tracing_exporter: str
+    tracing_file: str
+    tracing_otlp_endpoint: Optional[str]
+    # 事件循环监控：采样间隔、阻塞告警阈值（秒），以及是否开启 asyncio debug 慢回调报告
+    loop_monitor_enabled: bool
+    loop_monitor_interval: float
+    loop_slow_threshold: float
+    asyncio_debug: bool
+    # 启动时是否开启 tracemalloc 内存分析（运行中也可用 /memprof 开关），以及记录的调用栈深度
+    memory_profile: bool
+    memory_profile_frames: int
+    # 内存占用硬上限：每个订阅保留的条目数、每条帖子的媒体数、每个用户单次轮询处理的新帖数，超出部分计入 caps.* 指标
+    max_items_per_feed: int
+    max_media_per_post: int
+    max_queued_posts: int
+    # SendHistory 保留策略
+    retention_enabled: bool
+    retention_max_age_days: int
+    # 最多保留的记录数，0 表示不限制
+    retention_max_rows: int
+    retention_batch_size: int
+    retention_batch_pause_seconds: float
+    retention_archive_dir: str
+    retention_hour: int
+    # HTTP API 访问令牌，为空时拒绝所有 API 请求
+    api_token: Optional[str]
+    # /metrics 是否无需令牌即可访问
+    public_metrics: bool
+
+    @classmethod
+    def from_manager(cls, manager: ConfigManager) -> "Settings":
+        return cls(
+            base_type=manager.get("base", "type", fallback="rss"),
+            rss_base_url=_optional_str(manager.get("rss", "rss_base_url")),
+            rss_mirrors=_parse_mirrors(_optional_str(manager.get("rss", "rss_base_url")), manager.get("rss", "mirrors")),
+            upstream_max_concurrency=max(1, manager.get_int("rss", "max_concurrency", fallback=4)),
+            upstream_cooldown_seconds=max(1.0, manager.get_float("rss", "cooldown_seconds", fallback=30.0)),
+            upstream_probe_path=manager.get("rss", "probe_path", fallback="/healthz"),
+            upstream_pause_max_seconds=max(0.0, manager.get_float("rss", "pause_max_seconds", fallback=1800.0)),
+            rss_max_body_bytes=max(1024, manager.get_int("rss", "max_body_bytes", fallback=10 * 1024 * 1024)),
+            rss_max_decompression_ratio=max(1.0, manager.get_float("rss", "max_decompression_ratio", fallback=100.0)),
+            rss_error_body_chars=max(0, manager.get_int("rss", "error_body_chars", fallback=500)),
+            fetch_cache_ttl=manager.get_float("rss", "fetch_cache_ttl", fallback=30.0),
+            parse_mode=manager.get("rss", "parse_mode", fallback="inline").lower(),
+            parse_workers=max(1, manager.get_int("rss", "parse_workers", fallback=2)),
+            num_groups=max(1, manager.get_int("base", "num_groups", fallback=6)),
+            daily_refresh_hour=manager.get_int("base", "daily_refresh_hour", fallback=23),
+            daily_refresh_minute=manager.get_int("base", "daily_refresh_minute", fallback=50),
+            misfire_grace_seconds=manager.get_int("base", "misfire_grace_seconds", fallback=3600),
+            job_store=manager.get("base", "job_store", fallback="sqlalchemy").lower(),
+            job_coalesce=manager.get_bool("base", "job_coalesce", fallback=True),
+            job_max_instances=max(1, manager.get_int("base", "job_max_instances", fallback=1)),
+            user_interval_seconds=manager.get_float("base", "user_interval_seconds", fallback=60.0),
+            skip_recent_seconds=manager.get_int("base", "skip_recent_seconds", fallback=3600),
+            catchup_concurrency=max(1, manager.get_int("base", "catchup_concurrency", fallback=1)),
+            vip_categories=_split_set(manager.get("priority", "vip_categories", fallback="")),
+            vip_interval_minutes=max(1, manager.get_int("priority", "vip_interval_minutes", fallback=15)),
+            vip_user_interval_seconds=max(0.0, manager.get_float("priority", "vip_user_interval_seconds", fallback=5.0)),
+            vip_reserved_fetch_slots=max(0, manager.get_int("priority", "reserved_fetch_slots", fallback=1)),
+            vip_slo_seconds=max(1.0, manager.get_float("priority", "slo_seconds", fallback=1800.0)),
+            config_watch_interval=manager.get_float("base", "config_watch_interval", fallback=10.0),
+            target_chat_id=_optional_str(manager.get("telegram", "target_chat_id")),
+            admin_chat_id=_optional_str(manager.get("telegram", "admin_chat_id")),
+            telegram_update_mode=manager.get("telegram", "update_mode", fallback="polling").lower(),
+            webhook_url=_optional_str(manager.get("telegram", "webhook_url")),
+            webhook_secret=_optional_str(manager.get("telegram", "webhook_secret")),
+            media_probe=manager.get_bool("telegram", "media_probe", fallback=True),
+            display_timezone=_check_timezone(manager.get("telegram", "timezone", fallback="UTC").strip() or "UTC"),
+            chat_timezones=_parse_chat_timezones(manager.get("telegram", "chat_timezones")),
+            filter_rules=_filter_sections(manager),
+            dedup_enabled=manager.get_bool("dedup", "enabled", fallback=True),
+            dedup_window_hours=manager.get_float("dedup", "window_hours", fallback=24.0),
+            dedup_mode=manager.get("dedup", "mode", fallback="skip").lower(),
+            dedup_cache_size=max(1, manager.get_int("dedup", "cache_size", fallback=20000)),
+            backfill_rate_per_minute=max(1.0, manager.get_float("backfill", "rate_per_minute", fallback=20.0)),
+            stats_window=max(1, manager.get_int("stats", "window", fallback=50)),
+            stats_flush_minutes=max(1, manager.get_int("stats", "flush_minutes", fallback=10)),
+            stats_top_n=max(1, manager.get_int("stats", "top_n", fallback=10)),
+            digest_categories=_split_set(manager.get("digest", "categories", fallback="")),
+            digest_window_minutes=max(1, manager.get_int("digest", "window_minutes", fallback=60)),
+            digest_mode=manager.get("digest", "mode", fallback="text").lower(),
+            log_level=manager.get("logging", "level", fallback="INFO").upper(),
+            log_format=manager.get("logging", "format", fallback="text").lower(),
+            log_module_levels=parse_module_levels(manager.get("logging", "module_levels", fallback="")),
+            sql_echo=manager.get_bool("logging", "sql_echo", fallback=False),
+            tracing_exporter=manager.get("tracing", "exporter", fallback="none").lower(),
+            tracing_file=manager.get("tracing", "file_path", fallback="traces.jsonl"),
+            tracing_otlp_endpoint=_optional_str(manager.get("tracing", "otlp_endpoint")),
+            loop_monitor_enabled=manager.get_bool("monitor", "enabled", fallback=True),
+            loop_monitor_interval=max(10, manager.get_int("monitor", "interval_ms", fallback=500)) / 1000,
+            loop_slow_threshold=max(10, manager.get_int("monitor", "slow_threshold_ms", fallback=200)) / 1000,
+            asyncio_debug=manager.get_bool("monitor", "asyncio_debug", fallback=False),
+            memory_profile=manager.get_bool("monitor", "memory_profile", fallback=False),
+            memory_profile_frames=max(1, manager.get_int("monitor", "memory_profile_frames", fallback=1)),
+            max_items_per_feed=max(1, manager.get_int("limits", "max_items_per_feed", fallback=100)),
+            max_media_per_post=max(1, manager.get_int("limits", "max_media_per_post", fallback=20)),
+            max_queued_posts=max(1, manager.get_int("limits", "max_queued_posts", fallback=50)),
+            retention_enabled=manager.get_bool("retention", "enabled", fallback=False),
+            retention_max_age_days=manager.get_int("retention", "max_age_days", fallback=90),
+            retention_max_rows=manager.get_int("retention", "max_rows", fallback=0),
+            retention_batch_size=max(1, manager.get_int("retention", "batch_size", fallback=500)),
+            retention_batch_pause_seconds=manager.get_float("retention", "batch_pause_seconds", fallback=0.5),
+            retention_archive_dir=manager.get("retention", "archive_dir", fallback="archive"),
+            retention_hour=manager.get_int("retention", "hour", fallback=4),
+            api_token=_optional_str(manager.get("api", "token")),
+            public_metrics=manager.get_bool("api", "public_metrics", fallback=False),
+        )
+
+    def apply_logging(self) -> None:
+        """将日志相关配置应用到 utils.logger"""
+        configure_logging(self.log_level, self.log_format, self.log_module_levels, self.sql_echo)
+
+
+ReloadListener = Callable[[Settings, Settings], Any]
+
+_settings: Optional[Settings] = None
+_reload_listeners: List[ReloadListener] = []
+
+
+def get_settings() -> Settings:
+    """返回当前配置快照。只读一次模块全局变量，调用方无需加锁。"""
+    settings = _settings
+    if settings is None:
+        settings = _build_settings()
+    return settings
+
+
+def _build_settings() -> Settings:
+    global _settings
+    with _manager_lock:
+        if _settings is None:
+            _settings = Settings.from_manager(get_manager())
+        return _settings
+
+
+def add_reload_listener(listener: ReloadListener) -> None:
+    """注册配置变更回调，参数为 (旧快照, 新快照)，仅在快照内容变化时调用。"""
+    if listener not in _reload_listeners:
+        _reload_listeners.append(listener)
+
+
+def reload_config() -> bool:
+    """
+    重新加载配置并原子替换快照。
+    新配置解析失败时保留旧快照并抛出 ConfigError；返回快照是否发生变化。
+    """
+    global _settings
+    with _manager_lock:
+        manager = get_manager()
+        old = get_settings()
+        try:
+            # 先在副本上构建并校验新快照，成功后才替换 manager 的 parser 与 mtime，
+            # 被拒绝的文件不会被记为已加载，下次检查时会重新评估
+            candidate = manager.load_candidate()
+            new = Settings.from_manager(candidate)
+        except Exception as exc:
+            raise ConfigError(f"新配置无效，继续使用旧配置: {exc}") from exc
+        manager.adopt(candidate)
+        _settings = new
+
+    if new == old:
+        return False
+
+    logger.info("配置已重新加载")
+    for listener in list(_reload_listeners):
+        try:
+            listener(old, new)
+        except Exception as e:
+            logger.error(f"配置变更回调执行失败: {e}")
+    return True
+
+
+class ConfigWatcher:
+    """通过轮询 mtime 监听配置文件变更，变更后自动调用 reload_config。"""
+
+    def __init__(self, interval: Optional[float] = None) -> None:
+        self._interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        interval = self._interval if self._interval is not None else get_settings().config_watch_interval
+        if interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(interval), name="config_watcher")
+        logger.info(f"配置文件监听已启动: {get_manager().config_path} (间隔 {interval}s)")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self, interval: float) -> None:
+        manager = get_manager()
+        last_error: Optional[str] = None
+        while True:
+            await asyncio.sleep(interval)
+            if not manager.is_stale():
+                continue
+            try:
+                reload_config()
+                last_error = None
+            except ConfigError as e:
+                # 无效的文件在每次检查时都会重新评估，同一错误只记录一次
+                if str(e) != last_error:
+                    logger.error(str(e))
+                last_error = str(e)
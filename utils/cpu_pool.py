@@ -0,0 +1,55 @@
+"""
+CPU 密集任务（RSS 解析、HTML 提取）的执行方式：
+- inline：直接在事件循环中执行（默认，开销最小，适合小规模订阅）；
+- thread：线程池执行，释放事件循环（ElementTree/正则仍受 GIL 限制，但不会长时间阻塞其他协程）；
+- process：进程池执行，真正并行，参数和结果需要可序列化。
+  子进程用 forkserver 启动：主进程已有日志队列、链路追踪导出和事件循环监控等线程，直接 fork 可能死锁。
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from utils.logger import get_logger
+from utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+_executor: Optional[Executor] = None
+_config: tuple = ("inline", 0)
+
+
+def configure_cpu_pool(mode: str, workers: int):
+    """按配置创建执行器，配置未变化时保持不变"""
+    global _executor, _config
+    if (mode, workers) == _config:
+        return
+    old, _executor = _executor, None
+    if mode == "thread":
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cpu_pool")
+    elif mode == "process":
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+    elif mode != "inline":
+        logger.warning(f"Unknown parse mode '{mode}', falling back to inline.")
+    _config = (mode, workers)
+    if old is not None:
+        old.shutdown(wait=False)
+    logger.info(f"CPU pool mode: {mode}" + (f" ({workers} workers)" if _executor else ""))
+
+
+async def run_cpu(func: Callable[..., T], *args) -> T:
+    """在配置的执行器中运行 func（必须是模块级函数，process 模式下才能序列化）"""
+    executor = _executor
+    if executor is None:
+        return func(*args)
+    metrics.inc("cpu_pool.tasks")
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+def shutdown_cpu_pool():
+    global _executor, _config
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor, _config = None, ("inline", 0)
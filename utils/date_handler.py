@@ -1,6 +1,16 @@
-"""日期处理工具模块"""
-from datetime import datetime
+"""
+日期处理工具模块。
+
+内部时间一律使用带时区的 UTC datetime（数据库中由 model.model.UTCDateTime 统一转换），
+只在展示给用户时按聊天配置的时区（[telegram] timezone / chat_timezones）转换。
+"""
+from datetime import datetime, timezone, tzinfo
+from functools import lru_cache
 from typing import Optional, Union
+from zoneinfo import ZoneInfo
+
+from utils.clock import get_clock
+from utils.config_manager import get_settings
 
 class DateHandler:
     """日期处理类"""
@@ -14,15 +24,27 @@ class DateHandler:
         'date_only': '%Y-%m-%d'
     }
     
+    @staticmethod
+    def utcnow() -> datetime:
+        """当前时间（带时区的 UTC），取自可注入的全局时钟"""
+        return get_clock().now()
+
+    @staticmethod
+    def ensure_utc(dt: datetime) -> datetime:
+        """转换为 UTC；不带时区的值视为 UTC"""
+        if dt.tzinfo is None:
+            return dt.replace(tzinfo=timezone.utc)
+        return dt.astimezone(timezone.utc)
+
     @staticmethod
     def parse_rfc2822(date_str: str) -> Optional[datetime]:
-        """解析RFC 2822格式日期"""
+        """解析RFC 2822格式日期，返回 UTC 时间（RSSHub 的 pubDate 均为 GMT）"""
         if not date_str:
             return None
             
         try:
             # 尝试标准格式
-            return datetime.strptime(date_str.strip(), DateHandler.FORMATS['rfc2822'])
+            return DateHandler.ensure_utc(datetime.strptime(date_str.strip(), DateHandler.FORMATS['rfc2822']))
         except ValueError:
             # 尝试其他变体
             variants = [
@@ -32,7 +54,7 @@ class DateHandler:
             ]
             for fmt in variants:
                 try:
-                    return datetime.strptime(date_str.strip(), fmt)
+                    return DateHandler.ensure_utc(datetime.strptime(date_str.strip(), fmt))
                 except ValueError:
                     continue
             return None
@@ -49,15 +71,15 @@ class DateHandler:
         return dt.strftime(DateHandler.FORMATS['standard'])
 
     @staticmethod
-    def format_notify(dt: Union[datetime, str]) -> str:
-        """格式化为通知格式 yyyy-mm-dd HH:MM"""
+    def format_notify(dt: Union[datetime, str], chat_id: Union[str, int, None] = None) -> str:
+        """格式化为通知格式 yyyy-mm-dd HH:MM，按 chat_id 对应的展示时区转换"""
         if isinstance(dt, str):
             parsed_dt = DateHandler.parse_rfc2822(dt)
             if parsed_dt is None:
                 return dt  # 返回原字符串
             dt = parsed_dt
 
-        return dt.strftime('%Y-%m-%d %H:%M')
+        return DateHandler.ensure_utc(dt).astimezone(display_timezone(chat_id)).strftime('%Y-%m-%d %H:%M')
 
     @staticmethod
     def to_timestamp(dt: Union[datetime, str]) -> Optional[float]:
@@ -81,7 +103,23 @@ class DateHandler:
             
         return new_dt > old_dt
 
+@lru_cache(maxsize=64)
+def _zone(name: str) -> tzinfo:
+    return timezone.utc if name.upper() == "UTC" else ZoneInfo(name)
+
+
+def display_timezone(chat_id: Union[str, int, None] = None) -> tzinfo:
+    """聊天的展示时区：chat_timezones 中的单独配置优先，否则使用 [telegram] timezone"""
+    settings = get_settings()
+    name = dict(settings.chat_timezones).get(str(chat_id)) if chat_id is not None else None
+    return _zone(name or settings.display_timezone)
+
+
 # 便捷函数
+def utcnow() -> datetime:
+    """便捷的当前 UTC 时间函数"""
+    return DateHandler.utcnow()
+
 def parse_date(date_str: str) -> Optional[datetime]:
     """便捷的日期解析函数"""
     return DateHandler.parse_rfc2822(date_str)
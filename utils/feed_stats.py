@@ -0,0 +1,143 @@
+"""
+每个订阅的滚动统计：抓取耗时、响应大小、条目数、每次轮询的新帖数和连续失败次数。
+每个订阅只保留最近 window 次样本（固定长度环形缓冲），由调度任务定期落库。
+
+数据库中只保存摘要，重启后无法恢复原始样本：订阅在本进程中第一次被记录时以落库的摘要为基线，
+errors_total / error_streak / last_error 在基线上继续累计，均值按样本数与本进程的样本加权合并
+（基线最多占 window - 当前样本数 个名额，随新样本进入逐渐淘汰），p95 在本进程样本不足时沿用基线，结果为近似值。
+"""
+import time
+from collections import deque
+from threading import Lock
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+DEFAULT_WINDOW = 50
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _blend(values, base_value: Optional[float], base_weight: int, digits: int) -> Optional[float]:
+    """本进程样本的均值与基线均值按样本数加权合并"""
+    if base_value is None:
+        base_weight = 0
+    count = len(values) + base_weight
+    if not count:
+        return None
+    return round((sum(values) + (base_value or 0) * base_weight) / count, digits)
+
+
+class FeedStats:
+    __slots__ = ("fetches", "polls", "error_streak", "errors_total", "last_error", "last_update", "base")
+
+    def __init__(self, window: int, base: Optional[Dict[str, Any]] = None):
+        # (耗时 ms, 响应字节数, 条目数)
+        self.fetches: Deque[Tuple[float, int, int]] = deque(maxlen=window)
+        # 每次轮询的新帖数
+        self.polls: Deque[int] = deque(maxlen=window)
+        # 落库的摘要（上一个进程的统计），没有时为空字典
+        self.base: Dict[str, Any] = base or {}
+        self.error_streak = self.base.get("error_streak") or 0
+        self.errors_total = self.base.get("errors_total") or 0
+        self.last_error: Optional[str] = self.base.get("last_error")
+        self.last_update = time.time()
+
+    def summary(self) -> Dict[str, Any]:
+        window = self.fetches.maxlen or 0
+        fetch_carry = max(0, min(self.base.get("samples") or 0, window - len(self.fetches)))
+        poll_carry = max(0, min(self.base.get("samples") or 0, window - len(self.polls)))
+        latencies = [f[0] for f in self.fetches]
+        p95 = _percentile(latencies, 0.95)
+        if fetch_carry > len(latencies) and self.base.get("p95_latency_ms") is not None:
+            p95 = self.base["p95_latency_ms"]
+        avg_payload = _blend([f[1] for f in self.fetches], self.base.get("avg_payload_bytes"), fetch_carry, 0)
+        return {
+            "samples": len(self.fetches) + fetch_carry,
+            "avg_latency_ms": _blend(latencies, self.base.get("avg_latency_ms"), fetch_carry, 1),
+            "p95_latency_ms": p95,
+            "avg_payload_bytes": int(avg_payload) if avg_payload is not None else None,
+            "avg_items": _blend([f[2] for f in self.fetches], self.base.get("avg_items"), fetch_carry, 1),
+            "new_items_per_poll": _blend(self.polls, self.base.get("new_items_per_poll"), poll_carry, 2),
+            "error_streak": self.error_streak,
+            "errors_total": self.errors_total,
+            "last_error": self.last_error,
+        }
+
+
+class FeedStatsRegistry:
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self._window = window
+        self._lock = Lock()
+        self._feeds: Dict[str, FeedStats] = {}
+        self._dirty: set = set()
+        # 数据库中的摘要，订阅在本进程中第一次被记录时作为基线取出
+        self._persisted: Dict[str, Dict[str, Any]] = {}
+
+    def seed(self, summaries: Dict[str, Dict[str, Any]]):
+        """载入落库的摘要（启动时调用），已在内存中的订阅不受影响"""
+        with self._lock:
+            self._persisted = {user_id: summary for user_id, summary in summaries.items() if user_id not in self._feeds}
+
+    def remove(self, user_id: str):
+        """删除关注用户时丢弃其统计"""
+        with self._lock:
+            self._feeds.pop(user_id, None)
+            self._persisted.pop(user_id, None)
+            self._dirty.discard(user_id)
+
+    def set_window(self, window: int):
+        """调整环形缓冲长度，已有样本保留最近的部分"""
+        with self._lock:
+            if window == self._window:
+                return
+            self._window = window
+            for stats in self._feeds.values():
+                stats.fetches = deque(stats.fetches, maxlen=window)
+                stats.polls = deque(stats.polls, maxlen=window)
+
+    def _get(self, user_id: str) -> FeedStats:
+        stats = self._feeds.get(user_id)
+        if stats is None:
+            stats = self._feeds[user_id] = FeedStats(self._window, self._persisted.pop(user_id, None))
+        stats.last_update = time.time()
+        self._dirty.add(user_id)
+        return stats
+
+    def record_fetch(self, user_id: str, latency_ms: float, payload_bytes: int, items: int):
+        with self._lock:
+            stats = self._get(user_id)
+            stats.fetches.append((round(latency_ms, 1), payload_bytes, items))
+            stats.error_streak = 0
+
+    def record_error(self, user_id: str, error: str):
+        with self._lock:
+            stats = self._get(user_id)
+            stats.error_streak += 1
+            stats.errors_total += 1
+            stats.last_error = error[:200]
+
+    def record_poll(self, user_id: str, new_items: int):
+        with self._lock:
+            self._get(user_id).polls.append(new_items)
+
+    def summaries(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {user_id: stats.summary() for user_id, stats in self._feeds.items()}
+
+    def pop_dirty(self) -> Dict[str, Dict[str, Any]]:
+        """取出上次落库后有变化的订阅摘要"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            return {user_id: self._feeds[user_id].summary() for user_id in dirty if user_id in self._feeds}
+
+    def mark_dirty(self, user_ids: Iterable[str]):
+        """落库失败时把 pop_dirty 取出的订阅重新标记为待落库；期间已删除的订阅不再恢复"""
+        with self._lock:
+            self._dirty.update(user_id for user_id in user_ids if user_id in self._feeds)
+
+
+feed_stats = FeedStatsRegistry()
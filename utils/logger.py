@@ -1,23 +1,208 @@
+import atexit
+import contextvars
+import json
 import logging
+import queue
 import sys
+import threading
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+_TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 当前协程/线程的上下文字段（group、user_id、stage、latency_ms 等），由 log_context 设置
+_log_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("log_context", default={})
+
+# LogRecord 自带的属性，其余属性视为 extra 字段输出到 JSON
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "context"}
+
+_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+_default_level = logging.INFO
+_module_levels: Dict[str, int] = {}
+
+
+class JsonFormatter(logging.Formatter):
+    """将日志记录格式化为单行 JSON，附带上下文字段和 extra 字段。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": self.formatTime(record, _DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        payload.update(getattr(record, "context", None) or {})
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class ContextTextFormatter(logging.Formatter):
+    """文本格式，在消息末尾追加 key=value 形式的上下文字段。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        context = getattr(record, "context", None)
+        if context:
+            text += " | " + " ".join(f"{k}={v}" for k, v in context.items())
+        return text
+
+
+class _ContextQueueHandler(QueueHandler):
+    """
+    在调用线程中只捕获上下文字段，不做消息格式化；
+    %-style 参数的拼接、JSON 序列化和 I/O 全部在监听线程中完成。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        context = _log_context.get()
+        if context:
+            record.context = context
+        return record
+
+
+class LogStats:
+    """统计输出的日志条数和字节数，便于评估日志量和开销。"""
+
+    def __init__(self) -> None:
+        self.records = 0
+        self.bytes = 0
+        self.by_level: Dict[str, int] = {}
+
+    def add(self, level: str, size: int) -> None:
+        self.records += 1
+        self.bytes += size
+        self.by_level[level] = self.by_level.get(level, 0) + 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"records": self.records, "bytes": self.bytes, "by_level": dict(self.by_level)}
+
+
+class _StatsStreamHandler(logging.StreamHandler):
+    """输出到流的同时累计 LogStats（只在监听线程中调用）"""
+
+    def __init__(self, stream, stats: LogStats) -> None:
+        super().__init__(stream)
+        self._stats = stats
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        self._stats.add(record.levelname, len(text) + 1)
+        return text
+
+
+log_stats = LogStats()
+_queue_handler = _ContextQueueHandler(_queue)
+_output_handler = _StatsStreamHandler(sys.stdout, log_stats)
+_output_handler.setFormatter(ContextTextFormatter(fmt=_TEXT_FORMAT, datefmt=_DATE_FORMAT))
+
+
+def _ensure_listener() -> None:
+    global _listener
+    if _listener is not None:
+        return
+    with _listener_lock:
+        if _listener is None:
+            _listener = QueueListener(_queue, _output_handler, respect_handler_level=True)
+            _listener.start()
+            atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """停止后台监听线程并刷新剩余日志。"""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _level_for(name: str) -> int:
+    """按最长前缀匹配模块级别配置"""
+    best, level = -1, _default_level
+    for prefix, prefix_level in _module_levels.items():
+        if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > best:
+            best, level = len(prefix), prefix_level
+    return level
 
 
 def get_logger(name: str) -> logging.Logger:
     """
     获取统一格式的 logger。
     用法：logger = get_logger(__name__)
+    日志经队列交给后台线程输出，不会在事件循环中执行 I/O。
     """
     logger = logging.getLogger(name)
 
-    if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
-        handler.setFormatter(logging.Formatter(
-            fmt="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-        ))
-        logger.addHandler(handler)
-        logger.setLevel(logging.INFO)
+    if _queue_handler not in logger.handlers:
+        logger.addHandler(_queue_handler)
+        logger.setLevel(_level_for(name))
         logger.propagate = False
+        _ensure_listener()
 
     return logger
 
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """
+    在当前上下文中附加结构化字段，作用于其中所有日志：
+        with log_context(group=1, user_id="foo", stage="fetch"):
+            logger.info("...")
+    """
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def parse_module_levels(spec: str) -> Tuple[Tuple[str, str], ...]:
+    """解析 "module=LEVEL, other.module=LEVEL" 形式的配置"""
+    pairs = []
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        module, level = item.split("=", 1)
+        if module.strip() and level.strip():
+            pairs.append((module.strip(), level.strip().upper()))
+    return tuple(pairs)
+
+
+def configure_logging(
+        level: str = "INFO",
+        fmt: str = "text",
+        module_levels: Iterable[Tuple[str, str]] = (),
+        sql_echo: bool = False,
+) -> None:
+    """
+    应用日志配置：全局级别、输出格式（text/json）、模块级别以及 SQL 日志。
+    可重复调用，已创建的 logger 会立即按新配置调整级别。
+    """
+    global _default_level, _module_levels
+    default_level = logging.getLevelName(level.upper())
+    _default_level = default_level if isinstance(default_level, int) else logging.INFO
+    _module_levels = {
+        module: lvl for module, name in module_levels
+        if isinstance(lvl := logging.getLevelName(name), int)
+    }
+
+    if fmt == "json":
+        _output_handler.setFormatter(JsonFormatter())
+    else:
+        _output_handler.setFormatter(ContextTextFormatter(fmt=_TEXT_FORMAT, datefmt=_DATE_FORMAT))
+
+    for name, logger in list(logging.Logger.manager.loggerDict.items()):
+        if isinstance(logger, logging.Logger) and _queue_handler in logger.handlers:
+            logger.setLevel(_level_for(name))
+
+    # SQL 日志同样走队列输出，替代 create_async_engine(echo=True) 的同步 StreamHandler
+    sql_logger = get_logger("sqlalchemy.engine")
+    sql_logger.setLevel(logging.INFO if sql_echo else _module_levels.get("sqlalchemy.engine", logging.WARNING))
@@ -0,0 +1,117 @@
+"""
+事件循环健康监控：
+- 采样协程每 interval 秒唤醒一次，实际唤醒时间与预期的差值即调度延迟（loop lag），记录到 /metrics；
+- 看门狗线程检查采样协程的心跳，超过阈值未更新说明有回调阻塞了事件循环，
+  此时抓取事件循环线程当前的调用栈写入日志（每次阻塞只记录一次）；
+- 可选开启 asyncio debug 模式，由 asyncio 自身报告超过 slow_callback_duration 的回调。
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from utils.logger import get_logger
+from utils.metrics import metrics
+
+logger = get_logger(__name__)
+# asyncio debug 模式的慢回调告警同样经队列输出
+get_logger("asyncio")
+
+_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+
+class LoopMonitor:
+    def __init__(self):
+        self.interval = 0.5
+        self.threshold = 0.2
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._heartbeat = time.monotonic()
+
+    def configure(self, interval: float, threshold: float, debug: bool):
+        """
+        可重复调用，配置热更新时直接调整参数。
+        asyncio debug 与慢回调阈值与采样是否开启无关，总是作用于当前运行的事件循环。
+        """
+        self.interval = interval
+        self.threshold = threshold
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = self._loop
+        if loop is not None:
+            loop.set_debug(debug)
+            loop.slow_callback_duration = threshold
+
+    def start(self, interval: float, threshold: float, debug: bool = False):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self.configure(interval, threshold, debug)
+
+        metrics.register_gauge("event_loop.lag_ms", lambda: round(self.last_lag * 1000, 2))
+        metrics.register_gauge("event_loop.max_lag_ms", lambda: round(self.max_lag * 1000, 2))
+        metrics.register_gauge("event_loop.stalls", lambda: self.stalls)
+        metrics.register_gauge("event_loop.pending_tasks", self._pending_tasks)
+
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._sample(), name="loop_monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop_watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=2)
+            self._watchdog = None
+
+    def _pending_tasks(self) -> int:
+        loop = self._loop
+        return len(asyncio.all_tasks(loop)) if loop is not None and not loop.is_closed() else 0
+
+    async def _sample(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = max(0.0, now - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            metrics.observe("event_loop.lag_seconds", lag, _LAG_BUCKETS)
+
+    def _watch(self):
+        stalled = False
+        while not self._stop.wait(self.threshold / 2):
+            blocked = time.monotonic() - self._heartbeat - self.interval
+            if blocked <= self.threshold:
+                stalled = False
+                continue
+            if stalled:
+                continue
+            stalled = True
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<unavailable>"
+            logger.warning("Event loop blocked for %.0f ms, current stack:\n%s", blocked * 1000, stack,
+                           extra={"stage": "loop_monitor", "latency_ms": round(blocked * 1000, 1)})
+
+
+loop_monitor = LoopMonitor()
@@ -1,29 +1,67 @@
-from typing import Any, Optional
+from typing import Any, NamedTuple, Optional
 
-from pydantic import BaseModel, model_validator
-import xml.etree.ElementTree as ET
 import asyncio
 import httpx
-from datetime import datetime
-
-from utils.config_manager import get_config, ConfigError
-from utils.date_handler import parse_date
-
-class RssResponse(BaseModel):
-    title: str = ""
-    description: str = ""
-    link: str = ""
-    guid: str = ""
-    isPermaLink: bool = False
-    pubDate: str = ""
-    pubDatetime: Optional[datetime] = None
-    author: str = ""
-
-    @model_validator(mode='after')
-    def parse_datetime(self):
-        if self.pubDate:
-            self.pubDatetime = parse_date(self.pubDate)
-        return self
+
+from utils.config_manager import get_config, get_settings, ConfigError
+from utils.tracing import span
+
+# 解压后超过该大小才检查解压比，避免小响应误判
+_RATIO_CHECK_MIN_BYTES = 1 << 20
+
+
+class UpstreamError(ValueError):
+    """上游请求失败，status_code 为 None 表示没有拿到响应（超时、连接失败等）"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ResponseTooLarge(UpstreamError):
+    """响应体超过大小上限或解压比异常（疑似解压炸弹），status_code 为 200 时不影响上游健康判定"""
+
+    def __init__(self, message: str):
+        super().__init__(message, 200)
+
+
+async def _read_limited(response: httpx.Response, limit: int, max_ratio: float, strict: bool = False) -> bytes:
+    """
+    流式读取解压后的响应体，最多 limit 字节。
+    strict=True 时超限抛出 ResponseTooLarge，否则截断返回（用于错误响应）。
+    解压后大小超过已下载字节数 max_ratio 倍时视为解压炸弹。
+    """
+    chunks = []
+    size = 0
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        downloaded = max(response.num_bytes_downloaded, 1)
+        if size > _RATIO_CHECK_MIN_BYTES and size / downloaded > max_ratio:
+            if not strict:
+                break
+            raise ResponseTooLarge(f"解压比异常: {downloaded} 字节解压为超过 {size} 字节")
+        if size > limit:
+            if strict:
+                raise ResponseTooLarge(f"响应过大: 超过上限 {limit} 字节")
+            chunks.append(chunk[: len(chunk) - (size - limit)])
+            break
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _decode(body: bytes, encoding: Optional[str]) -> str:
+    return body.decode(encoding or "utf-8", errors="replace")
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit] + f"...（已截断，共 {len(text)} 字符）"
+
+
+class RawFeed(NamedTuple):
+    text: str
+    is_json: bool
+    payload_bytes: int
+
 
 class RssClient:
     def __init__(self, base_url: str = None):
@@ -47,12 +85,11 @@ class RssClient:
             raise ConfigError(f"[{section}] {option} 未配置")
         return cls(base_url)
 
-    async def _base_request(self, path: str, param: str = ''):
+    async def fetch_raw(self, path: str) -> "RawFeed":
         """
-        请求并解析RSS数据
-        :param path:
-        :param param:
-        :return:
+        只请求不解析，返回响应文本，解析交给调用方（可放到线程池/进程池中执行）。
+        响应体流式读取：超过 [rss] max_body_bytes（按解压后大小计）或解压比异常时立即中止，
+        非 200 响应只读取并保留前 error_body_chars 个字符。
         """
         url = (self.__base_url or "") + path
         should_close = False
@@ -62,98 +99,71 @@ class RssClient:
             client = httpx.AsyncClient()
             should_close = True
 
+        settings = get_settings()
         try:
-            response = await client.get(url)
-            if response.status_code != 200:
-                raise ValueError(f"请求失败，状态码: {response.status_code}, 错误信息: {response.text}")
-
-            # 检查响应内容类型
-            content_type = response.headers.get('content-type', '')
-
-            try:
-                if 'application/json' in content_type:
-                    # JSON格式响应
-                    data = response.json()
-                    return [RssResponse(**item) for item in data]
-                else:
-                    # 默认尝试解析为XML
-                    return self._parse_rss_xml(response.text)
-            except Exception as e:
-                raise ValueError(f"解析响应失败: {e}")
+            with span("rss.request", url=url) as request_span:
+                async with client.stream("GET", url) as response:
+                    request_span.set_attribute("status_code", response.status_code)
+                    if response.status_code != 200:
+                        body = await _read_limited(response, settings.rss_error_body_chars * 4, settings.rss_max_decompression_ratio)
+                        raise UpstreamError(
+                            f"请求失败，状态码: {response.status_code}, "
+                            f"错误信息: {_truncate(_decode(body, response.encoding), settings.rss_error_body_chars)}",
+                            response.status_code,
+                        )
+
+                    declared = response.headers.get("content-length")
+                    if declared and declared.isdigit() and int(declared) > settings.rss_max_body_bytes:
+                        raise ResponseTooLarge(f"响应过大: Content-Length {declared} 超过上限 {settings.rss_max_body_bytes}")
+                    body = await _read_limited(response, settings.rss_max_body_bytes, settings.rss_max_decompression_ratio,
+                                               strict=True)
+                    request_span.set_attribute("bytes", len(body))
+
+                    # 检查响应内容类型
+                    content_type = response.headers.get('content-type', '')
+                    return RawFeed(_decode(body, response.encoding), 'application/json' in content_type, len(body))
+        except UpstreamError:
+            raise
         except Exception as e:
             # 发送失败会由外部捕获，发送tg通知
-            raise ValueError(f"请求失败: {e}")
+            raise UpstreamError(f"请求失败: {e!r}") from e
         finally:
             if should_close:
                 await client.aclose()
 
-    async def get_x_rss_by_user_media(self, user_id: str):
-        """
-        获取指定用户发布的含媒体推文
-        :param user_id:
-        :return:
-        """
-        return await self._base_request(path=f"/twitter/media/{user_id}")
-
-    def _parse_rss_xml(self, xml_content: str) -> list[RssResponse]:
-        root = ET.fromstring(xml_content)
-        items = []
-
-        # 查找所有的item节点
-        for item in root.findall('.//item'):
-            # 提取各个字段
-            title_elem = item.find('title')
-            title = title_elem.text if title_elem is not None and title_elem.text else ""
+    async def probe(self, path: str = "/healthz", timeout: float = 10) -> bool:
+        """廉价的健康探测请求，返回 200 即视为可用"""
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.get((self.__base_url or "") + path)
+            return response.status_code == 200
 
-            description_elem = item.find('description')
-            description = description_elem.text if description_elem is not None and description_elem.text else ""
+    @property
+    def base_url(self) -> Optional[str]:
+        return self.__base_url
 
-            link_elem = item.find('link')
-            link = link_elem.text if link_elem is not None and link_elem.text else ""
+    async def get_x_rss_raw_by_user_media(self, user_id: str) -> "RawFeed":
+        """获取指定用户含媒体推文的原始响应"""
+        return await self.fetch_raw(path=f"/twitter/media/{user_id}")
 
-            guid_elem = item.find('guid')
-            guid = guid_elem.text if guid_elem is not None and guid_elem.text else ""
-
-            # 获取isPermaLink属性
-            is_perma_link = False
-            if guid_elem is not None and 'isPermaLink' in guid_elem.attrib:
-                is_perma_link = guid_elem.attrib['isPermaLink'].lower() == 'true'
-
-            pub_date_elem = item.find('pubDate')
-            pub_date = pub_date_elem.text if pub_date_elem is not None and pub_date_elem.text else ""
-
-            author_elem = item.find('author')
-            author = author_elem.text if author_elem is not None and author_elem.text else ""
-
-            # 创建RssResponse对象
-            rss_item = RssResponse(
-                title=title,
-                description=description,
-                link=link,
-                guid=guid,
-                isPermaLink=is_perma_link,
-                pubDate=pub_date,
-                author=author
-            )
-            items.append(rss_item)
-
-        return items
 
 async def test():
     """测试RSS客户端功能"""
+    from strategy.feed_parser import parse_twitter_feed
+
     async with RssClient("http://111.228.35.180:1200") as rss_client:
-        media = await rss_client.get_x_rss_by_user_media("Chung_hwani")
-        print(f"获取到 {len(media)} 条推文")
+        raw = await rss_client.get_x_rss_raw_by_user_media("Chung_hwani")
+        media = parse_twitter_feed(raw.text, raw.is_json)
+        print(f"获取到 {len(media)} 条推文（{raw.payload_bytes} 字节）")
         for i, item in enumerate(media[:3]):  # 只显示前3条
             print(f"\n--- 推文 {i+1} ---")
             print(f"标题: {item.title}")
             print(f"作者: {item.author}")
-            print(f"内容: {item.description}")
-            print(f"GUID: {item.guid}")
-            print(f"原始发布时间: {item.pubDate}")
-            print(f"解析后时间: {item.pubDatetime}")
+            print(f"内容: {item.content}")
+            print(f"原始发布时间: {item.publish_date}")
+            print(f"媒体: {item.media_list}")
             print(f"链接: {item.link}")
 
+
 if __name__ == '__main__':
     # 运行异步测试
     asyncio.run(test())
\ No newline at end of file
@@ -0,0 +1,63 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Tuple, TypeVar
+
+from utils.metrics import metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    合并同一 key 的并发请求：同一时刻只有一个请求真正执行，其余调用方等待并共享结果。
+    成功结果可在 ttl 秒内直接复用，失败结果不缓存。
+    注意：共享的结果对象会返回给多个调用方，调用方不应原地修改。
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024):
+        self._name = name
+        self._max_entries = max_entries
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._cache: Dict[Hashable, Tuple[float, T]] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]], ttl: float = 0) -> T:
+        cached = self._cache.get(key)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                metrics.inc(f"{self._name}.cache_hit")
+                return cached[1]
+            self._cache.pop(key, None)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t, ttl))
+        else:
+            metrics.inc(f"{self._name}.shared")
+
+        # shield：单个调用方被取消时不影响其他等待同一请求的调用方
+        return await asyncio.shield(task)
+
+    def invalidate(self, key: Hashable):
+        self._cache.pop(key, None)
+
+    def _on_done(self, key: Hashable, task: asyncio.Future, ttl: float):
+        self._inflight.pop(key, None)
+        if ttl <= 0 or task.cancelled() or task.exception() is not None:
+            return
+        if len(self._cache) >= self._max_entries:
+            self._evict()
+        self._cache[key] = (time.monotonic() + ttl, task.result())
+
+    def _evict(self):
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[key]
+        # 仍然超出上限时丢弃最早插入的一半
+        if len(self._cache) >= self._max_entries:
+            for key in list(self._cache)[: len(self._cache) // 2]:
+                del self._cache[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"inflight": len(self._inflight), "cached": len(self._cache)}
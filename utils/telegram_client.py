@@ -1,15 +1,20 @@
 from __future__ import annotations
 
-from telegram import Bot
-from telegram.ext import Application
+import html
+from typing import TYPE_CHECKING
 
-from utils.config_manager import ConfigError, get_config
+from utils.config_manager import ConfigError, get_config, get_settings
 from utils.logger import get_logger
 
+if TYPE_CHECKING:
+    from telegram import Bot
+    from telegram.ext import Application
+
 logger = get_logger(__name__)
 
 _application_instance: Application | None = None
-_target_chat_id: str | int | None = None
+# 错误通知正文上限，远低于 Telegram 4096 字符的消息限制
+_NOTIFICATION_LIMIT = 2000
 
 
 def get_telegram_bot() -> Bot:
@@ -29,6 +34,9 @@ def get_telegram_application() -> Application:
         if not token:
             raise ConfigError("[telegram] bot_token 未配置")
 
+        # 延迟导入 PTB，只在第一次需要 Bot 时加载
+        from telegram.ext import Application
+
         # Build the application with the token directly.
         # This creates the Bot and the Updater.
         _application_instance = Application.builder().token(token).build()
@@ -43,14 +51,12 @@ def get_telegram_application() -> Application:
 
 def get_target_chat_id() -> str | int:
     """
-    Returns the singleton target chat ID from config.
+    Returns the target chat ID from the current settings snapshot (follows config reloads).
     """
-    global _target_chat_id
-    if _target_chat_id is None:
-        _target_chat_id = get_config("telegram", "target_chat_id", required=True)
-        if not _target_chat_id:
-            raise ConfigError("[telegram] target_chat_id 未配置")
-    return _target_chat_id
+    target_chat_id = get_settings().target_chat_id
+    if not target_chat_id:
+        raise ConfigError("[telegram] target_chat_id 未配置")
+    return target_chat_id
 
 
 async def send_error_notification(bot: Bot, message: str):
@@ -61,7 +67,7 @@ async def send_error_notification(bot: Bot, message: str):
         target_chat_id = get_target_chat_id()
         await bot.send_message(
             chat_id=target_chat_id,
-            text=f"⚠️ <b>系统错误警告</b>\n{message}",
+            text=f"⚠️ <b>系统错误警告</b>\n{html.escape(message[:_NOTIFICATION_LIMIT])}",
             parse_mode="HTML",
         )
     except Exception as e:
@@ -0,0 +1,218 @@
+"""
+可选的链路追踪：
+- exporter = none：span 为空操作，几乎没有额外开销；
+- exporter = file：span 以 JSON Lines 写入本地文件（后台线程写入）；
+- exporter = otlp：需要安装 opentelemetry-sdk 与 opentelemetry-exporter-otlp，导出到本地 Collector。
+用法：
+    with span("rss.request", url=url): ...
+    @traced("telegram.send")
+    async def send(...): ...
+"""
+import contextvars
+import functools
+import inspect
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start", "end", "status", "_otel")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.status = "ok"
+        self._otel = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+        if self._otel is not None:
+            self._otel.set_attribute(key, value)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": round(((self.end or time.time()) - self.start) * 1000, 2),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class _FileExporter:
+    """在后台线程中把结束的 span 追加写入 JSONL 文件"""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._queue: "queue.SimpleQueue[Optional[Span]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace_file_exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        self._queue.put(span)
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        with open(self._path, "a", encoding="utf-8") as f:
+            while True:
+                span = self._queue.get()
+                if span is None:
+                    return
+                f.write(json.dumps(span.as_dict(), ensure_ascii=False, default=str) + "\n")
+                if self._queue.empty():
+                    f.flush()
+
+
+class _Tracer:
+    def __init__(self):
+        self.enabled = False
+        self._file_exporter: Optional[_FileExporter] = None
+        self._otel_provider = None
+        self._otel_tracer = None
+
+    def configure(self, exporter: str, file_path: str = "traces.jsonl", otlp_endpoint: Optional[str] = None):
+        self.shutdown()
+        if exporter == "file":
+            self._file_exporter = _FileExporter(file_path)
+            logger.info(f"Tracing enabled, exporting spans to {file_path}")
+        elif exporter == "otlp":
+            self._otel_provider = _create_otel_provider(otlp_endpoint)
+            if self._otel_provider is None:
+                return
+            self._otel_tracer = self._otel_provider.get_tracer("telerss")
+            logger.info(f"Tracing enabled, exporting spans via OTLP to {otlp_endpoint or 'default endpoint'}")
+        else:
+            return
+        self.enabled = True
+
+    def shutdown(self):
+        self.enabled = False
+        if self._file_exporter is not None:
+            self._file_exporter.shutdown()
+            self._file_exporter = None
+        self._otel_tracer = None
+        if self._otel_provider is not None:
+            # BatchSpanProcessor 中排队的 span 需要显式刷出，否则退出时丢失
+            try:
+                self._otel_provider.force_flush()
+                self._otel_provider.shutdown()
+            except Exception as e:
+                logger.warning(f"Failed to flush OTLP spans: {e}")
+            self._otel_provider = None
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        current = Span(name, parent.trace_id if parent else os.urandom(16).hex(),
+                       parent.span_id if parent else None, attributes)
+        token = _current_span.set(current)
+        otel_cm = None
+        if self._otel_tracer is not None:
+            otel_cm = self._otel_tracer.start_as_current_span(name, attributes=attributes)
+            current._otel = otel_cm.__enter__()
+        try:
+            yield current
+        except BaseException as e:
+            current.status = "error"
+            current.attributes["error"] = str(e)[:200]
+            if otel_cm is not None:
+                otel_cm.__exit__(type(e), e, e.__traceback__)
+                otel_cm = None
+            raise
+        finally:
+            current.end = time.time()
+            _current_span.reset(token)
+            if otel_cm is not None:
+                otel_cm.__exit__(None, None, None)
+            if self._file_exporter is not None:
+                self._file_exporter.export(current)
+
+
+def _create_otel_provider(endpoint: Optional[str]):
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        logger.warning("Tracing exporter 'otlp' requires opentelemetry-sdk and opentelemetry-exporter-otlp, tracing disabled.")
+        return None
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "telerss"}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint) if endpoint else OTLPSpanExporter()))
+    return provider
+
+
+tracer = _Tracer()
+
+
+def span(name: str, **attributes: Any):
+    """创建一个 span，嵌套调用时自动挂到当前 span 之下"""
+    return tracer.span(name, **attributes)
+
+
+def traced(name: str) -> Callable:
+    """为同步或异步函数自动创建 span 的装饰器"""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await func(*args, **kwargs)
+                with tracer.span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def configure_tracing(exporter: str, file_path: str = "traces.jsonl", otlp_endpoint: Optional[str] = None):
+    tracer.configure(exporter, file_path, otlp_endpoint)
+
+
+def shutdown_tracing():
+    tracer.shutdown()
@@ -0,0 +1,258 @@
+"""
+上游（RSSHub）健康跟踪与负载控制：
+- 按延迟、状态码和错误内容判断每个镜像的健康状况，连续失败或鉴权失效时标记为不可用；
+- 不可用的镜像冷却后先用一次廉价的探测请求确认恢复，再重新参与负载均衡；
+- 按权重在可用镜像之间随机选择，请求失败时切换到其他镜像；
+- 并发上限按 AIMD 调整：成功时缓慢增加，过载（429/5xx/超时）时减半；
+- 所有镜像都不可用时，非紧急的轮询可以调用 wait_available() 暂停等待恢复。
+"""
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils.logger import get_logger
+from utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# 视为上游过载的状态码
+OVERLOAD_STATUS = frozenset({429, 500, 502, 503, 504})
+# 错误内容中出现这些关键字时说明上游的 Twitter 鉴权/配置失效，重试没有意义
+AUTH_ERROR_MARKERS = ("ConfigNotFoundError", "not configured", "Unauthorized", "auth_token", "Could not authenticate")
+
+HEALTHY = "healthy"
+DOWN = "down"
+
+_FAILURE_THRESHOLD = 3
+_MAX_COOLDOWN = 600.0
+_EWMA_ALPHA = 0.2
+
+
+class AimdLimiter:
+    """
+    并发上限按加性增、乘性减调整的信号量。
+    reserved 个名额只留给 slot(use_reserved=True) 的请求（VIP 通道），普通请求最多使用 limit - reserved 个。
+    过载减半时 limit 不低于 reserved + 1，预留名额在上游过载时依然存在，普通请求也始终保有至少 1 个名额。
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, reserved: int = 0):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.reserved = 0
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._cond = asyncio.Condition()
+        self.set_reserved(reserved)
+
+    def _floor(self) -> int:
+        return min(self.max_limit, max(self.min_limit, self.reserved + 1))
+
+    def _capacity(self, use_reserved: bool) -> int:
+        limit = int(self.limit)
+        return limit if use_reserved else max(0, limit - self.reserved)
+
+    @asynccontextmanager
+    async def slot(self, use_reserved: bool = False) -> AsyncIterator[None]:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self._capacity(use_reserved))
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def on_success(self):
+        self.limit = min(self.max_limit, self.limit + 1 / max(self.limit, 1))
+
+    def on_overload(self):
+        self.limit = max(self._floor(), self.limit / 2)
+
+    def set_max(self, max_limit: int):
+        self.max_limit = max_limit
+        self.limit = min(self.limit, max_limit)
+        self.set_reserved(self.reserved)
+
+    def set_reserved(self, reserved: int):
+        """预留名额最多为 max_limit - 1，保证普通请求不会被完全挡住"""
+        self.reserved = max(0, min(reserved, self.max_limit - 1))
+        self.limit = max(self.limit, self._floor())
+
+
+class Upstream:
+    __slots__ = ("base_url", "weight", "state", "failures", "latency", "cooldown", "retry_at", "last_error")
+
+    def __init__(self, base_url: str, weight: float):
+        self.base_url = base_url
+        self.weight = weight
+        self.state = HEALTHY
+        self.failures = 0
+        # 成功请求耗时的指数移动平均（秒）
+        self.latency: Optional[float] = None
+        self.cooldown = 0.0
+        self.retry_at = 0.0
+        self.last_error: Optional[str] = None
+
+    def as_dict(self):
+        return {
+            "base_url": self.base_url,
+            "weight": self.weight,
+            "state": self.state,
+            "failures": self.failures,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+def classify_failure(status_code: Optional[int], message: str) -> str:
+    """
+    返回失败类型：
+    - auth：上游鉴权/配置失效，立即下线；
+    - overload：过载、超时或连接失败，计入失败并降低并发；
+    - client：单个订阅的问题（如 404 用户不存在、响应过大），不影响上游健康。
+    """
+    if any(marker in message for marker in AUTH_ERROR_MARKERS):
+        return "auth"
+    if status_code is not None and 200 <= status_code < 300:
+        # 响应过大等内容问题只与单个订阅有关
+        return "client"
+    if status_code is None or status_code in OVERLOAD_STATUS:
+        return "overload"
+    if 400 <= status_code < 500:
+        return "client"
+    return "overload"
+
+
+class UpstreamPool:
+    def __init__(self, mirrors: Sequence[Tuple[str, float]], max_concurrency: int,
+                 cooldown: float = 30.0, probe: Optional[Callable[[str], Awaitable[bool]]] = None,
+                 reserved: int = 0):
+        self.upstreams: List[Upstream] = [Upstream(url, weight) for url, weight in mirrors]
+        self.limiter = AimdLimiter(max_concurrency, reserved=reserved)
+        self.base_cooldown = cooldown
+        self._probe = probe
+        self._probing: Dict[str, asyncio.Task] = {}
+        self._recovered = asyncio.Event()
+        self._recovered.set()
+        metrics.register_gauge("upstream.concurrency_limit", lambda: round(self.limiter.limit, 2))
+        metrics.register_gauge("upstream.healthy", lambda: sum(u.state == HEALTHY for u in self.upstreams))
+
+    def update(self, mirrors: Sequence[Tuple[str, float]], max_concurrency: int, cooldown: float,
+               reserved: int = 0):
+        """配置热更新：保留仍存在的镜像的健康状态"""
+        existing = {u.base_url: u for u in self.upstreams}
+        upstreams = []
+        for url, weight in mirrors:
+            upstream = existing.get(url) or Upstream(url, weight)
+            upstream.weight = weight
+            upstreams.append(upstream)
+        self.upstreams = upstreams
+        self.limiter.set_max(max_concurrency)
+        self.limiter.set_reserved(reserved)
+        self.base_cooldown = cooldown
+        self._refresh_recovered()
+
+    def available(self) -> bool:
+        return any(u.state == HEALTHY for u in self.upstreams)
+
+    def pick(self, exclude: Sequence[Upstream] = ()) -> Optional[Upstream]:
+        """按权重选择一个可用镜像，优先避开本次请求已失败的镜像"""
+        self._schedule_probes()
+        healthy = [u for u in self.upstreams if u.state == HEALTHY]
+        candidates = [u for u in healthy if u not in exclude] or healthy
+        if not candidates:
+            return None
+        return random.choices(candidates, weights=[max(u.weight, 0.01) for u in candidates])[0]
+
+    def record_success(self, upstream: Upstream, latency: float):
+        upstream.failures = 0
+        upstream.last_error = None
+        upstream.latency = latency if upstream.latency is None else (
+            _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * upstream.latency)
+        self.limiter.on_success()
+        metrics.observe("upstream.latency_seconds", latency)
+
+    def record_failure(self, upstream: Upstream, status_code: Optional[int], message: str) -> str:
+        kind = classify_failure(status_code, message)
+        metrics.inc(f"upstream.failure.{kind}")
+        if kind == "client":
+            return kind
+        upstream.failures += 1
+        upstream.last_error = message[:200]
+        if kind == "overload":
+            self.limiter.on_overload()
+        if kind == "auth" or upstream.failures >= _FAILURE_THRESHOLD:
+            self._mark_down(upstream, kind)
+        return kind
+
+    def _mark_down(self, upstream: Upstream, reason: str):
+        if upstream.state == DOWN:
+            return
+        upstream.state = DOWN
+        upstream.cooldown = self.base_cooldown
+        upstream.retry_at = time.monotonic() + upstream.cooldown
+        logger.warning("Upstream %s marked down (%s): %s", upstream.base_url, reason, upstream.last_error)
+        metrics.inc("upstream.marked_down")
+        self._refresh_recovered()
+
+    def _refresh_recovered(self):
+        if self.available():
+            self._recovered.set()
+        else:
+            self._recovered.clear()
+
+    def _schedule_probes(self):
+        if self._probe is None:
+            return
+        now = time.monotonic()
+        for upstream in self.upstreams:
+            if upstream.state == DOWN and upstream.retry_at <= now and upstream.base_url not in self._probing:
+                task = asyncio.get_running_loop().create_task(self._run_probe(upstream))
+                self._probing[upstream.base_url] = task
+                task.add_done_callback(lambda _, url=upstream.base_url: self._probing.pop(url, None))
+
+    async def _run_probe(self, upstream: Upstream):
+        try:
+            ok = await self._probe(upstream.base_url)
+        except Exception as e:
+            ok = False
+            upstream.last_error = f"probe failed: {e}"[:200]
+        if ok:
+            upstream.state = HEALTHY
+            upstream.failures = 0
+            logger.info("Upstream %s recovered after probe.", upstream.base_url)
+            metrics.inc("upstream.recovered")
+        else:
+            upstream.cooldown = min(_MAX_COOLDOWN, upstream.cooldown * 2)
+            upstream.retry_at = time.monotonic() + upstream.cooldown
+            logger.warning("Upstream %s probe failed, next probe in %.0fs.", upstream.base_url, upstream.cooldown)
+        self._refresh_recovered()
+
+    async def wait_available(self, timeout: float) -> bool:
+        """所有镜像都不可用时等待探测恢复，最多 timeout 秒。返回是否有可用镜像"""
+        if self.available():
+            return True
+        deadline = time.monotonic() + timeout
+        while not self.available():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._schedule_probes()
+            # 最晚在下一次可以探测时醒来
+            next_probe = min((u.retry_at for u in self.upstreams if u.state == DOWN), default=time.monotonic())
+            wait = min(remaining, 5.0, max(0.05, next_probe - time.monotonic()))
+            try:
+                await asyncio.wait_for(self._recovered.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+        return True
+
+    def stats(self):
+        return {
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "in_flight": self.limiter.in_flight,
+            "upstreams": [u.as_dict() for u in self.upstreams],
+        }